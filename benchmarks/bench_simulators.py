@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Simulator Throughput Benchmarks
+
+Measures how fast each simulator's generation path produces rows and how much
+each sink costs per row. Every benchmark runs in a fresh child process so its
+peak RSS is isolated, and results are emitted as JSON (rows/sec, ns/row, peak
+RSS). Each benchmark runs --repeat times and the median run is reported, so
+a stored baseline can be compared against to catch hot-path regressions
+before a new load profile ships without one noisy run failing the check.
+
+Usage:
+    python benchmarks/bench_simulators.py --rows 200000 --save-baseline baseline.json
+    python benchmarks/bench_simulators.py --rows 200000 --baseline baseline.json
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINES = os.path.join(ROOT, "pipelines")
+for directory in (
+    PIPELINES,
+    os.path.join(PIPELINES, "01_sentence_stream"),
+    os.path.join(PIPELINES, "02_ecommerce_analytics"),
+    os.path.join(PIPELINES, "03_iot_sensors"),
+):
+    sys.path.insert(0, directory)
+
+from simlib.clock import SimulatedClock
+from simlib.rng import stream_rng
+from simlib.sinks import FileSink, open_sink
+
+START_TIME = datetime(2026, 1, 1)
+SEED = 1234
+
+
+def bench_sentence_generation(rows):
+    """Sentence picker plus row construction"""
+    import simulate_stream
+
+    rng = stream_rng(SEED, "sentences")
+    clock = SimulatedClock(START_TIME)
+    for i in range(rows):
+        (i, simulate_stream.pick_sentence(rng), clock.now())
+        clock.advance(0.001)
+
+
+def _sentence_corpus(rows):
+    """A synthetic one-sentence-per-line corpus with a large vocabulary, indexed up front"""
+    from corpus import Corpus
+
+    rng = stream_rng(SEED, "corpus")
+    vocabulary = [f"word{i}" for i in range(100000)]
+    directory = tempfile.mkdtemp(prefix="bench-corpus-")
+    path = os.path.join(directory, "corpus.txt")
+    with open(path, "w") as f:
+        for _ in range(max(rows, 1000)):
+            f.write(" ".join(rng.choices(vocabulary, k=rng.randint(3, 15))) + "\n")
+    Corpus([path]).close()
+    return directory, path
+
+
+def bench_sentence_corpus_generation(rows, prepared=None):
+    """Memory-mapped corpus sampling plus row construction (requires numpy)"""
+    import simulate_stream
+    from corpus import Corpus
+
+    directory, path = prepared
+    try:
+        rng = stream_rng(SEED, "sentences")
+        clock = SimulatedClock(START_TIME)
+        corpus = Corpus([path])
+        for i in range(rows):
+            (i, simulate_stream.pick_sentence(rng, corpus), clock.now())
+            clock.advance(0.001)
+        corpus.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+bench_sentence_corpus_generation.prepare = _sentence_corpus
+
+
+def bench_ecommerce_generation(rows):
+    """generate_random_event via one session shard"""
+    import simulate_events
+
+    stream = simulate_events.make_shard(0, 1, 1000, 0.001, SEED, START_TIME)
+    for _ in range(rows):
+        next(stream)
+
+
+def bench_ecommerce_batch_generation(rows):
+    """Vectorized SessionEngine via one session shard (requires numpy)"""
+    import simulate_events
+
+    stream = simulate_events.make_shard(
+        0, 1, 1000, 0.001, SEED, START_TIME, {"kind": "batch", "concurrency": 1000}
+    )
+    for _ in range(rows):
+        next(stream)
+
+
+def bench_iot_generation(rows):
+    """get_reading_value, battery, signal and generate_additional_data per reading"""
+    import simulate_readings as sr
+
+    rng = stream_rng(SEED, "readings")
+    clock = SimulatedClock(START_TIME)
+    sensors = list(sr.SENSOR_TYPES)
+    for _ in range(rows):
+        sensor_id = rng.choice(sensors)
+        reading_type = rng.choice(sr.SENSOR_TYPES[sensor_id]["readings"])
+        moment = clock.now()
+        sr.get_reading_value(sensor_id, reading_type, rng, moment)
+        sr.get_battery_level(sensor_id, rng, moment)
+        sr.get_signal_strength(sensor_id, rng)
+        sr.generate_additional_data(sensor_id, reading_type, rng)
+        clock.advance(0.001)
+
+
+def bench_iot_payload_encoding(rows, batch_size=1000):
+    """PayloadEncoder.encode_batch for reading_data across every sensor and reading type"""
+    import simulate_readings as sr
+
+    rng = stream_rng(SEED, "payload")
+    keys = [
+        (sensor_id, reading_type)
+        for sensor_id, sensor in sr.SENSOR_TYPES.items()
+        for reading_type in sensor["readings"]
+    ]
+    batch = [keys[i % len(keys)] for i in range(batch_size)]
+    for start in range(0, rows, batch_size):
+        sr.PAYLOADS.encode_batch(batch[: rows - start], rng)
+
+
+def bench_iot_fleet_generation(rows):
+    """Vectorized fleet tick plus row materialization (requires numpy)"""
+    import fleet
+
+    from simlib.rng import numpy_stream_rng
+
+    sensors = min(rows, 100000)
+    model = fleet.SensorFleet(
+        sensors, numpy_stream_rng(SEED, "fleet"), stream_rng(SEED, "fleet", "payload")
+    )
+    clock = SimulatedClock(START_TIME)
+    produced = 0
+    while produced < rows:
+        tick = model.tick(clock.now())
+        for _ in model.rows(tick, 0, min(len(tick), rows - produced)):
+            produced += 1
+        clock.advance(5)
+
+
+def _ecommerce_rows(rows):
+    import simulate_events
+
+    stream = simulate_events.make_shard(0, 1, 1000, 0.001, SEED, START_TIME)
+    return simulate_events.USER_EVENTS, [next(stream) for _ in range(rows)]
+
+
+def _iot_rows(rows):
+    import simulate_readings as sr
+
+    rng = stream_rng(SEED, "readings")
+    clock = SimulatedClock(START_TIME)
+    sensors = list(sr.SENSOR_TYPES)
+    data = []
+    for i in range(rows):
+        sensor_id = rng.choice(sensors)
+        reading_type = rng.choice(sr.SENSOR_TYPES[sensor_id]["readings"])
+        moment = clock.now()
+        data.append(
+            (
+                f"{reading_type[0].upper()}{i}",
+                sensor_id,
+                reading_type,
+                sr.get_reading_value(sensor_id, reading_type, rng, moment),
+                sr.READING_UNITS.get(reading_type, ""),
+                sr.get_battery_level(sensor_id, rng, moment),
+                sr.get_signal_strength(sensor_id, rng),
+                moment,
+                sr.generate_additional_data(sensor_id, reading_type, rng),
+            )
+        )
+        clock.advance(0.001)
+    return sr.SENSOR_READINGS, data
+
+
+def bench_copy_binary_encoding(rows, batch_size=1000, prepared=None):
+    """BinaryCopyEncoder for sensor_readings rows, 1000 rows per batch"""
+    from simlib.pgbinary import BinaryCopyEncoder
+
+    table, data = prepared
+    encoder = BinaryCopyEncoder(table)
+    for start in range(0, len(data), batch_size):
+        encoder.encode(data[start : start + batch_size]).release()
+
+
+bench_copy_binary_encoding.prepare = _iot_rows
+
+
+def _file_sink_bench(kind, compress=None):
+    def bench(rows, batch_size=10000, prepared=None):
+        table, data = prepared
+        directory = tempfile.mkdtemp(prefix="bench-sink-")
+        try:
+            sink = FileSink(kind, directory, rotate_rows=0, compress=compress)
+            for start in range(0, len(data), batch_size):
+                sink.write(table, data[start : start + batch_size])
+            sink.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    bench.prepare = _ecommerce_rows
+    bench.__doc__ = f"FileSink {kind}{' + ' + compress if compress else ''} for user_events rows"
+    return bench
+
+
+def _postgres_sink_bench(batch_size, resilience=None, binary_copy=False, prepare=_ecommerce_rows):
+    def bench(rows, prepared=None):
+        import simulate_events
+
+        table, data = prepared
+        sink = open_sink(
+            "postgres",
+            conn_params=simulate_events.CONN_PARAMS,
+            resilience=resilience,
+            binary_copy=binary_copy,
+        )
+        try:
+            for start in range(0, len(data), batch_size):
+                sink.write(table, data[start : start + batch_size])
+        finally:
+            sink.close()
+
+    bench.prepare = prepare
+    bench.__doc__ = (
+        f"{'ResilientPostgresSink' if resilience else 'PostgresSink'}, "
+        f"{batch_size} {'sensor_readings' if prepare is _iot_rows else 'user_events'} rows per "
+        f"{'binary COPY' if binary_copy else 'INSERT'} + commit (needs RisingWave)"
+    )
+    bench.needs_database = True
+    return bench
+
+
+# Benchmark name -> callable(rows[, prepared]); callables with a `prepare`
+# attribute get their input built outside the timed region
+BENCHMARKS = {
+    "gen.sentence": bench_sentence_generation,
+    "gen.sentence_corpus": bench_sentence_corpus_generation,
+    "gen.ecommerce": bench_ecommerce_generation,
+    "gen.ecommerce_batch": bench_ecommerce_batch_generation,
+    "gen.iot": bench_iot_generation,
+    "gen.iot_fleet": bench_iot_fleet_generation,
+    "encode.iot_payload": bench_iot_payload_encoding,
+    "encode.copy_binary": bench_copy_binary_encoding,
+    "sink.ndjson": _file_sink_bench("ndjson"),
+    "sink.ndjson_gzip": _file_sink_bench("ndjson", "gzip"),
+    "sink.csv": _file_sink_bench("csv"),
+    "sink.csv_gzip": _file_sink_bench("csv", "gzip"),
+    "sink.parquet": _file_sink_bench("parquet"),
+    "sink.postgres_row": _postgres_sink_bench(1),
+    "sink.postgres_batch": _postgres_sink_bench(1000),
+    "sink.postgres_resilient": _postgres_sink_bench(1000, {"pool_size": 4}),
+    "sink.postgres_iot_insert": _postgres_sink_bench(1000, prepare=_iot_rows),
+    "sink.postgres_iot_copy": _postgres_sink_bench(1000, binary_copy=True, prepare=_iot_rows),
+}
+
+
+def _run_in_child(name, rows, conn):
+    try:
+        bench = BENCHMARKS[name]
+        prepared = bench.prepare(rows) if hasattr(bench, "prepare") else None
+        start = time.perf_counter_ns()
+        if prepared is None:
+            bench(rows)
+        else:
+            bench(rows, prepared=prepared)
+        elapsed_ns = time.perf_counter_ns() - start
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        conn.send({"elapsed_ns": elapsed_ns, "peak_rss_kb": peak_rss_kb})
+    except ImportError as e:
+        conn.send({"skipped": f"missing dependency: {e.name}"})
+    except Exception as e:
+        conn.send({"error": str(e)})
+    finally:
+        conn.close()
+
+
+def _run_once(name, rows):
+    """Run one benchmark once in a child process and return its raw outcome"""
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_in_child, args=(name, rows, child))
+    process.start()
+    child.close()
+    outcome = parent.recv() if parent.poll(None) else {"error": "no result"}
+    process.join()
+    return outcome
+
+
+def run_benchmark(name, rows, repeat=1):
+    """
+    Run one benchmark repeat times, each in a fresh child process, and return its result record.
+
+    Timings are those of the median run, so a single noisy run neither fails
+    nor hides a regression; the fastest run is kept as ns_per_row_best.
+    """
+    record = {"name": name, "rows": rows}
+    runs = []
+    for _ in range(repeat):
+        outcome = _run_once(name, rows)
+        if "elapsed_ns" not in outcome:
+            record.update(outcome)
+            return record
+        runs.append(outcome)
+    elapsed = sorted(outcome["elapsed_ns"] for outcome in runs)
+    median_ns = statistics.median(elapsed)
+    seconds = median_ns / 1e9
+    record.update(
+        {
+            "repeat": repeat,
+            "seconds": round(seconds, 4),
+            "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+            "ns_per_row": round(median_ns / rows, 1),
+            "ns_per_row_best": round(elapsed[0] / rows, 1),
+            "peak_rss_kb": max(outcome["peak_rss_kb"] for outcome in runs),
+        }
+    )
+    return record
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """
+    Compare median ns/row against a baseline.
+
+    Returns:
+        List of (name, baseline ns/row, current ns/row, change) for
+        benchmarks that got slower by more than threshold
+    """
+    previous = {r["name"]: r for r in baseline.get("benchmarks", [])}
+    regressions = []
+    for record in results:
+        before = previous.get(record["name"], {}).get("ns_per_row")
+        after = record.get("ns_per_row")
+        if not before or not after:
+            continue
+        change = after / before - 1
+        record["baseline_ns_per_row"] = before
+        record["change"] = round(change, 4)
+        if change > threshold:
+            regressions.append((record["name"], before, after, change))
+    return regressions
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark simulator generation and sinks")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=100000,
+        help="Rows per benchmark (default: 100000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Runs per benchmark; the median run is reported and compared (default: 5)",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="*",
+        default=None,
+        help="Benchmark names or prefixes to run (default: all that need no database)",
+    )
+    parser.add_argument(
+        "--database",
+        action="store_true",
+        help="Also run benchmarks that write to a live RisingWave instance",
+    )
+    parser.add_argument("--output", default=None, help="Write results JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    parser.add_argument(
+        "--save-baseline",
+        default=None,
+        help="Write results JSON to this file for later comparisons",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed ns/row slowdown vs. baseline before failing (default: 0.10)",
+    )
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    names = [
+        name
+        for name, bench in BENCHMARKS.items()
+        if (args.only is None or any(name.startswith(p) for p in args.only))
+        and (args.database or not getattr(bench, "needs_database", False))
+    ]
+
+    results = []
+    for name in names:
+        record = run_benchmark(name, args.rows, args.repeat)
+        results.append(record)
+        if "ns_per_row" in record:
+            print(
+                f"{name:<22} {record['rows_per_sec']:>12,.0f} rows/sec "
+                f"{record['ns_per_row']:>10,.0f} ns/row {record['peak_rss_kb'] / 1024:>8.1f} MB peak RSS",
+                file=sys.stderr,
+            )
+        else:
+            print(f"{name:<22} {record.get('skipped') or 'error: ' + record.get('error', '')}", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "rows": args.rows,
+        "repeat": args.repeat,
+        "benchmarks": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.threshold)
+        for name, before, after, change in regressions:
+            print(
+                f"REGRESSION {name}: {before:,.0f} -> {after:,.0f} ns/row ({change:+.1%})",
+                file=sys.stderr,
+            )
+
+    output = json.dumps(report, indent=2)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                f.write(output + "\n")
+    print(output)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
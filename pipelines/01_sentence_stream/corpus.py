@@ -0,0 +1,195 @@
+"""
+Memory-Mapped Sentence Corpus
+
+Streams sentences from large text files (one sentence per line) without
+loading them into Python strings. Each file is memory-mapped, and a compact
+index of line start offsets (8 bytes per non-blank line) is built once with a
+vectorized newline scan and cached next to the file as <file>.idx. Later runs
+memory-map the cached index, so opening a multi-GB corpus is instant and the
+resident footprint stays flat: only the pages of the lines actually emitted
+are touched.
+
+Usage:
+    corpus = Corpus(["wiki.txt"], order="random")
+    sentence = corpus.pick(rng)
+"""
+
+import bisect
+import mmap
+import os
+import random
+import struct
+
+import numpy as np
+
+CORPUS_ORDERS = ["random", "sequential"]
+
+# Index header: magic, corpus size in bytes, corpus mtime in ns, line count
+INDEX_MAGIC = b"PDLINES1"
+INDEX_HEADER = struct.Struct("<8sQQQ")
+
+# Bytes scanned per vectorized pass while building an index
+SCAN_CHUNK = 1 << 26
+
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+
+
+def scan_line_starts(data, chunk_size=SCAN_CHUNK):
+    """
+    Yield int64 arrays of the start offsets of the non-blank lines in data.
+
+    data is a uint8 array (typically a view of a memory-mapped file); it is
+    scanned chunk_size bytes at a time so memory use stays bounded.
+    """
+    size = len(data)
+    for lo in range(0, size, chunk_size):
+        hi = min(lo + chunk_size, size)
+        starts = np.flatnonzero(data[lo:hi] == NEWLINE) + (lo + 1)
+        if lo == 0:
+            starts = np.concatenate((np.zeros(1, dtype=starts.dtype), starts))
+        starts = starts[starts < size]
+        first = data[starts]
+        yield starts[(first != NEWLINE) & (first != CARRIAGE_RETURN)]
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def _read_index(path, stat):
+    """Memory-map a cached index if it matches the corpus file, else None"""
+    try:
+        with open(index_path(path), "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+    except OSError:
+        return None
+    if len(header) != INDEX_HEADER.size:
+        return None
+    magic, size, mtime_ns, count = INDEX_HEADER.unpack(header)
+    if magic != INDEX_MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+        return None
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64)
+    return np.memmap(
+        index_path(path), dtype=np.uint64, mode="r", offset=INDEX_HEADER.size, shape=(count,)
+    )
+
+
+def build_index(path, data, stat):
+    """
+    Scan a corpus for line starts and cache them as <path>.idx.
+
+    The index is streamed to a temporary file and moved into place, so a
+    crashed build never leaves a truncated cache behind. If the corpus
+    directory is not writable, the index is kept in memory instead.
+    """
+    tmp = index_path(path) + f".{os.getpid()}.tmp"
+    try:
+        f = open(tmp, "wb")
+    except OSError:
+        return np.concatenate(list(scan_line_starts(data))).astype(np.uint64)
+
+    count = 0
+    with f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, 0))
+        for starts in scan_line_starts(data):
+            f.write(starts.astype("<u8").tobytes())
+            count += len(starts)
+        f.seek(0)
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, count))
+    os.replace(tmp, index_path(path))
+    return _read_index(path, stat)
+
+
+class CorpusFile:
+    """One memory-mapped text file and its line-offset index"""
+
+    def __init__(self, path, verbose=False):
+        self.path = path
+        stat = os.stat(path)
+        if stat.st_size == 0:
+            raise ValueError(f"Corpus file {path} is empty")
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.index = _read_index(path, stat)
+        if self.index is None:
+            if verbose:
+                print(f"Indexing {path} ({stat.st_size / 1e6:.0f} MB)...")
+            self.index = build_index(path, np.frombuffer(self.data, dtype=np.uint8), stat)
+        if len(self.index) == 0:
+            raise ValueError(f"Corpus file {path} has no non-blank lines")
+        # Scalar lookups through a memoryview avoid creating a NumPy scalar per line
+        self.offsets = memoryview(self.index).cast("B").cast("Q")
+
+    def __len__(self):
+        return len(self.index)
+
+    def line(self, i):
+        """The i-th non-blank line, decoded and stripped"""
+        start = self.offsets[i]
+        end = self.data.find(b"\n", start)
+        if end < 0:
+            end = len(self.data)
+        return self.data[start:end].decode("utf-8", "replace").strip()
+
+    def close(self):
+        self.offsets.release()
+        self.index = None
+        self.data.close()
+
+
+class Corpus:
+    """
+    Sentences drawn from one or more memory-mapped text files.
+
+    Args:
+        paths: Text files with one sentence per line
+        order: "random" to sample lines uniformly, or "sequential" to scan
+            them in file order, wrapping around at the end
+        verbose: Whether to report when an index is being built
+    """
+
+    def __init__(self, paths, order="random", verbose=False):
+        if order not in CORPUS_ORDERS:
+            raise ValueError(f"Unknown corpus order: {order}")
+        self.order = order
+        self.files = []
+        try:
+            for path in paths:
+                self.files.append(CorpusFile(path, verbose))
+        except Exception:
+            self.close()
+            raise
+        # Global line number at which each file ends
+        self.ends = []
+        total = 0
+        for corpus_file in self.files:
+            total += len(corpus_file)
+            self.ends.append(total)
+        self.size = total
+        self.position = 0
+
+    def __len__(self):
+        return self.size
+
+    def line(self, i):
+        """The i-th non-blank line across all files"""
+        f = bisect.bisect_right(self.ends, i)
+        if f:
+            i -= self.ends[f - 1]
+        return self.files[f].line(i)
+
+    def pick(self, rng=random):
+        """The next sentence: a uniform random line, or the next line in order"""
+        if self.order == "random":
+            return self.line(rng.randrange(self.size))
+        i = self.position
+        self.position = i + 1 if i + 1 < self.size else 0
+        return self.line(i)
+
+    def close(self):
+        for corpus_file in self.files:
+            corpus_file.close()
+        self.files = []
@@ -0,0 +1,196 @@
+"""
+In-Process Reference Engine for the Sentence Pipeline Views
+
+Incrementally maintains the results of create_views.sql over the rows
+written to sentence_source, without a RisingWave cluster:
+
+- words_stream: each sentence split on single spaces, empty strings dropped,
+  lowercased
+- word_counts: per-word counts in 1-minute tumbling windows over
+  event_time_with_watermark (event_time - 5 seconds, as computed by
+  sentence_source_with_watermark)
+- total_word_counts: per-word counts across all time
+
+Each sentence costs one window lookup plus a C-level Counter update per
+word, so maintenance is O(1) amortized per word. Like the views, the engine
+treats sentence_source as append-only and never closes a window. It does
+track the watermark (the highest event_time_with_watermark seen) and counts
+rows that land in windows the watermark has already passed.
+
+After a load run, the maintained results can be diffed against the real
+materialized views to catch result drift at high throughput. Lowercasing
+uses Python's str.lower(), which matches LOWER() for ASCII and most text.
+
+Usage:
+    views = ReferenceViews()
+    views.ingest(rows)            # (id, content, event_time) tuples
+    diffs = views.diff(cursor)    # after FLUSH, against the live views
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from simlib.sinks import Sink
+
+WINDOW = timedelta(minutes=1)
+WATERMARK_DELAY = timedelta(seconds=5)
+
+# View name -> query returning (key..., count) rows comparable to the reference
+VIEW_QUERIES = {
+    "word_counts": "SELECT window_start, word, count FROM word_counts",
+    "total_word_counts": "SELECT word, total_count FROM total_word_counts",
+}
+
+
+def tokenize(content):
+    """The words_stream words of one sentence"""
+    return [word for word in content.lower().split(" ") if word]
+
+
+class ViewDiff:
+    """
+    Differences between the reference and a live view.
+
+    missing: keys only in the reference; extra: keys only in the view;
+    mismatched: keys in both with different counts. Each maps key -> count
+    (or (expected, actual) for mismatched).
+    """
+
+    def __init__(self, view, expected, actual):
+        self.view = view
+        self.rows = len(expected)
+        self.missing = {k: v for k, v in expected.items() if k not in actual}
+        self.extra = {k: v for k, v in actual.items() if k not in expected}
+        self.mismatched = {
+            k: (v, actual[k]) for k, v in expected.items() if k in actual and actual[k] != v
+        }
+
+    def __bool__(self):
+        return bool(self.missing or self.extra or self.mismatched)
+
+    def format(self, examples=5):
+        if not self:
+            return f"{self.view}: OK ({self.rows} rows match)"
+        lines = [
+            f"{self.view}: DRIFT ({len(self.missing)} missing, {len(self.extra)} extra, "
+            f"{len(self.mismatched)} mismatched of {self.rows} expected rows)"
+        ]
+        for label, entries in (
+            ("missing", self.missing),
+            ("extra", self.extra),
+            ("mismatched (expected, actual)", self.mismatched),
+        ):
+            for key, value in list(entries.items())[:examples]:
+                lines.append(f"  {label}: {key} -> {value}")
+        return "\n".join(lines)
+
+
+class ReferenceViews:
+    """Incrementally maintained words_stream, word_counts and total_word_counts"""
+
+    def __init__(self):
+        # window_start -> Counter of word -> count
+        self.word_counts = {}
+        self.total_word_counts = Counter()
+        self.sentences = 0
+        self.words = 0
+        self.late_rows = 0
+        self.watermark = None
+        # Most recently used window, since consecutive rows usually share one
+        self._window_start = None
+        self._window_end = None
+        self._window = None
+
+    def _window_for(self, event_time):
+        """The word_counts Counter for the window containing event_time"""
+        shifted = event_time - WATERMARK_DELAY
+        if self.watermark is None or shifted > self.watermark:
+            self.watermark = shifted
+        if self._window_start is None or not self._window_start <= shifted < self._window_end:
+            start = shifted.replace(second=0, microsecond=0)
+            window = self.word_counts.get(start)
+            if window is None:
+                window = self.word_counts[start] = Counter()
+            self._window_start = start
+            self._window_end = start + WINDOW
+            self._window = window
+        if self._window_end <= self.watermark:
+            self.late_rows += 1
+        return self._window
+
+    def ingest(self, rows):
+        """Apply (id, content, event_time) rows inserted into sentence_source"""
+        for _, content, event_time in rows:
+            words = tokenize(content)
+            self._window_for(event_time).update(words)
+            self.total_word_counts.update(words)
+            self.words += len(words)
+        self.sentences += len(rows)
+
+    def load_views(self, cursor):
+        """
+        Start from the current contents of the live views.
+
+        Call after FLUSH and before a run, so the rows already in
+        sentence_source (test data, earlier runs) are accounted for and a
+        later diff only reflects this run's stream.
+        """
+        cursor.execute(VIEW_QUERIES["word_counts"])
+        for window_start, word, count in cursor.fetchall():
+            self.word_counts.setdefault(window_start, Counter())[word] = count
+        cursor.execute(VIEW_QUERIES["total_word_counts"])
+        for word, count in cursor.fetchall():
+            self.total_word_counts[word] = count
+
+    def expected(self):
+        """View name -> {key: count}, keyed like the rows of VIEW_QUERIES"""
+        return {
+            "word_counts": {
+                (window_start, word): count
+                for window_start, window in self.word_counts.items()
+                for word, count in window.items()
+            },
+            "total_word_counts": dict(self.total_word_counts),
+        }
+
+    def diff(self, cursor):
+        """Compare against the live views and return a list of ViewDiffs"""
+        diffs = []
+        for view, expected in self.expected().items():
+            cursor.execute(VIEW_QUERIES[view])
+            if view == "word_counts":
+                actual = {(window_start, word): count for window_start, word, count in cursor.fetchall()}
+            else:
+                actual = dict(cursor.fetchall())
+            diffs.append(ViewDiff(view, expected, actual))
+        return diffs
+
+    def summary(self, top=10):
+        lines = [
+            f"Reference views: {self.sentences} sentences, {self.words} words, "
+            f"{len(self.total_word_counts)} distinct words, {len(self.word_counts)} windows, "
+            f"{self.late_rows} rows behind the watermark",
+        ]
+        for word, count in self.total_word_counts.most_common(top):
+            lines.append(f"  {word}: {count}")
+        return "\n".join(lines)
+
+
+class ReferenceSink(Sink):
+    """Forward writes to another sink and feed sentence_source rows to ReferenceViews"""
+
+    def __init__(self, sink, views, table_name="sentence_source"):
+        self.sink = sink
+        self.views = views
+        self.table_name = table_name
+
+    def write(self, table, rows):
+        self.sink.write(table, rows)
+        if table.name == self.table_name:
+            self.views.ingest(rows)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        self.sink.close()
@@ -5,13 +5,36 @@ Sentence Stream Simulator
 This script simulates a live stream of sentences by inserting data into the
 sentence_source table at regular intervals. It's useful for testing the
 RisingWave pipeline when not using the datagen connector.
+
+Sentences come from the built-in SENTENCES list, or with --corpus from large
+text files read through a memory-mapped line index (see corpus.py).
+
+With --reference, the views in create_views.sql are also maintained in
+process (see reference_views.py); --verify diffs them against the live views
+after the run.
 """
 
+import itertools
+import os
 import psycopg2
+import sys
+import threading
 import time
 import random
+import uuid
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from simlib.clock import add_clock_arguments, clock_options, make_clock
+from simlib.disorder import add_disorder_arguments, disorder_options, open_disorder
+from simlib.metrics import SampledLog, add_metrics_arguments, metrics_options, open_metrics
+from simlib.profile import add_profile_arguments, open_profiler, profile_options
+from simlib.rate import TokenBucket
+from simlib.rng import add_seed_argument, stream_rng
+from simlib.sinks import Table, add_sink_arguments, open_sink, sink_options
+from simlib.stats import format_histogram, summarize_latencies
+
 # Sample sentences to insert - add more for variety
 SENTENCES = [
     "The quick brown fox jumps over the lazy dog.",
@@ -36,6 +59,13 @@ SENTENCES = [
     "Streaming enables new applications that weren't possible with batch processing.",
 ]
 
+SENTENCE_SOURCE = Table(
+    "sentence_source",
+    [("id", "bigint"), ("content", "varchar"), ("event_time", "timestamp")],
+    event_time="event_time",
+    watermark_delay=5.0,
+)
+
 # Connection parameters
 CONN_PARAMS = {
     "host": "localhost",  # Change as needed
@@ -46,7 +76,42 @@ CONN_PARAMS = {
 }
 
 
-def simulate_stream(interval=2.0, limit=None, start_id=100):
+def pick_sentence(rng=random, corpus=None):
+    """Pick the next sentence to emit, from a Corpus if one is given"""
+    if corpus is not None:
+        return corpus.pick(rng)
+    return rng.choice(SENTENCES)
+
+
+def open_corpus(corpus_config, verbose=True):
+    """Open the Corpus described by corpus_config, or return None for the built-in sentences"""
+    if not corpus_config:
+        return None
+    from corpus import Corpus
+
+    corpus = Corpus(corpus_config["paths"], order=corpus_config["order"], verbose=verbose)
+    if verbose:
+        print(f"Loaded corpus of {len(corpus)} sentences from {len(corpus_config['paths'])} file(s)")
+    return corpus
+
+
+def simulate_stream(
+    interval=2.0,
+    limit=None,
+    start_id=100,
+    sink_config=None,
+    verbose=True,
+    seed=None,
+    start_time=None,
+    corpus_config=None,
+    reference=False,
+    verify=False,
+    catch_up=None,
+    disorder_config=None,
+    metrics_config=None,
+    log_interval=1.0,
+    profile_config=None,
+):
     """
     Simulate a stream by inserting sentences at regular intervals.
 
@@ -54,10 +119,55 @@ def simulate_stream(interval=2.0, limit=None, start_id=100):
         interval: Time in seconds between inserts
         limit: Optional limit to number of sentences to insert (None for infinite)
         start_id: Starting ID for the records (should be higher than test data)
+        sink_config: Optional open_sink() keyword arguments (default: insert into RisingWave)
+        verbose: Whether to print inserted sentences, at most one per log_interval
+        seed: Optional seed for a reproducible sentence sequence
+        start_time: Optional datetime; use simulated time from here, advancing
+            by interval per sentence, instead of the wall clock
+        corpus_config: Optional {"paths": [...], "order": "random"|"sequential"}
+            to stream sentences from text files instead of SENTENCES
+        reference: Whether to maintain the views in process and print a summary
+        verify: Whether to diff the in-process views against the live views
+            after the run (implies reference; requires the postgres sink)
+        catch_up: With start_time, "stop" or "live" to backfill up to the
+            present and then stop or continue in real time
+        disorder_config: Optional disorder_options() settings to deliver a
+            fraction of the sentences late and out of order
+        metrics_config: Optional metrics_options() settings for a Prometheus
+            endpoint and periodic summary line
+        log_interval: Minimum seconds between sentence log lines (0 logs every one)
+        profile_config: Optional profile_options() settings to time each stage
+            and print a breakdown at exit
+
+    Returns:
+        False if verify found drift, else True
     """
+    rng = stream_rng(seed, "sentences")
+    clock = make_clock(start_time, catch_up)
+    profiler = open_profiler(profile_config)
+    log = SampledLog(log_interval, verbose, profiler)
+    sink = None
+    corpus = None
+    views = None
+    metrics = None
     try:
-        conn = psycopg2.connect(**CONN_PARAMS)
-        cursor = conn.cursor()
+        corpus = open_corpus(corpus_config, verbose)
+        metrics = open_metrics(metrics_config)
+        sink = open_sink(
+            conn_params=CONN_PARAMS,
+            metrics=metrics,
+            profiler=profiler,
+            **(sink_config or {"kind": "postgres"}),
+        )
+        if reference or verify:
+            from reference_views import ReferenceSink, ReferenceViews
+
+            views = ReferenceViews()
+            if verify:
+                start_reference(views, start_id)
+            sink = ReferenceSink(sink, views)
+        # Outermost, so the reference sees sentences in the order they are sent
+        sink = open_disorder(sink, disorder_config)
 
         count = 0
         current_id = start_id
@@ -65,37 +175,258 @@ def simulate_stream(interval=2.0, limit=None, start_id=100):
         print(f"Starting sentence stream simulation (interval: {interval}s)")
         print("Press Ctrl+C to stop")
 
-        while limit is None or count < limit:
+        while (limit is None or count < limit) and not clock.expired:
             # Select a random sentence
-            sentence = random.choice(SENTENCES)
+            with profiler.stage("generate"):
+                sentence = pick_sentence(rng, corpus)
 
             # Insert the sentence with current timestamp
-            cursor.execute(
-                "INSERT INTO sentence_source (id, content, event_time) VALUES (%s, %s, %s)",
-                (current_id, sentence, datetime.now()),
-            )
-            conn.commit()
+            with profiler.stage("sink"):
+                sink.write(SENTENCE_SOURCE, [(current_id, sentence, clock.now())])
 
             # Print feedback
             count += 1
-            print(
-                f"[{datetime.now().strftime('%H:%M:%S')}] Inserted (ID: {current_id}): {sentence}"
-            )
+            if log.ready():
+                log.print(
+                    f"[{clock.now().strftime('%H:%M:%S')}] Inserted (ID: {current_id}): {sentence}"
+                )
 
             # Increment ID for next insert
             current_id += 1
 
             # Wait for the specified interval
-            time.sleep(interval)
+            with profiler.stage("sleep"):
+                clock.sleep(interval)
 
     except KeyboardInterrupt:
         print("\nStream simulation stopped manually")
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        if "conn" in locals():
-            conn.close()
-            print("Connection closed")
+        if sink is not None:
+            sink.close()
+            print("Sink closed")
+        if metrics is not None:
+            metrics.close()
+            print(metrics.summary())
+        if corpus is not None:
+            corpus.close()
+        profiler.close()
+
+    if views is None:
+        return True
+    print(views.summary())
+    return not verify or verify_reference(views)
+
+
+def start_reference(views, start_id):
+    """Seed views with the live views' current contents before a verified run"""
+    conn = psycopg2.connect(**CONN_PARAMS)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("FLUSH")
+        cursor.execute("SELECT MAX(id) FROM sentence_source")
+        max_id = cursor.fetchone()[0]
+        if max_id is not None and max_id >= start_id:
+            print(
+                f"Warning: sentence_source already has IDs up to {max_id}; rows overwritten "
+                f"from --start-id {start_id} will show up as drift"
+            )
+        views.load_views(cursor)
+    finally:
+        conn.close()
+
+
+def verify_reference(views):
+    """Diff views against the live views once they have caught up; True if they match"""
+    conn = psycopg2.connect(**CONN_PARAMS)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("FLUSH")
+        diffs = views.diff(cursor)
+    finally:
+        conn.close()
+    for diff in diffs:
+        print(diff.format())
+    return not any(diffs)
+
+
+# Views polled by the latency probe, with a query returning which markers are visible
+PROBE_VIEWS = {
+    "total_word_counts": "SELECT word FROM total_word_counts WHERE word = ANY(%s)",
+    "word_counts": "SELECT DISTINCT word FROM word_counts WHERE word = ANY(%s)",
+}
+
+# Histogram bucket bounds for probe latencies, in seconds
+PROBE_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 30]
+
+
+def run_background_load(rate, ids, rng, stop, counters, max_batch=1000, corpus=None):
+    """
+    Insert random sentences at a steady rate until stop is set.
+
+    Rows are written as one multi-row INSERT per token-bucket refill, so
+    high rates don't pay a commit per sentence.
+    """
+    sink = open_sink("postgres", conn_params=CONN_PARAMS)
+    bucket = TokenBucket(rate, burst=max(1.0, rate / 10))
+    try:
+        while not stop.is_set():
+            n = bucket.take(max_batch)
+            if not n:
+                time.sleep(0.005)
+                continue
+            now = datetime.now()
+            sink.write(
+                SENTENCE_SOURCE,
+                [(next(ids), pick_sentence(rng, corpus), now) for _ in range(n)],
+            )
+            counters["load_rows"] += n
+    except Exception as e:
+        counters["load_error"] = str(e)
+    finally:
+        sink.close()
+
+
+def poll_markers(sent, seen, lock, stop, poll_interval, counters):
+    """
+    Poll the probe views for outstanding markers and record when each appears.
+
+    sent maps marker -> commit time; seen maps view -> {marker: first seen time}.
+    """
+    conn = psycopg2.connect(**CONN_PARAMS)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        while not stop.is_set():
+            for view, query in PROBE_VIEWS.items():
+                with lock:
+                    outstanding = [m for m in sent if m not in seen[view]]
+                if not outstanding:
+                    continue
+                cursor.execute(query, (outstanding,))
+                now = time.perf_counter()
+                with lock:
+                    for (marker,) in cursor.fetchall():
+                        seen[view].setdefault(marker, now)
+            counters["polls"] += 1
+            time.sleep(poll_interval)
+    except Exception as e:
+        counters["poll_error"] = str(e)
+    finally:
+        conn.close()
+
+
+def probe_latency(
+    probes=100,
+    probe_interval=1.0,
+    load_rate=0.0,
+    poll_interval=0.05,
+    timeout=60.0,
+    start_id=100,
+    seed=None,
+    corpus_config=None,
+):
+    """
+    Measure ingest-to-view latency for the sentence pipeline.
+
+    Inserts uniquely identifiable marker sentences into sentence_source,
+    records when each insert committed, and polls the word count views
+    concurrently to detect when each marker becomes visible, while optional
+    background load runs at load_rate sentences per second.
+
+    Args:
+        probes: Number of marker sentences to inject
+        probe_interval: Time in seconds between markers
+        load_rate: Background load in sentences per second (0 for none)
+        poll_interval: Time in seconds between view polls (bounds resolution)
+        timeout: Seconds to wait for outstanding markers after the last probe
+        start_id: Starting ID for inserted records
+        seed: Optional seed for the background sentence sequence
+        corpus_config: Optional corpus for the background sentences (see simulate_stream)
+    """
+    run_tag = uuid.uuid4().hex[:8]
+    ids = itertools.count(start_id)
+    stop = threading.Event()
+    lock = threading.Lock()
+    sent = {}
+    seen = {view: {} for view in PROBE_VIEWS}
+    counters = {"load_rows": 0, "polls": 0}
+
+    threads = [
+        threading.Thread(
+            target=poll_markers,
+            args=(sent, seen, lock, stop, poll_interval, counters),
+            daemon=True,
+        )
+    ]
+    corpus = None
+    if load_rate > 0:
+        corpus = open_corpus(corpus_config)
+        threads.append(
+            threading.Thread(
+                target=run_background_load,
+                args=(load_rate, ids, stream_rng(seed, "sentences"), stop, counters),
+                kwargs={"corpus": corpus},
+                daemon=True,
+            )
+        )
+
+    print(
+        f"Probing ingest-to-view latency ({probes} markers every {probe_interval}s, "
+        f"background load {load_rate:g}/s, run tag {run_tag})"
+    )
+    print("Press Ctrl+C to stop")
+
+    sink = open_sink("postgres", conn_params=CONN_PARAMS)
+    for thread in threads:
+        thread.start()
+    try:
+        for n in range(probes):
+            marker = f"probe{run_tag}n{n}"
+            # Stamped before the insert, so its own commit counts towards the latency
+            with lock:
+                sent[marker] = time.perf_counter()
+            sink.write(SENTENCE_SOURCE, [(next(ids), marker, datetime.now())])
+            time.sleep(probe_interval)
+
+        # Give the views time to catch up with the last markers
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with lock:
+                if all(len(seen[view]) == len(sent) for view in PROBE_VIEWS):
+                    break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\nLatency probe stopped manually")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        sink.close()
+        if corpus is not None:
+            corpus.close()
+
+    for key in ("poll_error", "load_error"):
+        if key in counters:
+            print(f"Error ({key.split('_')[0]}): {counters[key]}")
+    if load_rate > 0:
+        print(f"Background load inserted {counters['load_rows']} sentences")
+
+    with lock:
+        for view in PROBE_VIEWS:
+            latencies = [seen[view][m] - sent[m] for m in seen[view] if m in sent]
+            missing = len(sent) - len(latencies)
+            p50, p95, p99, worst = summarize_latencies(latencies)
+            print(
+                f"\n{view}: {len(latencies)}/{len(sent)} markers visible ({missing} missing)\n"
+                f"  p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, "
+                f"p99 {p99 * 1000:.0f} ms, max {worst * 1000:.0f} ms"
+            )
+            if latencies:
+                print(format_histogram(latencies, PROBE_BUCKETS))
 
 
 if __name__ == "__main__":
@@ -121,6 +452,107 @@ if __name__ == "__main__":
         help="Starting ID for the inserted records (default: 100)",
     )
 
+    parser.add_argument("--quiet", action="store_true", help="Reduce output verbosity")
+    parser.add_argument(
+        "--probe",
+        action="store_true",
+        help="Measure ingest-to-view latency with marker sentences instead of streaming",
+    )
+    parser.add_argument(
+        "--probes",
+        type=int,
+        default=100,
+        help="Number of marker sentences in --probe mode (default: 100)",
+    )
+    parser.add_argument(
+        "--probe-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between marker sentences (default: 1.0)",
+    )
+    parser.add_argument(
+        "--load-rate",
+        type=float,
+        default=0.0,
+        help="Background load in sentences per second during --probe (default: 0)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.05,
+        help="Seconds between view polls during --probe (default: 0.05)",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        metavar="PATH",
+        help="Stream sentences from a text file with one sentence per line instead of the "
+        "built-in list; may be repeated. A line index is cached next to each file as <file>.idx",
+    )
+    parser.add_argument(
+        "--corpus-order",
+        choices=["random", "sequential"],
+        default="random",
+        help="Sample corpus lines uniformly or scan them in order (default: random)",
+    )
+    parser.add_argument(
+        "--reference",
+        action="store_true",
+        help="Maintain word_counts and total_word_counts in process and print a summary",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="With the postgres sink, diff the in-process views against the live views "
+        "after the run and exit non-zero on drift",
+    )
+    add_seed_argument(parser)
+    add_clock_arguments(parser)
+    add_sink_arguments(parser)
+    add_disorder_arguments(parser)
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
+
     args = parser.parse_args()
+    if args.verify and args.sink != "postgres":
+        parser.error("--verify requires --sink postgres")
+    try:
+        start_time, catch_up = clock_options(args, args.interval)
+        disorder_config = disorder_options(args)
+        profile_config = profile_options(args)
+    except ValueError as e:
+        parser.error(str(e))
+    corpus_config = None
+    if args.corpus:
+        corpus_config = {"paths": args.corpus, "order": args.corpus_order}
 
-    simulate_stream(interval=args.interval, limit=args.limit, start_id=args.start_id)
+    if args.probe:
+        probe_latency(
+            probes=args.probes,
+            probe_interval=args.probe_interval,
+            load_rate=args.load_rate,
+            poll_interval=args.poll_interval,
+            start_id=args.start_id,
+            seed=args.seed,
+            corpus_config=corpus_config,
+        )
+    else:
+        matched = simulate_stream(
+            interval=args.interval,
+            limit=args.limit,
+            start_id=args.start_id,
+            sink_config=sink_options(args),
+            verbose=not args.quiet,
+            seed=args.seed,
+            start_time=start_time,
+            corpus_config=corpus_config,
+            reference=args.reference,
+            verify=args.verify,
+            catch_up=catch_up,
+            disorder_config=disorder_config,
+            metrics_config=metrics_options(args),
+            log_interval=args.log_interval,
+            profile_config=profile_config,
+        )
+        if not matched:
+            sys.exit(1)
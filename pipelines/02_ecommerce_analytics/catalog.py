@@ -0,0 +1,236 @@
+"""
+High-Cardinality User and Product Catalogs
+
+Configurable catalogs of users and products with power-law (Zipf)
+popularity, for exercising the join, distinct-count and hot-key behavior of
+the e-commerce views at realistic cardinality.
+
+Entities are identified by their zero-based rank, most popular first, and
+their IDs (U001, P001, ...) are formatted on demand, so a catalog of millions
+costs two small arrays per entity type rather than millions of strings.
+Sampling uses Vose's alias method: O(1) per draw, vectorized for NumPy
+generators.
+
+Matching `users` and `products` dimension rows can be bulk-loaded through any
+sink before events are generated, so the joins in create_views.sql match.
+"""
+
+import random
+
+import numpy as np
+
+from event_constants import DEVICE_TYPES, PRODUCTS, USERS
+
+# Entity types up to this size keep a lookup table of preformatted IDs
+ID_TABLE_LIMIT = 1 << 16
+
+CATEGORIES = [
+    "Electronics",
+    "Home & Kitchen",
+    "Sports & Outdoors",
+    "Clothing",
+    "Furniture",
+]
+
+PRODUCT_NOUNS = [
+    "Headphones",
+    "Charger",
+    "Smart TV",
+    "Pillow",
+    "Water Bottle",
+    "T-Shirt",
+    "Speaker",
+    "Office Chair",
+    "Fitness Tracker",
+    "Skillet",
+]
+
+PRODUCT_ADJECTIVES = ["Premium", "Compact", "Classic", "Ultra", "Eco", "Smart", "Pro", "Essential"]
+
+LOCATIONS = [
+    ("United States", "New York"),
+    ("United Kingdom", "London"),
+    ("Canada", "Toronto"),
+    ("Australia", "Sydney"),
+    ("United States", "Los Angeles"),
+    ("United States", "Chicago"),
+    ("United Kingdom", "Manchester"),
+    ("Canada", "Vancouver"),
+    ("Australia", "Melbourne"),
+    ("United States", "Miami"),
+]
+
+
+def _days_before(now, days):
+    """datetime64[us] array of `now` minus each of a float array of days"""
+    return np.datetime64(now, "us") - (days * 86400e6).astype("timedelta64[us]")
+
+
+def zipf_weights(size, exponent):
+    """Popularity weight 1 / rank^exponent for ranks 1..size (0 is uniform)"""
+    return 1.0 / np.arange(1, size + 1, dtype=np.float64) ** exponent
+
+
+class AliasSampler:
+    """
+    Vose's alias method over a fixed discrete distribution.
+
+    Building the tables is O(n); each draw costs one uniform index, one
+    uniform coin and a table lookup.
+
+    Args:
+        weights: Non-negative weights, one per outcome
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        scaled = (weights * (n / weights.sum())).tolist()
+        prob = [1.0] * n
+        alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            g = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] += scaled[s] - 1.0
+            if scaled[g] < 1.0:
+                small.append(g)
+            else:
+                large.append(g)
+
+        self.size = n
+        self.prob = np.array(prob)
+        self.alias = np.array(alias, dtype=np.int64)
+
+    def sample(self, rng, size):
+        """Draw `size` outcomes with a NumPy Generator"""
+        index = rng.integers(self.size, size=size)
+        return np.where(rng.random(size) < self.prob[index], index, self.alias[index])
+
+    def sample_one(self, rng=random):
+        """Draw one outcome with a random.Random-style generator"""
+        index = int(rng.random() * self.size)
+        if rng.random() < self.prob[index]:
+            return index
+        return int(self.alias[index])
+
+
+class EntityCatalog:
+    """
+    One entity type (users or products) ranked by popularity.
+
+    Args:
+        prefix: ID prefix, e.g. "U"
+        size: Number of entities; IDs are prefix + rank, zero-padded to 3 digits
+        skew: Zipf exponent of the popularity distribution (0 for uniform)
+    """
+
+    def __init__(self, prefix, size, skew=0.0):
+        if size < 1:
+            raise ValueError(f"Catalog of {prefix} IDs needs at least one entry")
+        self.prefix = prefix
+        self.size = size
+        self.skew = skew
+        self.sampler = AliasSampler(zipf_weights(size, skew))
+        self.id_table = None
+        if size <= ID_TABLE_LIMIT:
+            # Trailing None lets index -1 stand for "no entity"
+            self.id_table = np.array([self.id(i) for i in range(size)] + [None], dtype=object)
+
+    def id(self, index):
+        return f"{self.prefix}{index + 1:03d}"
+
+    def ids(self, indices):
+        """IDs for an integer array of indices, with -1 mapped to None"""
+        if self.id_table is not None:
+            return self.id_table[indices].tolist()
+        prefix = self.prefix
+        return [f"{prefix}{i + 1:03d}" if i >= 0 else None for i in indices.tolist()]
+
+    def sample(self, rng, size):
+        return self.sampler.sample(rng, size)
+
+    def sample_id(self, rng=random):
+        return self.id(self.sampler.sample_one(rng))
+
+
+class Catalog:
+    """
+    Users and products for the e-commerce generators.
+
+    The default (10 uniform users and products, U001-U010 and P001-P010)
+    matches the IDs in insert_test_data.sql.
+
+    Args:
+        users: Number of users
+        products: Number of products
+        user_skew: Zipf exponent of user activity
+        product_skew: Zipf exponent of product popularity
+    """
+
+    def __init__(self, users=10, products=10, user_skew=0.0, product_skew=0.0):
+        self.users = EntityCatalog("U", users, user_skew)
+        self.products = EntityCatalog("P", products, product_skew)
+
+    def product_rows(self, start, stop, rng, now):
+        """`products` rows for ranks start..stop-1, drawn from a NumPy Generator"""
+        n = stop - start
+        names = np.array(
+            [f"{adjective} {noun}" for adjective in PRODUCT_ADJECTIVES for noun in PRODUCT_NOUNS],
+            dtype=object,
+        )[rng.integers(len(PRODUCT_ADJECTIVES) * len(PRODUCT_NOUNS), size=n)]
+        return list(
+            zip(
+                self.products.ids(np.arange(start, stop)),
+                [f"{name} {rank}" for name, rank in zip(names.tolist(), range(start + 1, stop + 1))],
+                np.array(CATEGORIES, dtype=object)[rng.integers(len(CATEGORIES), size=n)].tolist(),
+                np.round(rng.lognormal(3.8, 0.8, n), 2).tolist(),
+                rng.integers(0, 2001, size=n).tolist(),
+                _days_before(now, rng.uniform(1, 365, n)).tolist(),
+                (rng.random(n) < 0.98).tolist(),
+            )
+        )
+
+    def user_rows(self, start, stop, rng, now):
+        """`users` rows for ranks start..stop-1, drawn from a NumPy Generator"""
+        n = stop - start
+        device_weights = np.array(list(DEVICE_TYPES.values()), dtype=np.float64)
+        devices = np.array(list(DEVICE_TYPES), dtype=object)[
+            np.searchsorted(np.cumsum(device_weights / device_weights.sum()), rng.random(n), side="right")
+        ]
+        locations = rng.integers(len(LOCATIONS), size=n).tolist()
+        created_at = _days_before(now, rng.uniform(1, 730, n))
+        last_login = created_at + ((np.datetime64(now, "us") - created_at) * rng.random(n)).astype(
+            "timedelta64[us]"
+        )
+        return list(
+            zip(
+                self.users.ids(np.arange(start, stop)),
+                [f"user{rank}@example.com" for rank in range(start + 1, stop + 1)],
+                [LOCATIONS[i][0] for i in locations],
+                [LOCATIONS[i][1] for i in locations],
+                devices.tolist(),
+                created_at.tolist(),
+                last_login.tolist(),
+            )
+        )
+
+    def load_dimensions(self, sink, rng, now, batch_size=10000, verbose=True):
+        """
+        Write `products` and `users` rows for the whole catalog to a sink.
+
+        Rows for existing IDs are overwritten by RisingWave's primary-key
+        upsert, so the catalog can be reloaded over insert_test_data.sql.
+        """
+        for table, size, make_rows in (
+            (PRODUCTS, self.products.size, self.product_rows),
+            (USERS, self.users.size, self.user_rows),
+        ):
+            for start in range(0, size, batch_size):
+                sink.write(table, make_rows(start, min(start + batch_size, size), rng, now))
+            if verbose:
+                print(f"Loaded {size} {table.name} rows")
@@ -0,0 +1,122 @@
+"""
+Shared E-Commerce Event Constants
+
+The product and user IDs, event types, pages, referrers and device types
+that both the per-event generator (simulate_events.py) and the batched
+session engine and catalogs draw from, and the schemas of the tables they
+write, in a module of their own so those can import them without loading
+the simulator script.
+"""
+
+from simlib.sinks import Table
+
+# List of existing product IDs
+PRODUCT_IDS = [
+    "P001",
+    "P002",
+    "P003",
+    "P004",
+    "P005",
+    "P006",
+    "P007",
+    "P008",
+    "P009",
+    "P010",
+]
+
+# List of existing user IDs
+USER_IDS = [
+    "U001",
+    "U002",
+    "U003",
+    "U004",
+    "U005",
+    "U006",
+    "U007",
+    "U008",
+    "U009",
+    "U010",
+]
+
+# Event types with their relative frequencies
+EVENT_TYPES = {
+    "pageview": 45,
+    "product_view": 30,
+    "add_to_cart": 15,
+    "checkout": 5,
+    "purchase": 5,
+}
+
+# Page URLs by event type
+PAGE_URLS = {
+    "pageview": [
+        "https://example.com/home",
+        "https://example.com/products",
+        "https://example.com/categories",
+        "https://example.com/blog",
+        "https://example.com/about",
+    ],
+    "product_view": [f"https://example.com/products/{pid}" for pid in PRODUCT_IDS],
+    "add_to_cart": [f"https://example.com/products/{pid}" for pid in PRODUCT_IDS],
+    "checkout": ["https://example.com/checkout"],
+    "purchase": ["https://example.com/order-confirmation"],
+}
+
+# Referrer URLs
+REFERRER_URLS = [
+    "https://google.com",
+    "https://bing.com",
+    "https://facebook.com",
+    "https://instagram.com",
+    "https://twitter.com",
+    "https://pinterest.com",
+    "https://youtube.com",
+    None,  # Direct traffic
+]
+
+# Device types with their relative frequencies
+DEVICE_TYPES = {"mobile": 60, "desktop": 30, "tablet": 10}
+
+PRODUCTS = Table(
+    "products",
+    [
+        ("product_id", "varchar"),
+        ("name", "varchar"),
+        ("category", "varchar"),
+        ("price", "double"),
+        ("inventory_count", "int"),
+        ("created_at", "timestamp"),
+        ("is_active", "boolean"),
+    ],
+)
+
+USERS = Table(
+    "users",
+    [
+        ("user_id", "varchar"),
+        ("email", "varchar"),
+        ("country", "varchar"),
+        ("city", "varchar"),
+        ("device_type", "varchar"),
+        ("created_at", "timestamp"),
+        ("last_login", "timestamp"),
+    ],
+)
+
+USER_EVENTS = Table(
+    "user_events",
+    [
+        ("event_id", "varchar"),
+        ("user_id", "varchar"),
+        ("session_id", "varchar"),
+        ("event_type", "varchar"),
+        ("product_id", "varchar"),
+        ("page_url", "varchar"),
+        ("referrer_url", "varchar"),
+        ("device_type", "varchar"),
+        ("event_time", "timestamp"),
+        ("event_data", "jsonb"),
+    ],
+    event_time="event_time",
+    watermark_delay=120.0,
+)
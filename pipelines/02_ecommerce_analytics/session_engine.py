@@ -0,0 +1,294 @@
+"""
+Batched E-Commerce Session Engine
+
+The session funnel as data: a transition-probability table between event
+types, including an "exit" column for abandonment. A SessionEngine holds a
+fixed number of concurrent sessions as NumPy arrays (funnel state, user,
+device, current page, product, cart value and item count) and advances all of
+them in one vectorized step, emitting one event per session. Sessions that
+exit are immediately replaced by new ones, so the number of live sessions
+stays constant.
+
+Cart state is carried as typed fields, so a purchase reads the checkout's
+cart value directly instead of re-parsing the checkout event's JSON. Users
+and products are drawn from a Catalog, so sessions can run over millions of
+skewed users and products.
+
+Funnel rates can be tuned without code changes by passing a JSON file with
+the same shape as DEFAULT_FUNNEL to load_funnel(); states it lists replace
+the defaults.
+"""
+
+import json
+
+import numpy as np
+
+from catalog import Catalog
+from event_constants import DEVICE_TYPES, PAGE_URLS, REFERRER_URLS
+from simlib.leases import IdSequence
+
+FUNNEL_STATES = ["pageview", "product_view", "add_to_cart", "checkout", "purchase"]
+EXIT = "exit"
+
+PAGEVIEW, PRODUCT_VIEW, ADD_TO_CART, CHECKOUT, PURCHASE = range(len(FUNNEL_STATES))
+
+# Relative weights of the next event type (or exit) given the current one.
+# The in-funnel weights are the ones generate_random_event uses; the exit
+# weights stand in for its random pruning of active sessions.
+DEFAULT_FUNNEL = {
+    "pageview": {"pageview": 60, "product_view": 40, "exit": 25},
+    "product_view": {"pageview": 30, "product_view": 30, "add_to_cart": 40, "exit": 20},
+    "add_to_cart": {"pageview": 20, "product_view": 40, "checkout": 40, "exit": 15},
+    "checkout": {"pageview": 30, "purchase": 70, "exit": 10},
+    "purchase": {"exit": 100},
+}
+
+# Share of pageviews after an add_to_cart that go to the cart page
+CART_PAGE_PROBABILITY = 0.7
+
+PAYMENT_METHODS = ["credit_card", "paypal", "apple_pay", "google_pay"]
+
+CART_URL = "https://example.com/cart"
+CHECKOUT_URL = "https://example.com/checkout"
+CONFIRMATION_URL = "https://example.com/order-confirmation"
+
+# Every non-product URL a session can be on or come from; index 0 is "no
+# referrer", and index len(URLS) + p is the page of product p
+URLS = [None]
+for url in (
+    [u for u in REFERRER_URLS if u is not None]
+    + PAGE_URLS["pageview"]
+    + [CART_URL, CHECKOUT_URL, CONFIRMATION_URL]
+):
+    if url not in URLS:
+        URLS.append(url)
+URL_INDEX = {url: i for i, url in enumerate(URLS)}
+
+
+def load_funnel(path=None):
+    """
+    Build a funnel table from DEFAULT_FUNNEL, overridden by a JSON file.
+
+    Args:
+        path: Optional JSON file mapping event type -> {next event type or
+            "exit": weight}; each state it lists replaces the default row
+
+    Returns:
+        Funnel table dictionary
+    """
+    funnel = {state: dict(row) for state, row in DEFAULT_FUNNEL.items()}
+    if path is None:
+        return funnel
+
+    with open(path) as f:
+        overrides = json.load(f)
+    for state, row in overrides.items():
+        unknown = [name for name in [state, *row] if name not in FUNNEL_STATES + [EXIT]]
+        if state == EXIT or unknown:
+            raise ValueError(f"Unknown funnel state in {path}: {unknown or [state]}")
+        if sum(row.values()) <= 0 or min(row.values()) < 0:
+            raise ValueError(f"Funnel weights for {state} must be non-negative with a positive total")
+        funnel[state] = dict(row)
+    return funnel
+
+
+def transition_matrix(funnel):
+    """Cumulative transition probabilities, one row per state, last column exit"""
+    columns = FUNNEL_STATES + [EXIT]
+    weights = np.array(
+        [[funnel[state].get(name, 0) for name in columns] for state in FUNNEL_STATES],
+        dtype=np.float64,
+    )
+    return np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+
+
+class SessionEngine:
+    """
+    A fixed pool of concurrent sessions advanced one event per step.
+
+    Event and session numbers come from ID allocators (IdSequence or
+    LeasedIds), as in session_events, so engines never reuse an ID.
+
+    Args:
+        concurrency: Number of live sessions, i.e. events per step
+        rng: Optional numpy Generator (default: a fresh unseeded generator)
+        funnel: Optional funnel table (default: DEFAULT_FUNNEL)
+        event_ids: Optional event number allocator (default: from 1000)
+        session_ids: Optional session number allocator (default: from 1000)
+        catalog: Optional Catalog of users and products (default: the ten
+            built-in IDs of each)
+    """
+
+    def __init__(
+        self,
+        concurrency=1000,
+        rng=None,
+        funnel=None,
+        event_ids=None,
+        session_ids=None,
+        catalog=None,
+    ):
+        self.concurrency = concurrency
+        self.catalog = catalog if catalog is not None else Catalog()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.cumulative = transition_matrix(funnel or DEFAULT_FUNNEL)
+        self.event_ids = event_ids if event_ids is not None else IdSequence(1000)
+        self.session_ids = session_ids if session_ids is not None else IdSequence(1000)
+
+        weights = np.array(list(DEVICE_TYPES.values()), dtype=np.float64)
+        self.device_cumulative = np.cumsum(weights / weights.sum())
+        self.device_table = np.array(list(DEVICE_TYPES), dtype=object)
+        self.referrers = np.array([URL_INDEX[u] for u in REFERRER_URLS])
+        self.browse_pages = np.array([URL_INDEX[u] for u in PAGE_URLS["pageview"]])
+
+        # Output strings, gathered by index
+        self.state_names = np.array(FUNNEL_STATES, dtype=object)
+        self.url_names = np.array(URLS, dtype=object)
+        self.payload_tables = [
+            (state, low, high, np.array([template % v for v in range(low, high)], dtype=object))
+            for state, low, high, template in (
+                (PAGEVIEW, 10, 101, '{"scroll_depth": %d}'),
+                (PRODUCT_VIEW, 10, 121, '{"view_duration": %d}'),
+                (ADD_TO_CART, 1, 4, '{"quantity": %d}'),
+            )
+        ]
+
+        # -1 marks a slot that starts a new session on the next step
+        n = concurrency
+        self.state = np.full(n, -1, dtype=np.int8)
+        self.session_names = np.empty(n, dtype=object)
+        self.user = np.zeros(n, dtype=np.int64)
+        self.device = np.zeros(n, dtype=np.int8)
+        self.page = np.zeros(n, dtype=np.int64)
+        self.product = np.full(n, -1, dtype=np.int64)
+        self.cart_value = np.full(n, 100.0)
+        self.item_count = np.ones(n, dtype=np.int16)
+
+    def _advance(self):
+        """Move every session to its next state, starting new ones as needed"""
+        rng = self.rng
+        n = self.concurrency
+        previous = self.state
+
+        # Vectorized inverse-CDF sampling; the exit column is implied by 1.0
+        current = np.maximum(previous, 0)
+        nxt = (rng.random(n)[:, None] >= self.cumulative[current, :-1]).sum(axis=1)
+        new = (previous < 0) | (nxt == len(FUNNEL_STATES))
+        nxt[new] = PAGEVIEW
+        state = nxt.astype(np.int8)
+
+        previous_page = self.page
+        page = self.browse_pages[rng.integers(len(self.browse_pages), size=n)]
+        referrer = previous_page.copy()
+        product = np.full(n, -1, dtype=np.int64)
+
+        to_cart_page = (state == PAGEVIEW) & (previous == ADD_TO_CART) & ~new
+        to_cart_page &= rng.random(n) < CART_PAGE_PROBABILITY
+        page[to_cart_page] = URL_INDEX[CART_URL]
+
+        viewed = state == PRODUCT_VIEW
+        product[viewed] = self.catalog.products.sample(rng, int(viewed.sum()))
+
+        # add_to_cart keeps the product being viewed, or picks one if there is none
+        added = state == ADD_TO_CART
+        kept = self.product[added]
+        missing = kept < 0
+        kept[missing] = self.catalog.products.sample(rng, int(missing.sum()))
+        product[added] = kept
+        referrer[added] = 0
+
+        shown = viewed | added
+        page[shown] = len(URLS) + product[shown]
+
+        checked_out = state == CHECKOUT
+        count = int(checked_out.sum())
+        page[checked_out] = URL_INDEX[CHECKOUT_URL]
+        referrer[checked_out] = URL_INDEX[CART_URL]
+        self.cart_value[checked_out] = np.round(rng.uniform(20, 500, count), 2)
+        self.item_count[checked_out] = rng.integers(1, 6, size=count)
+
+        page[state == PURCHASE] = URL_INDEX[CONFIRMATION_URL]
+
+        new_slots = np.flatnonzero(new)
+        k = len(new_slots)
+        if k:
+            self.session_names[new_slots] = [f"S{number}" for number in self.session_ids.take(k)]
+            self.user[new_slots] = self.catalog.users.sample(rng, k)
+            self.device[new_slots] = np.searchsorted(
+                self.device_cumulative, rng.random(k), side="right"
+            )
+            referrer[new_slots] = self.referrers[rng.integers(len(self.referrers), size=k)]
+            self.cart_value[new_slots] = 100.0
+            self.item_count[new_slots] = 1
+
+        self.state = state
+        self.page = page
+        self.product = product
+        return referrer
+
+    def _urls(self, pages):
+        """URL strings for an array of page indices"""
+        urls = self.url_names[np.minimum(pages, len(URLS) - 1)]
+        product_pages = np.flatnonzero(pages >= len(URLS))
+        urls[product_pages] = [
+            f"https://example.com/products/{product_id}"
+            for product_id in self.catalog.products.ids(pages[product_pages] - len(URLS))
+        ]
+        return urls.tolist()
+
+    def step(self, event_time):
+        """
+        Advance every session by one event.
+
+        Returns:
+            List of user_events rows, one per session, all stamped event_time
+        """
+        referrer = self._advance()
+        rng = self.rng
+        n = self.concurrency
+        state = self.state
+
+        # Columns are gathered from object arrays of preformatted strings, so
+        # only event IDs and cart payloads are formatted per row
+        data = np.empty(n, dtype=object)
+        for s, low, high, table in self.payload_tables:
+            rows = state == s
+            data[rows] = table[rng.integers(low, high, size=int(rows.sum())) - low]
+
+        checkouts = np.flatnonzero(state == CHECKOUT)
+        data[checkouts] = [
+            f'{{"cart_value": {cart!r}, "item_count": {count}}}'
+            for cart, count in zip(
+                self.cart_value[checkouts].tolist(), self.item_count[checkouts].tolist()
+            )
+        ]
+
+        purchases = np.flatnonzero(state == PURCHASE)
+        k = len(purchases)
+        data[purchases] = [
+            f'{{"order_id": "ORD{order}", "total_amount": {cart!r}, '
+            f'"item_count": {count}, "payment_method": "{PAYMENT_METHODS[payment]}"}}'
+            for order, cart, count, payment in zip(
+                rng.integers(1000, 10000, size=k).tolist(),
+                self.cart_value[purchases].tolist(),
+                self.item_count[purchases].tolist(),
+                rng.integers(len(PAYMENT_METHODS), size=k).tolist(),
+            )
+        ]
+
+        event_ids = [f"E{number}" for number in self.event_ids.take(n)]
+
+        return list(
+            zip(
+                event_ids,
+                self.catalog.users.ids(self.user),
+                self.session_names.tolist(),
+                self.state_names[state].tolist(),
+                self.catalog.products.ids(self.product),
+                self._urls(self.page),
+                self._urls(referrer),
+                self.device_table[self.device].tolist(),
+                [event_time] * n,
+                data.tolist(),
+            )
+        )
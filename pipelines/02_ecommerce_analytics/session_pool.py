@@ -0,0 +1,114 @@
+"""
+Active Session Pool
+
+The set of in-progress sessions for the per-event e-commerce generator,
+sized for up to millions of concurrent sessions:
+
+- Sessions live in a dense list with a dict from session ID to position, so
+  uniform sampling is one randrange() and removal is a swap with the last
+  entry; neither copies the keys.
+- Idle sessions expire after a TTL. Each touch pushes the session's new
+  deadline onto a min-heap; stale heap entries are skipped when popped and
+  the heap is compacted when stale entries dominate it.
+"""
+
+import heapq
+import random
+
+
+class SessionPool:
+    """
+    Active sessions and their last events.
+
+    Args:
+        ttl: Optional idle time in seconds after which a session expires
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self.ids = []
+        self.events = []
+        self.deadlines = []
+        self.position = {}
+        self.heap = []
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, session_id):
+        return session_id in self.position
+
+    def put(self, session_id, event, now=None):
+        """Add a session or replace its last event, refreshing its TTL"""
+        deadline = None
+        if self.ttl is not None and now is not None:
+            deadline = now + self.ttl
+            heapq.heappush(self.heap, (deadline, session_id))
+
+        i = self.position.get(session_id)
+        if i is None:
+            self.position[session_id] = len(self.ids)
+            self.ids.append(session_id)
+            self.events.append(event)
+            self.deadlines.append(deadline)
+        else:
+            self.events[i] = event
+            self.deadlines[i] = deadline
+
+        if len(self.heap) > 4 * len(self.ids) + 1024:
+            self._compact()
+
+    def remove(self, session_id):
+        """Remove a session in O(1) by moving the last session into its slot"""
+        i = self.position.pop(session_id)
+        last = len(self.ids) - 1
+        if i != last:
+            moved = self.ids[last]
+            self.ids[i] = moved
+            self.events[i] = self.events[last]
+            self.deadlines[i] = self.deadlines[last]
+            self.position[moved] = i
+        self.ids.pop()
+        self.events.pop()
+        self.deadlines.pop()
+
+    def sample(self, rng=random):
+        """Return a uniformly random (session_id, last_event)"""
+        i = rng.randrange(len(self.ids))
+        return self.ids[i], self.events[i]
+
+    def evict_random(self, count, rng=random):
+        """Drop up to count uniformly chosen sessions"""
+        for _ in range(min(count, len(self.ids))):
+            self.remove(self.ids[rng.randrange(len(self.ids))])
+            self.evicted += 1
+
+    def expire(self, now):
+        """
+        Remove sessions idle since before now - ttl.
+
+        Returns:
+            Number of sessions expired
+        """
+        count = 0
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            deadline, session_id = heapq.heappop(heap)
+            i = self.position.get(session_id)
+            # Skip entries superseded by a later touch or a removal
+            if i is not None and self.deadlines[i] == deadline:
+                self.remove(session_id)
+                count += 1
+        self.expired += count
+        return count
+
+    def _compact(self):
+        """Rebuild the heap from the live deadlines only"""
+        self.heap = [
+            (deadline, session_id)
+            for session_id, deadline in zip(self.ids, self.deadlines)
+            if deadline is not None
+        ]
+        heapq.heapify(self.heap)
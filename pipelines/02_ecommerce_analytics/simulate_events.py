@@ -7,13 +7,44 @@ random events into the user_events table. It's useful for testing the
 RisingWave pipeline with realistic user behavior patterns.
 """
 
+import multiprocessing
+import os
 import psycopg2
+import queue
+import sys
 import time
 import random
 import uuid
 import json
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from simlib.clock import SystemClock, add_clock_arguments, clock_options, make_clock
+from simlib.disorder import add_disorder_arguments, disorder_options, open_disorder
+from simlib.metrics import SampledLog, add_metrics_arguments, metrics_options, open_metrics
+from simlib.profile import NULL_PROFILER, add_profile_arguments, open_profiler, profile_options
+from simlib.leases import (
+    IdSequence,
+    LeasedIds,
+    TableLeaseStore,
+    add_lease_arguments,
+    lease_options,
+    open_lease_store,
+)
+from simlib.rng import add_seed_argument, numpy_stream_rng, stream_rng
+from simlib.sinks import PostgresSink, add_sink_arguments, open_sink, sink_options
+from simlib.stats import summarize_latencies
+from event_constants import (
+    DEVICE_TYPES,
+    PAGE_URLS,
+    PRODUCT_IDS,
+    REFERRER_URLS,
+    USER_EVENTS,
+    USER_IDS,
+)
+from session_pool import SessionPool
+
 # Connection parameters
 CONN_PARAMS = {
     "host": "localhost",  # Change as needed
@@ -23,93 +54,145 @@ CONN_PARAMS = {
     "password": "",  # Default has no password
 }
 
-# List of existing product IDs
-PRODUCT_IDS = [
-    "P001",
-    "P002",
-    "P003",
-    "P004",
-    "P005",
-    "P006",
-    "P007",
-    "P008",
-    "P009",
-    "P010",
-]
-
-# List of existing user IDs
-USER_IDS = [
-    "U001",
-    "U002",
-    "U003",
-    "U004",
-    "U005",
-    "U006",
-    "U007",
-    "U008",
-    "U009",
-    "U010",
-]
-
-# Event types with their relative frequencies
-EVENT_TYPES = {
-    "pageview": 45,
-    "product_view": 30,
-    "add_to_cart": 15,
-    "checkout": 5,
-    "purchase": 5,
-}
+SYSTEM_CLOCK = SystemClock()
 
-# Page URLs by event type
-PAGE_URLS = {
-    "pageview": [
-        "https://example.com/home",
-        "https://example.com/products",
-        "https://example.com/categories",
-        "https://example.com/blog",
-        "https://example.com/about",
-    ],
-    "product_view": [f"https://example.com/products/{pid}" for pid in PRODUCT_IDS],
-    "add_to_cart": [f"https://example.com/products/{pid}" for pid in PRODUCT_IDS],
-    "checkout": ["https://example.com/checkout"],
-    "purchase": ["https://example.com/order-confirmation"],
-}
+class EventBatcher:
+    """
+    Accumulate generated events and write them to a sink in batches.
+
+    A batch is flushed (for the database, one multi-row INSERT and one commit)
+    when it reaches batch_size rows or when the oldest buffered event has
+    waited max_delay seconds.
+    """
+
+    def __init__(
+        self,
+        sink,
+        batch_size=1,
+        max_delay=1.0,
+        verbose=True,
+        on_flush=None,
+        log_interval=1.0,
+        profiler=NULL_PROFILER,
+    ):
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.verbose = verbose
+        self.on_flush = on_flush
+        # Flush lines, at most one per log_interval seconds
+        self.log = SampledLog(log_interval, verbose and self.batch_size > 1, profiler)
+        self.pending = []
+        self.first_pending_at = None
+
+        self.rows_written = 0
+        self.batches = 0
+        self.commit_latencies = []
+        self.started_at = time.perf_counter()
+
+    def add(self, event):
+        """Buffer an event, flushing if the batch is full or too old"""
+        if not self.pending:
+            self.first_pending_at = time.perf_counter()
+        self.pending.append(event)
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_due()
+
+    def flush_due(self, within=0.0):
+        """
+        Flush if the oldest buffered event has waited, or within seconds will
+        have waited, max_delay seconds.
+
+        Called before sleeping between events, so a slow event rate cannot
+        hold a partial batch back until the next event arrives.
+        """
+        if self.pending and time.perf_counter() + within - self.first_pending_at >= self.max_delay:
+            self.flush()
 
-# Referrer URLs
-REFERRER_URLS = [
-    "https://google.com",
-    "https://bing.com",
-    "https://facebook.com",
-    "https://instagram.com",
-    "https://twitter.com",
-    "https://pinterest.com",
-    "https://youtube.com",
-    None,  # Direct traffic
-]
+    def flush(self):
+        """Write all buffered events in a single statement and commit"""
+        if not self.pending:
+            return
 
-# Device types with their relative frequencies
-DEVICE_TYPES = {"mobile": 60, "desktop": 30, "tablet": 10}
+        start = time.perf_counter()
+        self.sink.write(USER_EVENTS, self.pending)
+        latency = time.perf_counter() - start
 
+        rows = len(self.pending)
+        self.rows_written += rows
+        self.batches += 1
+        self.commit_latencies.append(latency)
+        self.pending = []
+        self.first_pending_at = None
 
-def get_random_weighted(options_dict):
+        if self.log.ready():
+            self.log.print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Flushed {rows} events in {latency * 1000:.1f} ms"
+            )
+        if self.on_flush is not None:
+            self.on_flush(self)
+
+    def report(self):
+        """Print throughput and commit latency statistics"""
+        elapsed = time.perf_counter() - self.started_at
+        rate = self.rows_written / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Wrote {self.rows_written} events in {self.batches} batches "
+            f"({elapsed:.1f}s, {rate:.0f} rows/sec)"
+        )
+        if self.commit_latencies:
+            avg = sum(self.commit_latencies) / len(self.commit_latencies)
+            _, _, p99, worst = summarize_latencies(self.commit_latencies)
+            print(
+                f"Batch commit latency: avg {avg * 1000:.1f} ms, "
+                f"p99 {p99 * 1000:.1f} ms, max {worst * 1000:.1f} ms"
+            )
+
+
+def get_random_weighted(options_dict, rng=random):
     """Get a random item based on weighted frequencies"""
     options = list(options_dict.keys())
     weights = list(options_dict.values())
-    return random.choices(options, weights=weights, k=1)[0]
+    return rng.choices(options, weights=weights, k=1)[0]
+
 
+def pick_user(rng=random, catalog=None):
+    """A user ID: uniform over USER_IDS, or by popularity from a Catalog"""
+    if catalog is None:
+        return rng.choice(USER_IDS)
+    return catalog.users.sample_id(rng)
 
-def generate_random_event(event_id, session_id, last_event=None):
-    """Generate a random event based on the last event (if any)"""
+
+def pick_product(rng=random, catalog=None):
+    """A product ID: uniform over PRODUCT_IDS, or by popularity from a Catalog"""
+    if catalog is None:
+        return rng.choice(PRODUCT_IDS)
+    return catalog.products.sample_id(rng)
+
+
+def generate_random_event(
+    event_id, session_id, last_event=None, rng=random, clock=SYSTEM_CLOCK, catalog=None
+):
+    """
+    Generate a random event based on the last event (if any).
+
+    All randomness comes from rng and the timestamp from clock, so a seeded
+    rng and a simulated clock make the event sequence reproducible. Users and
+    products come from catalog when given, else the ten built-in IDs.
+    """
 
     # If there's no last event, generate a fresh pageview
     if not last_event:
         event_type = "pageview"
-        user_id = random.choice(USER_IDS)
-        device_type = get_random_weighted(DEVICE_TYPES)
+        user_id = pick_user(rng, catalog)
+        device_type = get_random_weighted(DEVICE_TYPES, rng)
         product_id = None
-        page_url = random.choice(PAGE_URLS[event_type])
-        referrer_url = random.choice(REFERRER_URLS)
-        event_data = json.dumps({"scroll_depth": random.randint(10, 100)})
+        page_url = rng.choice(PAGE_URLS[event_type])
+        referrer_url = rng.choice(REFERRER_URLS)
+        event_data = json.dumps({"scroll_depth": rng.randint(10, 100)})
     else:
         # Use the same user and device type for continuity
         user_id = last_event[1]
@@ -120,80 +203,80 @@ def generate_random_event(event_id, session_id, last_event=None):
 
         if current_type == "pageview":
             # After a pageview, could be another pageview or product view
-            event_type = random.choices(
+            event_type = rng.choices(
                 ["pageview", "product_view"], weights=[60, 40], k=1
             )[0]
             if event_type == "pageview":
                 product_id = None
-                page_url = random.choice(PAGE_URLS[event_type])
+                page_url = rng.choice(PAGE_URLS[event_type])
                 referrer_url = last_event[6]  # Previous page
-                event_data = json.dumps({"scroll_depth": random.randint(10, 100)})
+                event_data = json.dumps({"scroll_depth": rng.randint(10, 100)})
             else:  # product_view
-                product_id = random.choice(PRODUCT_IDS)
+                product_id = pick_product(rng, catalog)
                 page_url = f"https://example.com/products/{product_id}"
                 referrer_url = last_event[5]  # Previous page
-                event_data = json.dumps({"view_duration": random.randint(10, 120)})
+                event_data = json.dumps({"view_duration": rng.randint(10, 120)})
 
         elif current_type == "product_view":
             # After a product view, could view another product, add to cart, or go back to browsing
-            event_type = random.choices(
+            event_type = rng.choices(
                 ["pageview", "product_view", "add_to_cart"], weights=[30, 30, 40], k=1
             )[0]
             if event_type == "pageview":
                 product_id = None
-                page_url = random.choice(PAGE_URLS[event_type])
+                page_url = rng.choice(PAGE_URLS[event_type])
                 referrer_url = last_event[5]  # Previous page
-                event_data = json.dumps({"scroll_depth": random.randint(10, 100)})
+                event_data = json.dumps({"scroll_depth": rng.randint(10, 100)})
             elif event_type == "product_view":
-                product_id = random.choice(PRODUCT_IDS)
+                product_id = pick_product(rng, catalog)
                 page_url = f"https://example.com/products/{product_id}"
                 referrer_url = last_event[5]  # Previous page
-                event_data = json.dumps({"view_duration": random.randint(10, 120)})
+                event_data = json.dumps({"view_duration": rng.randint(10, 120)})
             else:  # add_to_cart
                 product_id = last_event[4]  # Use the same product
                 page_url = last_event[5]  # Same page
                 referrer_url = None
-                event_data = json.dumps({"quantity": random.randint(1, 3)})
+                event_data = json.dumps({"quantity": rng.randint(1, 3)})
 
         elif current_type == "add_to_cart":
             # After adding to cart, could view another product, go to cart, or continue browsing
-            event_type = random.choices(
+            event_type = rng.choices(
                 ["pageview", "product_view", "checkout"], weights=[20, 40, 40], k=1
             )[0]
             if event_type == "pageview":
-                if random.random() < 0.7:  # 70% chance to go to cart
+                if rng.random() < 0.7:  # 70% chance to go to cart
                     page_url = "https://example.com/cart"
                 else:
-                    page_url = random.choice(PAGE_URLS["pageview"])
+                    page_url = rng.choice(PAGE_URLS["pageview"])
                 product_id = None
                 referrer_url = last_event[5]  # Previous page
-                event_data = json.dumps({"scroll_depth": random.randint(10, 100)})
+                event_data = json.dumps({"scroll_depth": rng.randint(10, 100)})
             elif event_type == "product_view":
-                product_id = random.choice(PRODUCT_IDS)
+                product_id = pick_product(rng, catalog)
                 page_url = f"https://example.com/products/{product_id}"
                 referrer_url = last_event[5]  # Previous page
-                event_data = json.dumps({"view_duration": random.randint(10, 120)})
+                event_data = json.dumps({"view_duration": rng.randint(10, 120)})
             else:  # checkout
                 product_id = None
                 page_url = "https://example.com/checkout"
                 referrer_url = "https://example.com/cart"
                 # Random cart value between $20 and $500
-                cart_value = round(random.uniform(20, 500), 2)
-                item_count = random.randint(1, 5)
+                cart_value = round(rng.uniform(20, 500), 2)
+                item_count = rng.randint(1, 5)
                 event_data = json.dumps(
                     {"cart_value": cart_value, "item_count": item_count}
                 )
 
         elif current_type == "checkout":
             # After checkout, high chance of purchase or abandonment
-            event_type = random.choices(
+            event_type = rng.choices(
                 ["pageview", "purchase"], weights=[30, 70], k=1
             )[0]
             if event_type == "pageview":
                 product_id = None
-                page_url = random.choice(PAGE_URLS["pageview"])
+                page_url = rng.choice(PAGE_URLS["pageview"])
                 referrer_url = last_event[5]  # Previous page
-                event_data = json.dumps({"scroll_depth": random.randint(10, 100)})
+                event_data = json.dumps({"scroll_depth": rng.randint(10, 100)})
             else:  # purchase
                 product_id = None
                 page_url = "https://example.com/order-confirmation"
@@ -206,10 +289,10 @@ def generate_random_event(event_id, session_id, last_event=None):
 
                 event_data = json.dumps(
                     {
-                        "order_id": f"ORD{random.randint(1000, 9999)}",
+                        "order_id": f"ORD{rng.randint(1000, 9999)}",
                         "total_amount": cart_value,
                         "item_count": item_count,
-                        "payment_method": random.choice(
+                        "payment_method": rng.choice(
                             ["credit_card", "paypal", "apple_pay", "google_pay"]
                         ),
                     }
@@ -223,9 +306,9 @@ def generate_random_event(event_id, session_id, last_event=None):
             # Default to a pageview for any other event type
             event_type = "pageview"
             product_id = None
-            page_url = random.choice(PAGE_URLS[event_type])
-            referrer_url = random.choice(REFERRER_URLS)
-            event_data = json.dumps({"scroll_depth": random.randint(10, 100)})
+            page_url = rng.choice(PAGE_URLS[event_type])
+            referrer_url = rng.choice(REFERRER_URLS)
+            event_data = json.dumps({"scroll_depth": rng.randint(10, 100)})
 
     # Create the event record
     event = (
@@ -237,107 +320,774 @@ def generate_random_event(event_id, session_id, last_event=None):
         page_url,
         referrer_url,
         device_type,
-        datetime.now(),
+        clock.now(),
         event_data,
     )
 
     return event
 
 
-def simulate_user_sessions(interval=1.0, limit=None, verbose=True):
+def get_next_event_id(cursor, column="event_id"):
     """
-    Simulate user sessions with realistic event sequences.
+    Return the first number above the highest existing ID in a user_events column.
 
-    Args:
-        interval: Time in seconds between event inserts
-        limit: Optional limit to number of events to insert (None for infinite)
-        verbose: Whether to print event details
+    This scans the whole table, so with ID leasing it only runs the first
+    time a namespace is leased.
     """
-    try:
-        conn = psycopg2.connect(**CONN_PARAMS)
-        cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT MAX(CAST(SUBSTRING({column} FROM 2) AS BIGINT)) FROM user_events"
+    )
+    result = cursor.fetchone()
+    if result[0]:
+        return result[0] + 1
+    return 1000  # Start event IDs from 1000
+
+
+def first_event_id_for(sink, column="event_id"):
+    """Start above existing IDs in column when writing to the database, else at 1000"""
+    if isinstance(sink, PostgresSink):
+        return get_next_event_id(sink.cursor, column)
+    return 1000
+
+
+def open_leased_ids(lease_config, cursor=None):
+    """
+    Open a lease store and event/session ID allocators backed by it.
+
+    The first lease in each namespace starts above the existing rows when a
+    database cursor is available (table store, or a file store next to a
+    database sink), else at 1000.
+
+    Returns:
+        (store, (event_ids, session_ids))
+    """
+    store = open_lease_store(
+        lease_config["kind"], conn_params=CONN_PARAMS, path=lease_config["path"]
+    )
+    if cursor is None and isinstance(store, TableLeaseStore):
+        cursor = store.cursor
+
+    def initial(column):
+        if cursor is None:
+            return lambda: 1000
+        return lambda: get_next_event_id(cursor, column)
+
+    block_size = lease_config["block_size"]
+    return store, (
+        LeasedIds(store, "user_events.event_id", block_size, initial("event_id")),
+        LeasedIds(store, "user_events.session_id", block_size, initial("session_id")),
+    )
+
+
+def session_events(
+    rng,
+    clock,
+    event_ids,
+    session_ids,
+    interval=0.0,
+    catalog=None,
+    max_sessions=10,
+    session_ttl=None,
+):
+    """
+    Yield the session events of one shard until its clock expires (never,
+    unless it is a backfill clock that stops at the present).
+
+    Event and session numbers come from the event_ids and session_ids
+    allocators (an IdSequence per shard, or LeasedIds blocks), so no event or
+    session ID is ever reused. After each event the shard's clock advances by
+    interval (a no-op on the system clock, where the caller sleeps instead).
+
+    Active sessions live in a SessionPool: picking one is O(1), sessions idle
+    longer than session_ttl seconds expire, and beyond max_sessions random
+    sessions are dropped as abandoned.
+    """
+    active_sessions = SessionPool(ttl=session_ttl)
+
+    while not clock.expired:
+        event_id = f"E{event_ids.next()}"
 
-        count = 0
-        active_sessions = {}  # session_id -> last_event
-        next_event_id = 1000  # Start event IDs from 1000
+        now = None
+        if session_ttl is not None:
+            now = clock.now().timestamp()
+            active_sessions.expire(now)
 
-        # Get the highest existing event_id to avoid duplicates
-        cursor.execute(
-            "SELECT MAX(CAST(SUBSTRING(event_id FROM 2) AS INT)) FROM user_events"
+        # Randomly decide if we're continuing an existing session or starting a new one
+        if (
+            active_sessions and rng.random() < 0.8
+        ):  # 80% chance to continue an active session
+            # Pick a random active session
+            session_id, last_event = active_sessions.sample(rng)
+
+            # Generate the next event in this session
+            event = generate_random_event(
+                event_id, session_id, last_event, rng, clock, catalog
+            )
+
+            # If the session is complete (e.g., after purchase), remove it from active sessions
+            if not event:
+                active_sessions.remove(session_id)
+                continue
+        else:
+            # Start a new session
+            session_id = f"S{session_ids.next()}"
+
+            event = generate_random_event(
+                event_id, session_id, rng=rng, clock=clock, catalog=catalog
+            )
+
+        # Record the session's latest event and refresh its idle deadline
+        active_sessions.put(session_id, event, now)
+
+        yield event
+        clock.advance(interval)
+
+        # Randomly abandon some sessions to cap concurrency
+        if len(active_sessions) > max_sessions:
+            active_sessions.evict_random(2, rng)
+
+
+def batched_session_events(engine, clock, interval=0.0):
+    """
+    Yield the events of a SessionEngine one at a time.
+
+    Each engine step advances every live session at once; its events share
+    the timestamp at which the step was taken, and the clock then advances by
+    interval per event, as in session_events, until it expires.
+    """
+    while not clock.expired:
+        events = engine.step(clock.now())
+        yield from events
+        clock.advance(interval * len(events))
+
+
+def make_shard(
+    shard,
+    shards,
+    first_event_id,
+    interval,
+    seed=None,
+    start_time=None,
+    engine_config=None,
+    catalog=None,
+    ids=None,
+    clock=None,
+    first_session_id=1000,
+):
+    """
+    Create the event stream for one shard.
+
+    The shard's RNG is derived from (seed, shard) and its clock is private, so
+    the shard yields the same events in any process and in any interleaving.
+    engine_config holds the classic generator's max_sessions and session_ttl,
+    or with {"kind": "batch", ...} the shard runs a vectorized SessionEngine
+    (requires numpy) instead of generate_random_event. catalog is an optional
+    Catalog of users and products shared by all shards.
+
+    Event numbers are first_event_id + shard + k * shards, and session
+    numbers first_session_id + shard + k * shards, unless ids supplies
+    (event_ids, session_ids) allocators, e.g. leased blocks shared by all of
+    a worker's shards. clock overrides the shard's
+    make_clock(start_time), e.g. with a backfill clock, on which the stream
+    ends or goes live once the shard reaches the present.
+    """
+    engine_config = engine_config or {"kind": "classic"}
+    if ids is None:
+        ids = (
+            IdSequence(first_event_id, shard, shards),
+            IdSequence(first_session_id, shard, shards),
         )
-        result = cursor.fetchone()
-        if result[0]:
-            next_event_id = result[0] + 1
+    event_ids, session_ids = ids
+    clock = clock or make_clock(start_time)
+    if engine_config["kind"] == "batch":
+        from session_engine import SessionEngine
 
-        print(f"Starting e-commerce event simulation (interval: {interval}s)")
-        print("Press Ctrl+C to stop")
+        engine = SessionEngine(
+            engine_config.get("concurrency", 1000),
+            numpy_stream_rng(seed, "sessions", shard),
+            funnel=engine_config.get("funnel"),
+            event_ids=event_ids,
+            session_ids=session_ids,
+            catalog=catalog,
+        )
+        return batched_session_events(engine, clock, interval)
+
+    return session_events(
+        stream_rng(seed, "sessions", shard),
+        clock,
+        event_ids,
+        session_ids,
+        interval=interval,
+        catalog=catalog,
+        max_sessions=engine_config.get("max_sessions", 10),
+        session_ttl=engine_config.get("session_ttl"),
+    )
 
-        while limit is None or count < limit:
-            # Randomly decide if we're continuing an existing session or starting a new one
-            if (
-                active_sessions and random.random() < 0.8
-            ):  # 80% chance to continue an active session
-                # Pick a random active session
-                session_id = random.choice(list(active_sessions.keys()))
-                last_event = active_sessions[session_id]
 
-                # Generate the next event in this session
-                event_id = f"E{next_event_id}"
-                next_event_id += 1
+def shard_limit(limit, shard, shards):
+    """Split a total event limit evenly across shards"""
+    if limit is None:
+        return None
+    return limit // shards + (1 if shard < limit % shards else 0)
+
+
+def run_shards(batcher, shard_streams, limits, interval, log, clocks, profiler=NULL_PROFILER):
+    """
+    Round-robin events from several shard streams into the batcher.
 
-                event = generate_random_event(event_id, session_id, last_event)
+    log is an optional SampledLog for per-event lines, which are printed
+    only when events are written one at a time.
 
-                # If the session is complete (e.g., after purchase), remove it from active sessions
-                if not event:
-                    del active_sessions[session_id]
+    clocks are the shards' clocks: an event from a shard on simulated time
+    is not followed by a sleep, so a backfilling shard runs at full speed
+    until its clock reaches the present. A shard whose stream ends (its
+    backfill clock stopped) drops out of the round-robin.
+
+    profiler times the generate, sink and sleep stages.
+
+    Returns:
+        Number of events generated
+    """
+    pending = [
+        [stream, limit, clock] for stream, limit, clock in zip(shard_streams, limits, clocks)
+    ]
+    count = 0
+
+    while pending:
+        for entry in list(pending):
+            stream, remaining, clock = entry
+            if remaining is not None:
+                if remaining <= 0:
+                    pending.remove(entry)
                     continue
+                entry[1] -= 1
 
-                # Update the active session with this event
-                active_sessions[session_id] = event
-            else:
-                # Start a new session
-                session_id = f"S{1000 + len(active_sessions)}"
-                event_id = f"E{next_event_id}"
-                next_event_id += 1
-
-                event = generate_random_event(event_id, session_id)
-                active_sessions[session_id] = event
-
-            # Insert the event
-            cursor.execute(
-                """
-                INSERT INTO user_events 
-                (event_id, user_id, session_id, event_type, product_id, page_url, referrer_url, device_type, event_time, event_data)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                event,
-            )
-            conn.commit()
+            try:
+                with profiler.stage("generate"):
+                    event = next(stream)
+            except StopIteration:
+                pending.remove(entry)
+                continue
+
+            # Queue the event; the batcher inserts and commits once per batch
+            with profiler.stage("sink"):
+                batcher.add(event)
 
             # Print feedback
             count += 1
-            if verbose:
-                print(
-                    f"[{datetime.now().strftime('%H:%M:%S')}] Inserted {event[3]} event for user {event[1]} (Session: {event[2]})"
+            if log is not None and batcher.batch_size == 1 and log.ready():
+                log.print(
+                    f"[{event[8].strftime('%H:%M:%S')}] Inserted {event[3]} event for user {event[1]} (Session: {event[2]})"
                 )
 
-            # Randomly remove some completed sessions to avoid too many active sessions
-            if len(active_sessions) > 10:
-                keys_to_remove = random.sample(list(active_sessions.keys()), 2)
-                for key in keys_to_remove:
-                    del active_sessions[key]
+            # Wait for the specified interval; simulated clocks advance instead
+            if interval > 0 and not clock.simulated:
+                with profiler.stage("sink"):
+                    batcher.flush_due(interval)
+                with profiler.stage("sleep"):
+                    time.sleep(interval)
+
+    return count
+
+
+def shard_clocks(shard_ids, start_time=None, catch_up=None, announce=True):
+    """One clock per shard; only the first announces when a backfill catches up"""
+    return [
+        make_clock(start_time, catch_up, announce=announce and i == 0)
+        for i in range(len(shard_ids))
+    ]
+
+
+def load_catalog_dimensions(catalog, sink_config, seed=None, start_time=None):
+    """
+    Bulk-load `products` and `users` rows for a catalog before generating events.
+
+    Returns:
+        True if the dimension rows were written
+    """
+    sink = None
+    try:
+        sink = open_sink(conn_params=CONN_PARAMS, **sink_config)
+        print(
+            f"Loading {catalog.products.size} products and {catalog.users.size} users"
+        )
+        catalog.load_dimensions(
+            sink, numpy_stream_rng(seed, "dimensions"), make_clock(start_time).now()
+        )
+        return True
+    except Exception as e:
+        print(f"Error loading dimension tables: {e}")
+        return False
+    finally:
+        if sink is not None:
+            sink.close()
+
+
+def simulate_user_sessions(
+    interval=1.0,
+    limit=None,
+    verbose=True,
+    batch_size=1,
+    max_flush_delay=1.0,
+    workers=1,
+    sink_config=None,
+    shards=None,
+    seed=None,
+    start_time=None,
+    engine_config=None,
+    catalog=None,
+    load_dimensions=False,
+    lease_config=None,
+    catch_up=None,
+    disorder_config=None,
+    metrics_config=None,
+    log_interval=1.0,
+    profile_config=None,
+):
+    """
+    Simulate user sessions with realistic event sequences.
+
+    Args:
+        interval: Time in seconds between event inserts (per worker)
+        limit: Optional limit to number of events to insert (None for infinite)
+        verbose: Whether to print event details
+        batch_size: Number of events written per multi-row INSERT and commit
+        max_flush_delay: Maximum time in seconds an event waits in a partial batch
+        workers: Number of generator processes; more than one shards the sessions
+        sink_config: Optional open_sink() keyword arguments (default: insert into RisingWave)
+        shards: Number of independent session streams (default: workers). For a
+            given seed and shard count the generated events are the same
+            regardless of how many processes run them.
+        seed: Optional seed for reproducible generation
+        start_time: Optional datetime; use simulated time from here, advancing
+            by interval per event in each shard, instead of the wall clock
+        engine_config: Optional generator settings: {"kind": "classic",
+            "max_sessions": N, "session_ttl": seconds} for generate_random_event,
+            or {"kind": "batch", "concurrency": N, "funnel": table} for the
+            vectorized SessionEngine
+        catalog: Optional Catalog of users and products (default: the ten
+            built-in IDs of each)
+        load_dimensions: Bulk-load the catalog's `products` and `users` rows
+            through the sink before generating events
+        lease_config: Optional {"kind": "file" | "table", "path": checkpoint,
+            "block_size": N} to lease event and session ID blocks instead of
+            scanning user_events for the highest event_id at startup
+        catch_up: With start_time, "stop" or "live" to backfill each shard up
+            to the present and then stop or continue in real time
+        disorder_config: Optional disorder_options() settings to deliver a
+            fraction of the events late and out of order
+        metrics_config: Optional metrics_options() settings for a Prometheus
+            endpoint and periodic summary line
+        log_interval: Minimum seconds between event log lines (0 logs every one)
+        profile_config: Optional profile_options() settings to time each stage
+            and print a breakdown at exit; with several workers each worker
+            profiles itself and writes its own files
+    """
+    sink_config = sink_config or {"kind": "postgres"}
+    shards = shards or workers
+    if load_dimensions and catalog is not None:
+        if not load_catalog_dimensions(catalog, sink_config, seed, start_time):
+            return
+    if workers > 1:
+        simulate_sharded_sessions(
+            workers,
+            interval=interval,
+            limit=limit,
+            batch_size=batch_size,
+            max_flush_delay=max_flush_delay,
+            sink_config=sink_config,
+            shards=shards,
+            seed=seed,
+            start_time=start_time,
+            engine_config=engine_config,
+            catalog=catalog,
+            lease_config=lease_config,
+            catch_up=catch_up,
+            disorder_config=disorder_config,
+            metrics_config=metrics_config,
+            profile_config=profile_config,
+        )
+        return
+
+    sink = None
+    batcher = None
+    store = None
+    metrics = None
+    profiler = open_profiler(profile_config)
+    try:
+        metrics = open_metrics(metrics_config)
+        sink = open_sink(conn_params=CONN_PARAMS, metrics=metrics, profiler=profiler, **sink_config)
+
+        ids = None
+        first_event_id = first_session_id = 1000
+        if lease_config and lease_config["kind"] != "none":
+            # Shards share leased ID blocks; no scan of user_events needed
+            store, ids = open_leased_ids(
+                lease_config, sink.cursor if isinstance(sink, PostgresSink) else None
+            )
+        else:
+            # Start above the highest existing event and session IDs, so a
+            # restart neither duplicates events nor merges sessions across runs
+            first_event_id = first_event_id_for(sink)
+            first_session_id = first_event_id_for(sink, "session_id")
 
-            # Wait for the specified interval
-            time.sleep(interval)
+        sink = open_disorder(sink, disorder_config)
+        batcher = EventBatcher(
+            sink,
+            batch_size=batch_size,
+            max_delay=max_flush_delay,
+            verbose=verbose,
+            log_interval=log_interval,
+            profiler=profiler,
+        )
+
+        print(
+            f"Starting e-commerce event simulation (interval: {interval}s, batch size: {batcher.batch_size})"
+        )
+        print("Press Ctrl+C to stop")
+
+        clocks = shard_clocks(range(shards), start_time, catch_up)
+        run_shards(
+            batcher,
+            [
+                make_shard(
+                    s,
+                    shards,
+                    first_event_id,
+                    interval,
+                    seed,
+                    start_time,
+                    engine_config,
+                    catalog,
+                    ids,
+                    clocks[s],
+                    first_session_id,
+                )
+                for s in range(shards)
+            ],
+            [shard_limit(limit, s, shards) for s in range(shards)],
+            interval,
+            SampledLog(log_interval, verbose, profiler),
+            clocks,
+            profiler,
+        )
+        with profiler.stage("sink"):
+            batcher.flush()
 
     except KeyboardInterrupt:
         print("\nEvent simulation stopped manually")
+        try:
+            if batcher is not None:
+                batcher.flush()
+        except Exception as e:
+            print(f"Error flushing final batch: {e}")
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        if "conn" in locals():
+        if batcher is not None:
+            batcher.report()
+        if store is not None:
+            store.close()
+        if sink is not None:
+            sink.close()
+            print("Sink closed")
+        if metrics is not None:
+            metrics.close()
+            print(metrics.summary())
+        profiler.close()
+
+
+def session_worker(
+    worker_index,
+    workers,
+    first_event_id,
+    first_session_id,
+    limit,
+    interval,
+    batch_size,
+    max_flush_delay,
+    stats_queue,
+    sink_config,
+    shards,
+    seed=None,
+    start_time=None,
+    engine_config=None,
+    catalog=None,
+    lease_config=None,
+    catch_up=None,
+    disorder_config=None,
+    profile_config=None,
+    report_interval=1.0,
+):
+    """
+    Generate a subset of the session shards in a child process.
+
+    Worker w runs shards w, w + workers, w + 2 * workers, ... with its own
+    sink (connection or output files) and, when leasing, its own ID leases,
+    and periodically posts its cumulative counters to stats_queue.
+    """
+    stats = {
+        "worker": worker_index,
+        "rows": 0,
+        "batches": 0,
+        "commit_seconds": 0.0,
+        # Commit latencies since the previous post, for the parent's metrics
+        "latencies": [],
+        "cpu_seconds": 0.0,
+        "errors": 0,
+        "error": None,
+        "done": False,
+    }
+    last_post = [time.perf_counter()]
+    posted_batches = [0]
+
+    def post(batcher):
+        now = time.perf_counter()
+        if stats["done"] or now - last_post[0] >= report_interval:
+            stats["rows"] = batcher.rows_written
+            stats["batches"] = batcher.batches
+            stats["latencies"] = batcher.commit_latencies[posted_batches[0] :]
+            stats["commit_seconds"] += sum(stats["latencies"])
+            stats["cpu_seconds"] = time.process_time()
+            posted_batches[0] = batcher.batches
+            stats_queue.put(dict(stats))
+            last_post[0] = now
+
+    my_shards = list(range(worker_index, shards, workers))
+    batcher = None
+    sink = None
+    store = None
+    profiler = open_profiler(profile_config, f"w{worker_index}")
+    try:
+        sink = open_sink(
+            conn_params=CONN_PARAMS, prefix=f"w{worker_index}-", profiler=profiler, **sink_config
+        )
+        ids = None
+        if lease_config and lease_config["kind"] != "none":
+            store, ids = open_leased_ids(
+                lease_config, sink.cursor if isinstance(sink, PostgresSink) else None
+            )
+        sink = open_disorder(sink, disorder_config, worker_index)
+        batcher = EventBatcher(
+            sink,
+            batch_size=batch_size,
+            max_delay=max_flush_delay,
+            verbose=False,
+            on_flush=post,
+            profiler=profiler,
+        )
+        clocks = shard_clocks(my_shards, start_time, catch_up, announce=worker_index == 0)
+        run_shards(
+            batcher,
+            [
+                make_shard(
+                    s,
+                    shards,
+                    first_event_id,
+                    interval,
+                    seed,
+                    start_time,
+                    engine_config,
+                    catalog,
+                    ids,
+                    clock,
+                    first_session_id,
+                )
+                for s, clock in zip(my_shards, clocks)
+            ],
+            [shard_limit(limit, s, shards) for s in my_shards],
+            interval,
+            None,
+            clocks,
+            profiler,
+        )
+        with profiler.stage("sink"):
+            batcher.flush()
+    except KeyboardInterrupt:
+        try:
+            if batcher is not None:
+                batcher.flush()
+        except Exception as e:
+            stats["errors"] += 1
+            stats["error"] = str(e)
+    except Exception as e:
+        stats["errors"] += 1
+        stats["error"] = str(e)
+    finally:
+        stats["done"] = True
+        if batcher is not None:
+            post(batcher)
+        else:
+            stats_queue.put(dict(stats))
+        if store is not None:
+            store.close()
+        if sink is not None:
+            sink.close()
+        profiler.close()
+
+
+def simulate_sharded_sessions(
+    workers,
+    interval=1.0,
+    limit=None,
+    batch_size=1,
+    max_flush_delay=1.0,
+    report_interval=5.0,
+    sink_config=None,
+    shards=None,
+    seed=None,
+    start_time=None,
+    engine_config=None,
+    catalog=None,
+    lease_config=None,
+    catch_up=None,
+    disorder_config=None,
+    metrics_config=None,
+    profile_config=None,
+):
+    """
+    Run session generation across several processes and aggregate their stats.
+
+    Args:
+        workers: Number of worker processes
+        interval: Time in seconds between event inserts, per worker
+        limit: Optional total number of events across all shards
+        batch_size: Number of events per multi-row INSERT and commit
+        max_flush_delay: Maximum time in seconds an event waits in a partial batch
+        report_interval: Seconds between aggregated throughput reports
+        sink_config: Optional open_sink() keyword arguments; file sinks get a
+            per-worker file prefix
+        shards: Number of session shards spread over the workers (default: workers)
+        seed: Optional seed for reproducible generation
+        start_time: Optional datetime to run each shard on simulated time
+        engine_config: Optional session engine settings, as for simulate_user_sessions
+        catalog: Optional Catalog of users and products shared by the workers
+        lease_config: Optional ID lease settings; each worker leases its own blocks
+        catch_up: Optional backfill mode for the shard clocks, as for
+            simulate_user_sessions
+        disorder_config: Optional disorder settings; each worker delays its
+            own events and reports its own watermark counts
+        metrics_config: Optional metrics settings; the endpoint and summary
+            run in this process, fed by the workers' posted counters
+        profile_config: Optional profile settings; each worker writes its
+            own breakdown and collapsed stacks, suffixed -w<index>
+    """
+    sink_config = sink_config or {"kind": "postgres"}
+    shards = max(shards or workers, workers)
+    first_event_id = first_session_id = 1000
+    leasing = lease_config and lease_config["kind"] != "none"
+    if sink_config["kind"] == "postgres" and not leasing:
+        conn = psycopg2.connect(**CONN_PARAMS)
+        try:
+            cursor = conn.cursor()
+            first_event_id = get_next_event_id(cursor)
+            first_session_id = get_next_event_id(cursor, "session_id")
+        finally:
             conn.close()
-            print("Connection closed")
+
+    stats_queue = multiprocessing.Queue()
+    processes = []
+    for w in range(workers):
+        process = multiprocessing.Process(
+            target=session_worker,
+            args=(
+                w,
+                workers,
+                first_event_id,
+                first_session_id,
+                limit,
+                interval,
+                batch_size,
+                max_flush_delay,
+                stats_queue,
+                sink_config,
+                shards,
+                seed,
+                start_time,
+                engine_config,
+                catalog,
+                lease_config,
+                catch_up,
+                disorder_config,
+                profile_config,
+            ),
+        )
+        process.start()
+        processes.append(process)
+
+    print(
+        f"Starting e-commerce event simulation ({workers} workers, {shards} shards, interval: {interval}s, batch size: {batch_size})"
+    )
+    print("Press Ctrl+C to stop")
+
+    latest = {}
+    metrics = open_metrics(metrics_config)
+    if metrics is not None:
+        metrics.set_cpu_clock(lambda: sum(s["cpu_seconds"] for s in list(latest.values())))
+    started_at = time.perf_counter()
+    last_report = started_at
+    last_rows = 0
+
+    def totals():
+        rows = sum(s["rows"] for s in latest.values())
+        batches = sum(s["batches"] for s in latest.values())
+        commit_seconds = sum(s["commit_seconds"] for s in latest.values())
+        errors = sum(s["errors"] for s in latest.values())
+        return rows, batches, commit_seconds, errors
+
+    def finished():
+        done = sum(1 for s in latest.values() if s["done"])
+        return done == workers or not any(p.is_alive() for p in processes)
+
+    while True:
+        try:
+            try:
+                stats = stats_queue.get(timeout=0.5)
+            except queue.Empty:
+                if finished() and stats_queue.empty():
+                    break
+                stats = None
+
+            if stats is not None:
+                if metrics is not None:
+                    previous = latest.get(stats["worker"])
+                    metrics.add_remote(
+                        USER_EVENTS.name,
+                        stats["rows"] - (previous["rows"] if previous else 0),
+                        stats["latencies"],
+                    )
+                latest[stats["worker"]] = stats
+                if stats["error"]:
+                    print(f"Worker {stats['worker']} error: {stats['error']}")
+                if finished() and stats_queue.empty():
+                    break
+
+            now = time.perf_counter()
+            if now - last_report >= report_interval:
+                rows, batches, _, errors = totals()
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] {rows} events written, "
+                    f"{(rows - last_rows) / (now - last_report):.0f} rows/sec, {errors} errors"
+                )
+                last_report = now
+                last_rows = rows
+        except KeyboardInterrupt:
+            # Workers receive the same interrupt and flush before reporting
+            print("\nEvent simulation stopped manually, waiting for workers")
+
+    for process in processes:
+        process.join()
+
+    elapsed = time.perf_counter() - started_at
+    rows, batches, commit_seconds, errors = totals()
+    print(
+        f"Wrote {rows} events in {batches} batches across {workers} workers "
+        f"({elapsed:.1f}s, {rows / elapsed if elapsed > 0 else 0:.0f} rows/sec, {errors} errors)"
+    )
+    if batches:
+        print(f"Average batch commit latency: {commit_seconds / batches * 1000:.1f} ms")
+    if metrics is not None:
+        metrics.close()
 
 
 if __name__ == "__main__":
@@ -358,10 +1108,164 @@ if __name__ == "__main__":
         default=None,
         help="Limit the number of events to insert (default: unlimited)",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Number of events per multi-row insert and commit (default: 1)",
+    )
+    parser.add_argument(
+        "--max-flush-delay",
+        type=float,
+        default=1.0,
+        help="Maximum seconds an event waits before its batch is flushed (default: 1.0)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of generator processes, each with its own connection (default: 1)",
+    )
     parser.add_argument("--quiet", action="store_true", help="Reduce output verbosity")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Number of independent session streams; with --seed the output depends only "
+        "on the shard count, not on --workers (default: same as --workers)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["classic", "batch"],
+        default="classic",
+        help="Event generator: per-event generate_random_event, or the vectorized "
+        "table-driven session engine (requires numpy) (default: classic)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1000,
+        help="Live sessions per shard advanced together by the batch engine (default: 1000)",
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=10,
+        help="Concurrent sessions per shard for the classic generator (default: 10)",
+    )
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        default=None,
+        help="Expire classic-generator sessions idle for this many seconds of event time "
+        "(default: never)",
+    )
+    parser.add_argument(
+        "--funnel",
+        default=None,
+        help="JSON file of funnel transition weights for the batch engine",
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=None,
+        help="Number of users in a generated catalog (default: the ten built-in users)",
+    )
+    parser.add_argument(
+        "--products",
+        type=int,
+        default=None,
+        help="Number of products in a generated catalog (default: the ten built-in products)",
+    )
+    parser.add_argument(
+        "--user-skew",
+        type=float,
+        default=0.0,
+        help="Zipf exponent of user activity, 0 for uniform (default: 0.0)",
+    )
+    parser.add_argument(
+        "--product-skew",
+        type=float,
+        default=0.0,
+        help="Zipf exponent of product popularity, 0 for uniform (default: 0.0)",
+    )
+    parser.add_argument(
+        "--load-dimensions",
+        action="store_true",
+        help="Bulk-load matching `products` and `users` rows before generating events",
+    )
+    add_seed_argument(parser)
+    add_clock_arguments(parser)
+    add_sink_arguments(parser)
+    add_lease_arguments(parser)
+    add_disorder_arguments(parser)
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    try:
+        start_time, catch_up = clock_options(args, args.interval)
+        disorder_config = disorder_options(args)
+        profile_config = profile_options(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    catalog = None
+    if (
+        args.users is not None
+        or args.products is not None
+        or args.user_skew
+        or args.product_skew
+        or args.load_dimensions
+    ):
+        from catalog import Catalog
+
+        try:
+            catalog = Catalog(
+                users=args.users or len(USER_IDS),
+                products=args.products or len(PRODUCT_IDS),
+                user_skew=args.user_skew,
+                product_skew=args.product_skew,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+
+    engine_config = {
+        "kind": "classic",
+        "max_sessions": args.max_sessions,
+        "session_ttl": args.session_ttl,
+    }
+    if args.engine == "batch":
+        from session_engine import load_funnel
+
+        try:
+            funnel = load_funnel(args.funnel)
+        except (OSError, ValueError) as e:
+            parser.error(f"--funnel: {e}")
+        engine_config = {
+            "kind": "batch",
+            "concurrency": args.concurrency,
+            "funnel": funnel,
+        }
 
     simulate_user_sessions(
-        interval=args.interval, limit=args.limit, verbose=not args.quiet
+        interval=args.interval,
+        limit=args.limit,
+        verbose=not args.quiet,
+        batch_size=args.batch_size,
+        max_flush_delay=args.max_flush_delay,
+        workers=args.workers,
+        sink_config=sink_options(args),
+        shards=args.shards,
+        seed=args.seed,
+        start_time=start_time,
+        engine_config=engine_config,
+        catalog=catalog,
+        load_dimensions=args.load_dimensions,
+        lease_config=lease_options(args),
+        catch_up=catch_up,
+        disorder_config=disorder_config,
+        metrics_config=metrics_options(args),
+        log_interval=args.log_interval,
+        profile_config=profile_config,
     )
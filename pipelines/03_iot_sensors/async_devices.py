@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Asynchronous IoT Device Simulator
+
+Models every sensor as an independent asyncio task with its own reporting
+period and jitter, the way real devices report. Readings from all devices feed
+a shared writer that multiplexes them over a small pool of database
+connections, so tens of thousands of devices can be simulated without a thread
+per device. Each reading is timestamped when it is produced, and the writer
+reports end-to-end latency from production to commit.
+
+psycopg2 is blocking, so each pooled connection runs its inserts on a
+dedicated worker thread via run_in_executor. When a connection drops, its
+consumer reopens it with exponential backoff and retries the batch, so a
+RisingWave restart stalls the devices instead of ending the run.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extras
+
+from fleet import TEMPLATE_IDS, fleet_sensor_id
+from simlib.rng import add_seed_argument, stream_rng
+from simlib.stats import percentile
+from simlib.writer import Backoff
+from simulate_readings import (
+    CONN_PARAMS,
+    READING_UNITS,
+    SENSOR_BATTERY,
+    SENSOR_READINGS,
+    SENSOR_TYPES,
+    generate_additional_data,
+    get_reading_value,
+    get_signal_strength,
+    get_time_of_day_factor,
+)
+
+SOLAR_TEMPLATES = {"S002", "S005", "S010"}
+
+
+class VirtualDevice:
+    """A single simulated sensor with its own cadence and battery"""
+
+    def __init__(self, index, period, jitter, rng):
+        self.index = index
+        self.rng = rng
+        self.sensor_id = fleet_sensor_id(index)
+        self.template = TEMPLATE_IDS[index % len(TEMPLATE_IDS)]
+        self.readings = SENSOR_TYPES[self.template]["readings"]
+        self.battery = SENSOR_BATTERY[self.template]
+        self.period = period
+        self.jitter = jitter
+        self.counter = 0
+
+    def update_battery(self):
+        """Same rules as get_battery_level, with per-device state"""
+        if self.template in SOLAR_TEMPLATES:
+            change = 0.1 * get_time_of_day_factor()
+            self.battery = min(100, max(1, self.battery + change))
+        else:
+            self.battery = max(1, self.battery - self.rng.uniform(0.01, 0.05))
+        return self.battery
+
+    def reading(self):
+        """Produce one sensor_readings row"""
+        rng = self.rng
+        reading_type = rng.choice(self.readings)
+        self.counter += 1
+        return (
+            f"{reading_type[0].upper()}{self.index + 1}_{self.counter}",
+            self.sensor_id,
+            reading_type,
+            get_reading_value(self.template, reading_type, rng),
+            READING_UNITS.get(reading_type, ""),
+            self.update_battery(),
+            get_signal_strength(self.template, rng),
+            datetime.now(),
+            generate_additional_data(self.template, reading_type, rng),
+        )
+
+    async def run(self, queue, stop):
+        """Report on this device's own schedule until stopped"""
+        # Stagger start-up so devices don't report in lockstep
+        await asyncio.sleep(self.rng.uniform(0, self.period))
+        next_due = time.monotonic()
+        while not stop.is_set():
+            await queue.put((time.perf_counter(), self.reading()))
+            next_due += self.period
+            delay = next_due - time.monotonic() + self.rng.uniform(-self.jitter, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+class AsyncWriter:
+    """
+    Drain a shared queue of readings over a small pool of connections.
+
+    Each connection has its own consumer task and worker thread; a consumer
+    takes whatever is queued (up to batch_size), writes it with one multi-row
+    INSERT and commit, and records production-to-commit latency per row.
+    A consumer whose connection fails reconnects and retries the batch until
+    stop() is called; a batch failing with any other error is dropped.
+    """
+
+    def __init__(self, queue, pool_size=4, batch_size=1000):
+        self.queue = queue
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.connections = []
+        self.stopping = False
+        self.rows_written = 0
+        self.errors = 0
+        self.window_latencies = []
+
+    def connect(self):
+        self.connections = [psycopg2.connect(**CONN_PARAMS) for _ in range(self.pool_size)]
+
+    def stop(self):
+        """Stop retrying lost connections, so the queue can drain at shutdown"""
+        self.stopping = True
+
+    def close(self):
+        for index in range(len(self.connections)):
+            self._discard(index)
+        self.executor.shutdown(wait=True)
+
+    def _discard(self, index):
+        """Close a connection that may already be broken"""
+        conn = self.connections[index]
+        self.connections[index] = None
+        if conn is not None:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    @staticmethod
+    def _write(conn, rows):
+        cursor = conn.cursor()
+        psycopg2.extras.execute_values(
+            cursor, SENSOR_READINGS.insert_sql, rows, page_size=len(rows)
+        )
+        conn.commit()
+
+    async def _write_batch(self, index, rows):
+        """Write rows on connection index, reconnecting and retrying while it is down"""
+        loop = asyncio.get_running_loop()
+        backoff = Backoff()
+        while True:
+            try:
+                if self.connections[index] is None:
+                    self.connections[index] = await loop.run_in_executor(
+                        self.executor, lambda: psycopg2.connect(**CONN_PARAMS)
+                    )
+                await loop.run_in_executor(
+                    self.executor, self._write, self.connections[index], rows
+                )
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # The connection is gone: reopen it and retry the same batch;
+                # sensor_readings has a primary key, so a retry can't duplicate
+                self._discard(index)
+                if self.stopping:
+                    raise
+                self.errors += 1
+                print(f"Connection lost, reconnecting: {str(e).strip()}")
+                await asyncio.sleep(backoff.next())
+
+    async def consume(self, index):
+        while True:
+            items = [await self.queue.get()]
+            while len(items) < self.batch_size and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+
+            try:
+                await self._write_batch(index, [row for _, row in items])
+            except Exception as e:
+                self.errors += 1
+                print(f"Error: {e}")
+                conn = self.connections[index]
+                if conn is not None:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        self._discard(index)
+            else:
+                done = time.perf_counter()
+                self.rows_written += len(items)
+                self.window_latencies.extend(done - produced for produced, _ in items)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def start(self):
+        return [asyncio.create_task(self.consume(i)) for i in range(len(self.connections))]
+
+    def take_latencies(self):
+        latencies = sorted(self.window_latencies)
+        self.window_latencies = []
+        return latencies
+
+
+async def run_devices(
+    devices=1000,
+    period=5.0,
+    jitter=0.5,
+    pool_size=4,
+    batch_size=1000,
+    duration=None,
+    report_interval=5.0,
+    seed=None,
+):
+    """
+    Simulate many independently reporting devices.
+
+    Args:
+        devices: Number of virtual devices
+        period: Mean reporting period per device in seconds
+        jitter: Maximum random deviation from each device's schedule in seconds
+        pool_size: Number of database connections shared by all devices
+        batch_size: Maximum rows per multi-row INSERT and commit
+        duration: Optional run time in seconds (None for infinite)
+        report_interval: Seconds between throughput and latency reports
+        seed: Optional seed for the devices' cadences and reading values
+    """
+    queue = asyncio.Queue(maxsize=max(batch_size * pool_size * 4, devices))
+    stop = asyncio.Event()
+    writer = AsyncWriter(queue, pool_size=pool_size, batch_size=batch_size)
+    writer.connect()
+    rng = stream_rng(seed, "devices")
+
+    # Spread cadences +/-20% around the mean so devices drift independently
+    fleet = [
+        VirtualDevice(i, period * rng.uniform(0.8, 1.2), jitter, rng)
+        for i in range(devices)
+    ]
+    device_tasks = [asyncio.create_task(d.run(queue, stop)) for d in fleet]
+    writer_tasks = writer.start()
+
+    print(
+        f"Starting async IoT simulation ({devices} devices, period: {period}s, pool: {pool_size} connections)"
+    )
+    print("Press Ctrl+C to stop")
+
+    started_at = time.perf_counter()
+    last_report = started_at
+    last_rows = 0
+    try:
+        while duration is None or time.perf_counter() - started_at < duration:
+            await asyncio.sleep(report_interval)
+            now = time.perf_counter()
+            latencies = writer.take_latencies()
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] "
+                f"{(writer.rows_written - last_rows) / (now - last_report):.0f} rows/sec, "
+                f"queue {queue.qsize()}, write latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+                f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+                f"max {percentile(latencies, 1.0) * 1000:.1f} ms, errors {writer.errors}"
+            )
+            last_report = now
+            last_rows = writer.rows_written
+    finally:
+        stop.set()
+        for task in device_tasks:
+            task.cancel()
+        await asyncio.gather(*device_tasks, return_exceptions=True)
+        writer.stop()
+        await queue.join()
+        for task in writer_tasks:
+            task.cancel()
+        await asyncio.gather(*writer_tasks, return_exceptions=True)
+        writer.close()
+
+        elapsed = time.perf_counter() - started_at
+        print(
+            f"Inserted {writer.rows_written} readings in {elapsed:.1f}s "
+            f"({writer.rows_written / elapsed if elapsed > 0 else 0:.0f} readings/sec, {writer.errors} errors)"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Simulate many independently reporting IoT devices with asyncio"
+    )
+    parser.add_argument(
+        "--devices",
+        type=int,
+        default=1000,
+        help="Number of virtual devices (default: 1000)",
+    )
+    parser.add_argument(
+        "--period",
+        type=float,
+        default=5.0,
+        help="Mean reporting period per device in seconds (default: 5.0)",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.5,
+        help="Maximum deviation from each device's schedule in seconds (default: 0.5)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=4,
+        help="Number of database connections (default: 4)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Maximum rows per multi-row insert and commit (default: 1000)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Run time in seconds (default: unlimited)",
+    )
+    add_seed_argument(parser)
+
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(
+            run_devices(
+                devices=args.devices,
+                period=args.period,
+                jitter=args.jitter,
+                pool_size=args.pool_size,
+                batch_size=args.batch_size,
+                duration=args.duration,
+                seed=args.seed,
+            )
+        )
+    except KeyboardInterrupt:
+        print("\nDevice simulation stopped manually")
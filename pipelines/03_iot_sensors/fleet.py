@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+Vectorized IoT Sensor Fleet
+
+A struct-of-arrays model of a large sensor fleet. Every sensor is a clone of
+one of the ten template sensors in simulate_readings.py (S001-S010), and all
+per-sensor state (template, battery level, reading counter) lives in NumPy
+arrays so that a full tick of readings for 10^5-10^6 sensors is generated in a
+handful of vectorized operations instead of one Python call per reading.
+
+The value model mirrors get_reading_value, get_battery_level and
+get_signal_strength: the same diurnal time-of-day factor, the same per-type
+variation and noise ranges, and the same anomaly spikes on S003-style sensors.
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from simlib.clock import add_clock_arguments, clock_options, make_clock
+from simlib.disorder import add_disorder_arguments, disorder_options, open_disorder
+from simlib.metrics import SampledLog, add_metrics_arguments, metrics_options, open_metrics
+from simlib.profile import NULL_PROFILER, add_profile_arguments, open_profiler, profile_options
+from simlib.rng import add_seed_argument, numpy_stream_rng, stream_rng
+from simlib.sinks import PostgresSink, add_sink_arguments, open_sink, sink_options
+from simulate_readings import (
+    ALERTS,
+    BASELINE_VALUES,
+    CONN_PARAMS,
+    MAINTENANCE_EVENTS,
+    PAYLOADS,
+    READING_UNITS,
+    SENSOR_BATTERY,
+    SENSOR_READINGS,
+    SENSOR_TYPES,
+)
+
+# Template sensors, in ID order; fleet sensor i is a clone of TEMPLATE_IDS[i % 10]
+TEMPLATE_IDS = sorted(SENSOR_TYPES)
+
+# Reading types in a fixed order so they can be addressed by index
+READING_TYPES = list(READING_UNITS)
+READING_TYPE_INDEX = {name: i for i, name in enumerate(READING_TYPES)}
+
+# Per reading type: (time-of-day coefficient, noise half-width) as in get_reading_value
+VARIATION_PARAMS = {
+    "temperature": (4.0, 0.3),
+    "humidity": (-10.0, 2.5),
+    "pressure": (0.0, 3.0),
+    "air_quality": (10.0, 4.0),
+    "soil_moisture": (0.0, 2.5),
+    "soil_ph": (0.0, 0.15),
+    "soil_temperature": (2.0, 0.2),
+    "water_temperature": (1.0, 0.2),
+    "dissolved_oxygen": (-0.5, 0.3),
+    "ph": (0.0, 0.2),
+    "turbidity": (0.0, 1.0),
+    "wind_speed": (3.0, 2.0),
+}
+
+# Anomaly spikes injected on anomaly-prone sensors (S003 in the original model)
+ANOMALY_SPIKES = {"temperature": 8.0, "air_quality": 30.0}
+ANOMALY_PROBABILITY = 0.05
+ANOMALY_PRONE_TEMPLATES = {"S003"}
+
+# Solar-powered templates charge during the day instead of draining
+SOLAR_TEMPLATES = {"S002", "S005", "S010"}
+
+# Base signal strengths, as in get_signal_strength
+BASE_SIGNAL_STRENGTH = {
+    "S001": -55,
+    "S002": -65,
+    "S003": -75,
+    "S004": -60,
+    "S005": -70,
+    "S006": -65,
+    "S007": -72,
+    "S008": -68,
+    "S009": -80,
+    "S010": -62,
+}
+
+MAX_READINGS_PER_SENSOR = max(len(t["readings"]) for t in SENSOR_TYPES.values())
+
+
+def time_of_day_factor(moment):
+    """Same diurnal curve as get_time_of_day_factor, for an explicit timestamp"""
+    return math.sin(math.pi * moment.hour / 12)
+
+
+def fleet_sensor_id(index):
+    """Sensor ID for the fleet member at a zero-based index (S001, S002, ...)"""
+    return f"S{index + 1:03d}"
+
+
+def _template_tables():
+    """Build the per-template lookup arrays shared by every fleet"""
+    n_templates = len(TEMPLATE_IDS)
+    n_types = len(READING_TYPES)
+
+    baselines = np.zeros((n_templates, n_types))
+    reading_table = np.zeros((n_templates, MAX_READINGS_PER_SENSOR), dtype=np.int8)
+    reading_counts = np.zeros(n_templates, dtype=np.int8)
+    for t, sensor_id in enumerate(TEMPLATE_IDS):
+        for r, reading_type in enumerate(READING_TYPES):
+            baselines[t, r] = BASELINE_VALUES.get(reading_type, {}).get(sensor_id, 0)
+        readings = [READING_TYPE_INDEX[name] for name in SENSOR_TYPES[sensor_id]["readings"]]
+        reading_table[t, : len(readings)] = readings
+        reading_counts[t] = len(readings)
+
+    time_coef = np.array([VARIATION_PARAMS[name][0] for name in READING_TYPES])
+    noise = np.array([VARIATION_PARAMS[name][1] for name in READING_TYPES])
+    spikes = np.array([ANOMALY_SPIKES.get(name, 0.0) for name in READING_TYPES])
+
+    initial_battery = np.array([SENSOR_BATTERY[s] for s in TEMPLATE_IDS])
+    signal_base = np.array([BASE_SIGNAL_STRENGTH[s] for s in TEMPLATE_IDS], dtype=np.int16)
+    solar = np.array([s in SOLAR_TEMPLATES for s in TEMPLATE_IDS])
+    anomaly_prone = np.array([s in ANOMALY_PRONE_TEMPLATES for s in TEMPLATE_IDS])
+
+    return {
+        "baselines": baselines,
+        "reading_table": reading_table,
+        "reading_counts": reading_counts,
+        "time_coef": time_coef,
+        "noise": noise,
+        "spikes": spikes,
+        "initial_battery": initial_battery,
+        "signal_base": signal_base,
+        "solar": solar,
+        "anomaly_prone": anomaly_prone,
+    }
+
+
+class FleetTick:
+    """One reading per sensor, held as parallel arrays"""
+
+    __slots__ = (
+        "reading_time",
+        "sensor_index",
+        "reading_type",
+        "reading_value",
+        "battery_level",
+        "signal_strength",
+        "reading_seq",
+    )
+
+    def __init__(
+        self,
+        reading_time,
+        sensor_index,
+        reading_type,
+        reading_value,
+        battery_level,
+        signal_strength,
+        reading_seq,
+    ):
+        self.reading_time = reading_time
+        self.sensor_index = sensor_index
+        self.reading_type = reading_type
+        self.reading_value = reading_value
+        self.battery_level = battery_level
+        self.signal_strength = signal_strength
+        self.reading_seq = reading_seq
+
+    def __len__(self):
+        return len(self.sensor_index)
+
+
+class SensorFleet:
+    """
+    Struct-of-arrays fleet of simulated sensors.
+
+    Args:
+        size: Number of sensors in the fleet
+        rng: Optional numpy Generator (default: a fresh unseeded generator)
+        payload_rng: Optional random.Random used for reading_data payloads
+        profiler: Optional Profiler timing payload serialization
+    """
+
+    def __init__(self, size, rng=None, payload_rng=None, profiler=NULL_PROFILER):
+        self.size = size
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.payload_rng = payload_rng if payload_rng is not None else random.Random()
+        self.profiler = profiler
+        self.tables = _template_tables()
+
+        index = np.arange(size)
+        self.template = (index % len(TEMPLATE_IDS)).astype(np.int8)
+        self.solar = self.tables["solar"][self.template]
+        self.anomaly_prone = self.tables["anomaly_prone"][self.template]
+        self.battery = self.tables["initial_battery"][self.template].copy()
+        self.signal_base = self.tables["signal_base"][self.template]
+        # Per-sensor reading counters, starting where the original model starts
+        self.reading_counters = ((self.template.astype(np.int64) + 1) * 10000).copy()
+
+    def tick(self, reading_time):
+        """Generate one reading for every sensor at the given timestamp"""
+        tables = self.tables
+        rng = self.rng
+        n = self.size
+        time_factor = time_of_day_factor(reading_time)
+
+        # Pick one of each sensor's reading types uniformly
+        counts = tables["reading_counts"][self.template]
+        choice = (rng.random(n) * counts).astype(np.int8)
+        reading_type = tables["reading_table"][self.template, choice]
+
+        # Baseline + diurnal variation + uniform noise
+        baseline = tables["baselines"][self.template, reading_type]
+        noise = tables["noise"][reading_type]
+        values = (
+            baseline
+            + tables["time_coef"][reading_type] * time_factor
+            + (rng.random(n) * 2 - 1) * noise
+        )
+
+        # Occasional spikes on anomaly-prone sensors
+        spikes = tables["spikes"][reading_type]
+        anomalies = self.anomaly_prone & (spikes > 0) & (rng.random(n) < ANOMALY_PROBABILITY)
+        values[anomalies] += spikes[anomalies]
+
+        # Solar batteries follow the sun, the rest drain slowly
+        drain = rng.uniform(0.01, 0.05, n)
+        self.battery = np.where(
+            self.solar,
+            np.clip(self.battery + 0.1 * time_factor, 1, 100),
+            np.maximum(1, self.battery - drain),
+        )
+
+        signal = self.signal_base + rng.integers(-5, 6, n, dtype=np.int16)
+
+        seq = self.reading_counters.copy()
+        self.reading_counters += 1
+
+        return FleetTick(
+            reading_time,
+            np.arange(n),
+            reading_type,
+            values,
+            self.battery.copy(),
+            signal,
+            seq,
+        )
+
+    def replace_batteries(self, indices):
+        """Reset battery levels after a battery replacement"""
+        self.battery[indices] = self.rng.uniform(90, 100, len(indices))
+
+    def rows(self, tick, start=0, stop=None):
+        """
+        Yield sensor_readings rows for a slice of a tick.
+
+        The rows have the same shape and column order as the INSERT in
+        simulate_sensor_readings.
+        """
+        stop = len(tick) if stop is None else stop
+        indices = tick.sensor_index[start:stop].tolist()
+        types = tick.reading_type[start:stop].tolist()
+        values = tick.reading_value[start:stop].tolist()
+        batteries = tick.battery_level[start:stop].tolist()
+        signals = tick.signal_strength[start:stop].tolist()
+        seqs = tick.reading_seq[start:stop].tolist()
+        templates = self.template[start:stop].tolist()
+        types = [READING_TYPES[r] for r in types]
+        with self.profiler.stage("serialize"):
+            payloads = PAYLOADS.encode_batch(
+                zip([TEMPLATE_IDS[t] for t in templates], types), self.payload_rng
+            )
+
+        for i, reading_type, value, battery, signal, seq, payload in zip(
+            indices, types, values, batteries, signals, seqs, payloads
+        ):
+            yield (
+                f"{reading_type[0].upper()}{i + 1}_{seq}",
+                fleet_sensor_id(i),
+                reading_type,
+                value,
+                READING_UNITS[reading_type],
+                battery,
+                signal,
+                tick.reading_time,
+                payload,
+            )
+
+
+# Clones the template sensors' metadata so fleet readings join with `sensors`
+REGISTER_FLEET_SQL = """
+    INSERT INTO sensors
+    (sensor_id, sensor_type, location_name, latitude, longitude, elevation,
+     installation_date, manufacturer, model, firmware_version, battery_type, status)
+    SELECT
+        'S' || CASE WHEN g < 100 THEN LPAD(CAST(g AS VARCHAR), 3, '0') ELSE CAST(g AS VARCHAR) END,
+        s.sensor_type, s.location_name, s.latitude, s.longitude, s.elevation,
+        s.installation_date, s.manufacturer, s.model, s.firmware_version, s.battery_type, s.status
+    FROM
+        GENERATE_SERIES(%s, %s) AS g
+    JOIN
+        sensors s ON s.sensor_id = 'S' || LPAD(CAST((g - 1) %% 10 + 1 AS VARCHAR), 3, '0')
+"""
+
+
+def register_fleet_sensors(cursor, size):
+    """Insert `sensors` rows for fleet members beyond the ten template sensors"""
+    if size > len(TEMPLATE_IDS):
+        cursor.execute(REGISTER_FLEET_SQL, (len(TEMPLATE_IDS) + 1, size))
+
+
+MAINTENANCE_EVENT_TYPES = [
+    "battery_replacement",
+    "calibration",
+    "cleaning",
+    "firmware_update",
+]
+
+
+def tick_alerts(fleet, tick):
+    """Build alert rows for a tick, with the same triggers as the serial simulator"""
+    rng = fleet.rng
+    n = len(tick)
+    stamp = int(tick.reading_time.timestamp() * 1000)
+    rows = []
+
+    low_battery = np.flatnonzero((tick.battery_level < 20) & (rng.random(n) < 0.3))
+    for i, battery in zip(low_battery.tolist(), tick.battery_level[low_battery].tolist()):
+        rows.append(
+            (
+                f"A{stamp}_{i + 1}_B",
+                fleet_sensor_id(i),
+                "low_battery",
+                "warning",
+                tick.reading_time,
+                False,
+                f"Battery level below 20% ({battery:.1f}%)",
+            )
+        )
+
+    temperature = READING_TYPE_INDEX["temperature"]
+    threshold = fleet.tables["baselines"][fleet.template, temperature] + 8
+    spikes = np.flatnonzero(
+        (tick.reading_type == temperature)
+        & (tick.reading_value > threshold)
+        & (rng.random(n) < 0.5)
+    )
+    for i, value in zip(spikes.tolist(), tick.reading_value[spikes].tolist()):
+        rows.append(
+            (
+                f"A{stamp}_{i + 1}_T",
+                fleet_sensor_id(i),
+                "high_temperature",
+                "warning",
+                tick.reading_time,
+                False,
+                f"Temperature spike detected: {value:.1f}°C",
+            )
+        )
+
+    return rows
+
+
+def tick_maintenance(fleet, tick):
+    """Build maintenance rows for a tick (1% of sensors) and reset replaced batteries"""
+    rng = fleet.rng
+    stamp = int(tick.reading_time.timestamp() * 1000)
+    selected = np.flatnonzero(rng.random(len(tick)) < 0.01)
+    event_types = rng.integers(0, len(MAINTENANCE_EVENT_TYPES), len(selected))
+    technicians = rng.integers(1, 6, len(selected))
+
+    rows = []
+    replaced = []
+    for i, e, tech in zip(selected.tolist(), event_types.tolist(), technicians.tolist()):
+        event_type = MAINTENANCE_EVENT_TYPES[e]
+        rows.append(
+            (
+                f"M{stamp}_{i + 1}",
+                fleet_sensor_id(i),
+                event_type,
+                f"T{tech:03d}",
+                tick.reading_time,
+                f"Scheduled {event_type}",
+            )
+        )
+        if event_type == "battery_replacement":
+            replaced.append(i)
+
+    if replaced:
+        fleet.replace_batteries(np.array(replaced))
+    return rows
+
+
+def simulate_fleet(
+    size,
+    interval=5.0,
+    ticks=None,
+    batch_size=5000,
+    register_sensors=False,
+    verbose=True,
+    sink_config=None,
+    seed=None,
+    start_time=None,
+    catch_up=None,
+    disorder_config=None,
+    metrics_config=None,
+    log_interval=1.0,
+    profile_config=None,
+):
+    """
+    Simulate a large sensor fleet, emitting one reading per sensor every tick.
+
+    Args:
+        size: Number of sensors in the fleet
+        interval: Time in seconds between ticks (measured start to start)
+        ticks: Optional limit to number of ticks (None for infinite)
+        batch_size: Number of rows per multi-row INSERT and commit
+        register_sensors: Insert `sensors` rows for fleet members beyond S010
+        verbose: Whether to print per-tick details
+        sink_config: Optional open_sink() keyword arguments (default: insert into RisingWave)
+        seed: Optional seed for reproducible generation
+        start_time: Optional datetime; use simulated time from here, advancing
+            by interval per tick, instead of the wall clock
+        catch_up: With start_time, "stop" or "live" to backfill up to the
+            present and then stop or continue in real time
+        disorder_config: Optional disorder_options() settings to deliver a
+            fraction of the readings late and out of order
+        metrics_config: Optional metrics_options() settings for a Prometheus
+            endpoint and periodic summary line
+        log_interval: Minimum seconds between tick log lines (0 logs every tick)
+        profile_config: Optional profile_options() settings to time each stage
+            and print a breakdown at exit
+    """
+    clock = make_clock(start_time, catch_up)
+    profiler = open_profiler(profile_config)
+    log = SampledLog(log_interval, verbose, profiler)
+    sink = None
+    metrics = None
+    try:
+        metrics = open_metrics(metrics_config)
+        sink = open_sink(
+            conn_params=CONN_PARAMS,
+            metrics=metrics,
+            profiler=profiler,
+            **(sink_config or {"kind": "postgres"}),
+        )
+
+        if register_sensors and isinstance(sink, PostgresSink):
+            register_fleet_sensors(sink.cursor, size)
+            sink.conn.commit()
+        sink = open_disorder(sink, disorder_config)
+
+        fleet = SensorFleet(
+            size,
+            numpy_stream_rng(seed, "fleet"),
+            payload_rng=stream_rng(seed, "fleet", "payload"),
+            profiler=profiler,
+        )
+        tick_count = 0
+        total_rows = 0
+        started_at = time.perf_counter()
+
+        print(f"Starting IoT fleet simulation ({size} sensors, interval: {interval}s)")
+        print("Press Ctrl+C to stop")
+
+        while (ticks is None or tick_count < ticks) and not clock.expired:
+            tick_start = time.perf_counter()
+
+            with profiler.stage("generate"):
+                tick = fleet.tick(clock.now())
+            generated_at = time.perf_counter()
+
+            with profiler.stage("generate"):
+                alerts = tick_alerts(fleet, tick)
+                maintenance = tick_maintenance(fleet, tick)
+
+            # The tick's alerts and maintenance events commit with its last batch of readings
+            starts = range(0, len(tick), batch_size)
+            for start in starts:
+                with profiler.stage("generate"):
+                    rows = list(fleet.rows(tick, start, start + batch_size))
+                batches = [(SENSOR_READINGS, rows)]
+                if start == starts[-1]:
+                    batches += [(ALERTS, alerts), (MAINTENANCE_EVENTS, maintenance)]
+                with profiler.stage("sink"):
+                    sink.write_tables(batches)
+
+            tick_count += 1
+            total_rows += len(tick)
+            tick_end = time.perf_counter()
+
+            if log.ready():
+                log.print(
+                    f"[{tick.reading_time.strftime('%H:%M:%S')}] Tick {tick_count}: "
+                    f"{len(tick)} readings, {len(alerts)} alerts, {len(maintenance)} maintenance events "
+                    f"(generate {(generated_at - tick_start) * 1000:.0f} ms, "
+                    f"write {(tick_end - generated_at) * 1000:.0f} ms)"
+                )
+
+            # Sleep only for what is left of the interval
+            if clock.simulated:
+                clock.advance(interval)
+            else:
+                with profiler.stage("sleep"):
+                    clock.sleep(interval - (tick_end - tick_start))
+
+        elapsed = time.perf_counter() - started_at
+        print(
+            f"Inserted {total_rows} readings in {tick_count} ticks "
+            f"({total_rows / elapsed if elapsed > 0 else 0:.0f} readings/sec)"
+        )
+
+    except KeyboardInterrupt:
+        print("\nFleet simulation stopped manually")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if sink is not None:
+            sink.close()
+            print("Sink closed")
+        if metrics is not None:
+            metrics.close()
+            print(metrics.summary())
+        profiler.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Simulate a large IoT sensor fleet with vectorized generation"
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=100000,
+        help="Number of sensors in the fleet (default: 100000)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="Time in seconds between ticks (default: 5.0)",
+    )
+    parser.add_argument(
+        "--ticks",
+        type=int,
+        default=None,
+        help="Limit the number of ticks (default: unlimited)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Number of rows per multi-row insert and commit (default: 5000)",
+    )
+    parser.add_argument(
+        "--register-sensors",
+        action="store_true",
+        help="Clone template sensor metadata into `sensors` for the whole fleet",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Reduce output verbosity")
+    add_seed_argument(parser)
+    add_clock_arguments(parser)
+    add_sink_arguments(parser)
+    add_disorder_arguments(parser)
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    try:
+        start_time, catch_up = clock_options(args, args.interval)
+        disorder_config = disorder_options(args)
+        profile_config = profile_options(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    simulate_fleet(
+        args.size,
+        interval=args.interval,
+        ticks=args.ticks,
+        batch_size=args.batch_size,
+        register_sensors=args.register_sensors,
+        verbose=not args.quiet,
+        sink_config=sink_options(args),
+        seed=args.seed,
+        start_time=start_time,
+        catch_up=catch_up,
+        disorder_config=disorder_config,
+        metrics_config=metrics_options(args),
+        log_interval=args.log_interval,
+        profile_config=profile_config,
+    )
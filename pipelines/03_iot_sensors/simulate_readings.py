@@ -7,13 +7,24 @@ random but realistic data for various sensor types. It's useful for testing
 the RisingWave pipeline with streaming data.
 """
 
-import psycopg2
+import os
+import sys
 import time
 import random
 import json
 import math
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from simlib.clock import add_clock_arguments, clock_options, make_clock
+from simlib.disorder import add_disorder_arguments, disorder_options, open_disorder
+from simlib.metrics import SampledLog, add_metrics_arguments, metrics_options, open_metrics
+from simlib.profile import add_profile_arguments, open_profiler, profile_options
+from simlib.rate import TokenBucket, parse_rate
+from simlib.rng import add_seed_argument, stream_rng
+from simlib.sinks import MultiTableBatcher, Table, add_sink_arguments, open_sink, sink_options
+
 # Connection parameters
 CONN_PARAMS = {
     "host": "localhost",  # Change as needed
@@ -23,6 +34,48 @@ CONN_PARAMS = {
     "password": "",  # Default has no password
 }
 
+SENSOR_READINGS = Table(
+    "sensor_readings",
+    [
+        ("reading_id", "varchar"),
+        ("sensor_id", "varchar"),
+        ("reading_type", "varchar"),
+        ("reading_value", "double"),
+        ("reading_unit", "varchar"),
+        ("battery_level", "double"),
+        ("signal_strength", "int"),
+        ("reading_time", "timestamp"),
+        ("reading_data", "jsonb"),
+    ],
+    event_time="reading_time",
+    watermark_delay=60.0,
+)
+
+ALERTS = Table(
+    "alerts",
+    [
+        ("alert_id", "varchar"),
+        ("sensor_id", "varchar"),
+        ("alert_type", "varchar"),
+        ("severity", "varchar"),
+        ("alert_time", "timestamp"),
+        ("is_resolved", "boolean"),
+        ("notes", "varchar"),
+    ],
+)
+
+MAINTENANCE_EVENTS = Table(
+    "maintenance_events",
+    [
+        ("event_id", "varchar"),
+        ("sensor_id", "varchar"),
+        ("event_type", "varchar"),
+        ("technician_id", "varchar"),
+        ("event_time", "timestamp"),
+        ("notes", "varchar"),
+    ],
+)
+
 # Sensor types and their respective reading types
 SENSOR_TYPES = {
     "S001": {"type": "Environmental", "readings": ["temperature", "humidity"]},
@@ -138,100 +191,132 @@ READING_ID_COUNTERS = {
 }
 
 
-def get_time_of_day_factor():
+class RateReporter:
+    """Periodically print achieved vs. target ingest rate"""
+
+    def __init__(self, target_rate, report_interval=10.0):
+        self.target_rate = target_rate
+        self.report_interval = report_interval
+        self.started_at = time.perf_counter()
+        self.window_start = self.started_at
+        self.window_count = 0
+        self.total = 0
+
+    def record(self, n=1):
+        self.window_count += n
+        self.total += n
+        now = time.perf_counter()
+        if now - self.window_start >= self.report_interval:
+            achieved = self.window_count / (now - self.window_start)
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Rate: {achieved:.1f}/s achieved (target {self.target_rate:g}/s)"
+            )
+            self.window_start = now
+            self.window_count = 0
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        achieved = self.total / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Inserted {self.total} readings in {elapsed:.1f}s: "
+            f"{achieved:.1f}/s achieved (target {self.target_rate:g}/s)"
+        )
+
+
+def get_time_of_day_factor(moment=None):
     """Returns a factor based on time of day (for simulating daily cycles)"""
-    now = datetime.now()
+    now = moment or datetime.now()
     hour = now.hour
     # Sine wave with period of 24 hours, peak at noon, trough at midnight
     return math.sin(math.pi * hour / 12)
 
 
-def get_reading_value(sensor_id, reading_type):
+def get_reading_value(sensor_id, reading_type, rng=random, moment=None):
     """Generate a realistic reading value based on sensor and reading type"""
     baseline = BASELINE_VALUES.get(reading_type, {}).get(sensor_id, 0)
-    time_factor = get_time_of_day_factor()
+    time_factor = get_time_of_day_factor(moment)
 
     # Different variation factors for different reading types
     if reading_type == "temperature":
         # Temperature varies with time of day
-        variation = 4 * time_factor + (random.random() * 0.6 - 0.3)
+        variation = 4 * time_factor + (rng.random() * 0.6 - 0.3)
         # S003 has occasional anomalies
-        if sensor_id == "S003" and random.random() < 0.05:
+        if sensor_id == "S003" and rng.random() < 0.05:
             variation += 8  # Anomaly spike
 
     elif reading_type == "humidity":
         # Humidity tends to be inversely related to temperature
-        variation = -10 * time_factor + (random.random() * 5 - 2.5)
+        variation = -10 * time_factor + (rng.random() * 5 - 2.5)
 
     elif reading_type == "pressure":
         # Pressure changes more slowly
-        variation = random.random() * 6 - 3
+        variation = rng.random() * 6 - 3
 
     elif reading_type == "air_quality":
         # AQI can spike during certain times
-        variation = 10 * time_factor + (random.random() * 8 - 4)
+        variation = 10 * time_factor + (rng.random() * 8 - 4)
         # S003 has occasional anomalies
-        if sensor_id == "S003" and random.random() < 0.05:
+        if sensor_id == "S003" and rng.random() < 0.05:
             variation += 30  # Anomaly spike
 
     elif reading_type == "soil_moisture":
         # Soil moisture changes slowly
-        variation = random.random() * 5 - 2.5
+        variation = rng.random() * 5 - 2.5
 
     elif reading_type == "soil_ph":
         # pH is very stable
-        variation = random.random() * 0.3 - 0.15
+        variation = rng.random() * 0.3 - 0.15
 
     elif reading_type == "soil_temperature":
         # Soil temp varies with time but less than air temp
-        variation = 2 * time_factor + (random.random() * 0.4 - 0.2)
+        variation = 2 * time_factor + (rng.random() * 0.4 - 0.2)
 
     elif reading_type == "water_temperature":
         # Water temp varies even less
-        variation = 1 * time_factor + (random.random() * 0.4 - 0.2)
+        variation = 1 * time_factor + (rng.random() * 0.4 - 0.2)
 
     elif reading_type == "dissolved_oxygen":
         # Dissolved O2 can vary with temperature
-        variation = -0.5 * time_factor + (random.random() * 0.6 - 0.3)
+        variation = -0.5 * time_factor + (rng.random() * 0.6 - 0.3)
 
     elif reading_type == "ph":
         # pH is stable
-        variation = random.random() * 0.4 - 0.2
+        variation = rng.random() * 0.4 - 0.2
 
     elif reading_type == "turbidity":
         # Turbidity can vary more
-        variation = random.random() * 2 - 1
+        variation = rng.random() * 2 - 1
 
     elif reading_type == "wind_speed":
         # Wind speed can vary a lot
-        variation = 3 * time_factor + (random.random() * 4 - 2)
+        variation = 3 * time_factor + (rng.random() * 4 - 2)
 
     else:
-        variation = random.random() * 2 - 1
+        variation = rng.random() * 2 - 1
 
     return baseline + variation
 
 
-def get_battery_level(sensor_id):
+def get_battery_level(sensor_id, rng=random, moment=None):
     """Update and return the battery level for a sensor"""
     global SENSOR_BATTERY
 
     # Battery behavior depends on sensor type
     if sensor_id in ["S002", "S005", "S010"]:  # Solar-powered sensors
-        time_factor = get_time_of_day_factor()
+        time_factor = get_time_of_day_factor(moment)
         # Battery charges during day, drains at night
         change = 0.1 * time_factor  # Small change
         SENSOR_BATTERY[sensor_id] = min(100, max(1, SENSOR_BATTERY[sensor_id] + change))
     else:
         # Regular batteries just drain slowly
         SENSOR_BATTERY[sensor_id] = max(
-            1, SENSOR_BATTERY[sensor_id] - random.uniform(0.01, 0.05)
+            1, SENSOR_BATTERY[sensor_id] - rng.uniform(0.01, 0.05)
         )
 
     return SENSOR_BATTERY[sensor_id]
 
 
-def get_signal_strength(sensor_id):
+def get_signal_strength(sensor_id, rng=random):
     """Generate a realistic signal strength value"""
     # Base signal strengths for different sensors
     base_strengths = {
@@ -249,136 +334,270 @@ def get_signal_strength(sensor_id):
 
     base = base_strengths.get(sensor_id, -70)
     # Add random variation
-    variation = random.randint(-5, 5)
+    variation = rng.randint(-5, 5)
 
     return base + variation
 
 
-def generate_additional_data(sensor_id, reading_type):
-    """Generate additional data in JSON format based on reading type"""
-    data = {}
-
-    if reading_type == "temperature":
-        if "humidity" in SENSOR_TYPES[sensor_id]["readings"]:
-            data["humidity"] = BASELINE_VALUES.get("humidity", {}).get(
-                sensor_id, 60
-            ) + (random.random() * 10 - 5)
-        if "pressure" in SENSOR_TYPES[sensor_id]["readings"]:
-            data["pressure"] = BASELINE_VALUES.get("pressure", {}).get(
-                sensor_id, 1010
-            ) + (random.random() * 5 - 2.5)
-
-    elif reading_type == "humidity":
-        if "temperature" in SENSOR_TYPES[sensor_id]["readings"]:
-            data["temperature"] = BASELINE_VALUES.get("temperature", {}).get(
-                sensor_id, 20
-            ) + (random.random() * 2 - 1)
-
-    elif reading_type == "air_quality":
-        data["pm25"] = 12 + (random.random() * 8)
-        data["pm10"] = 25 + (random.random() * 15)
-        data["o3"] = 0.03 + (random.random() * 0.02)
-        data["no2"] = 0.02 + (random.random() * 0.015)
-
-    elif reading_type == "soil_moisture":
-        data["depth"] = 10
-        data["temperature"] = BASELINE_VALUES.get("soil_temperature", {}).get(
-            sensor_id, 15
-        ) + (random.random() * 2 - 1)
-
-    elif reading_type == "soil_ph":
-        data["depth"] = 10
-        data["moisture"] = BASELINE_VALUES.get("soil_moisture", {}).get(
-            sensor_id, 30
-        ) + (random.random() * 5 - 2.5)
-
-    elif reading_type == "water_temperature":
-        data["depth"] = 0.5
-
-    elif reading_type == "dissolved_oxygen":
-        data["temperature"] = BASELINE_VALUES.get("water_temperature", {}).get(
-            sensor_id, 17
-        ) + (random.random() * 1 - 0.5)
-        data["depth"] = 0.5
-
-    elif reading_type == "pressure":
-        data["altitude"] = random.randint(0, 400)
+def _payload_fields(sensor_id, reading_type):
+    """
+    The reading_data payload of a sensor and reading type, as (key, value) pairs.
 
-    elif reading_type == "wind_speed":
-        data["direction"] = random.randint(0, 359)
+    A value is either a constant or the source of an expression drawing from
+    rng. Keys and draws are in the order the payload has always been built.
+    """
+    readings = SENSOR_TYPES[sensor_id]["readings"]
 
-    return json.dumps(data)
+    def baseline(name, default):
+        return repr(BASELINE_VALUES.get(name, {}).get(sensor_id, default))
 
+    if reading_type == "temperature":
+        fields = []
+        if "humidity" in readings:
+            fields.append(("humidity", f"{baseline('humidity', 60)} + (rng.random() * 10 - 5)"))
+        if "pressure" in readings:
+            fields.append(
+                ("pressure", f"{baseline('pressure', 1010)} + (rng.random() * 5 - 2.5)")
+            )
+        return fields
+    if reading_type == "humidity":
+        if "temperature" in readings:
+            return [
+                ("temperature", f"{baseline('temperature', 20)} + (rng.random() * 2 - 1)")
+            ]
+        return []
+    if reading_type == "air_quality":
+        return [
+            ("pm25", "12 + (rng.random() * 8)"),
+            ("pm10", "25 + (rng.random() * 15)"),
+            ("o3", "0.03 + (rng.random() * 0.02)"),
+            ("no2", "0.02 + (rng.random() * 0.015)"),
+        ]
+    if reading_type == "soil_moisture":
+        return [
+            ("depth", 10),
+            ("temperature", f"{baseline('soil_temperature', 15)} + (rng.random() * 2 - 1)"),
+        ]
+    if reading_type == "soil_ph":
+        return [
+            ("depth", 10),
+            ("moisture", f"{baseline('soil_moisture', 30)} + (rng.random() * 5 - 2.5)"),
+        ]
+    if reading_type == "water_temperature":
+        return [("depth", 0.5)]
+    if reading_type == "dissolved_oxygen":
+        return [
+            (
+                "temperature",
+                f"{baseline('water_temperature', 17)} + (rng.random() * 1 - 0.5)",
+            ),
+            ("depth", 0.5),
+        ]
+    if reading_type == "pressure":
+        return [("altitude", "rng.randint(0, 400)")]
+    if reading_type == "wind_speed":
+        return [("direction", "rng.randint(0, 359)")]
+    return []
+
+
+class PayloadEncoder:
+    """
+    Precompiled reading_data encoders, one per sensor and reading type.
+
+    Every (sensor, reading type) pair always produces the same keys, so the
+    JSON text around the values is rendered once into a %-template and only
+    the numbers are filled in per reading. Floats and ints are formatted with
+    repr(), exactly as json.dumps() formats them, so the output is
+    byte-identical to building a dict and calling json.dumps(), and rng is
+    drawn from in the same order.
+    """
 
-def simulate_sensor_readings(interval=5.0, limit=None, verbose=True):
+    def __init__(self):
+        self.encoders = {}
+
+    def _compile(self, sensor_id, reading_type):
+        fields = _payload_fields(sensor_id, reading_type)
+        expressions = [value for _, value in fields if isinstance(value, str)]
+        if not expressions:
+            payload = json.dumps(dict(fields))
+            return lambda rng: payload
+        parts = []
+        for key, value in fields:
+            literal = json.dumps(value) if not isinstance(value, str) else "%r"
+            parts.append(json.dumps(key).replace("%", "%%") + ": " + literal)
+        template = "{" + ", ".join(parts) + "}"
+        source = f"def encode(rng):\n    return _template % ({', '.join(expressions)},)\n"
+        namespace = {"_template": template}
+        exec(source, namespace)
+        return namespace["encode"]
+
+    def encoder(self, sensor_id, reading_type):
+        """The encode(rng) function for one sensor and reading type"""
+        key = (sensor_id, reading_type)
+        encode = self.encoders.get(key)
+        if encode is None:
+            encode = self.encoders[key] = self._compile(sensor_id, reading_type)
+        return encode
+
+    def encode(self, sensor_id, reading_type, rng=random):
+        """reading_data JSON for one reading"""
+        encode = self.encoders.get((sensor_id, reading_type))
+        if encode is None:
+            encode = self.encoder(sensor_id, reading_type)
+        return encode(rng)
+
+    def encode_batch(self, keys, rng=random):
+        """
+        reading_data JSON for a batch of (sensor_id, reading_type) pairs.
+
+        Draws from rng in batch order, so the result equals calling encode()
+        once per pair.
+        """
+        encoders = self.encoders
+        compile_missing = self.encoder
+        return [(encoders.get(key) or compile_missing(*key))(rng) for key in keys]
+
+
+PAYLOADS = PayloadEncoder()
+
+
+def generate_additional_data(sensor_id, reading_type, rng=random):
+    """Generate additional data in JSON format based on reading type"""
+    return PAYLOADS.encode(sensor_id, reading_type, rng)
+
+
+def simulate_sensor_readings(
+    interval=5.0,
+    limit=None,
+    verbose=True,
+    rate=None,
+    burst=None,
+    report_interval=10.0,
+    sink_config=None,
+    seed=None,
+    start_time=None,
+    batch_size=1000,
+    flush_interval=0.0,
+    catch_up=None,
+    disorder_config=None,
+    metrics_config=None,
+    log_interval=1.0,
+    profile_config=None,
+):
     """
     Simulate IoT sensor readings with realistic data patterns.
 
+    Readings and the alerts and maintenance events they trigger are committed
+    together, in one transaction per flush.
+
     Args:
-        interval: Time in seconds between readings
+        interval: Time in seconds between readings (ignored when rate is set)
         limit: Optional limit to number of readings (None for infinite)
         verbose: Whether to print reading details
+        rate: Optional target rate in readings per second, paced by a token bucket
+        burst: Maximum readings sent back-to-back when catching up (default: one second's worth)
+        report_interval: Seconds between achieved-rate reports in rate mode
+        sink_config: Optional open_sink() keyword arguments (default: insert into RisingWave)
+        seed: Optional seed for reproducible generation
+        start_time: Optional datetime; use simulated time from here, advancing
+            by interval (or 1/rate) per reading, instead of the wall clock
+        batch_size: Rows pending across all three tables that trigger a flush
+        flush_interval: Seconds rows may wait before a flush (0 flushes
+            after every reading)
+        catch_up: With start_time, "stop" or "live" to backfill up to the
+            present and then stop or continue in real time
+        disorder_config: Optional disorder_options() settings to deliver a
+            fraction of the readings late and out of order
+        metrics_config: Optional metrics_options() settings for a Prometheus
+            endpoint and periodic summary line
+        log_interval: Minimum seconds between reading, alert and maintenance
+            log lines (0 logs every one)
+        profile_config: Optional profile_options() settings to time each stage
+            and print a breakdown at exit
     """
+    rng = stream_rng(seed, "readings")
+    clock = make_clock(start_time, catch_up)
+    profiler = open_profiler(profile_config)
+    log = SampledLog(log_interval, verbose, profiler)
+    sink = None
+    batcher = None
+    bucket = None
+    reporter = None
+    metrics = None
     try:
-        conn = psycopg2.connect(**CONN_PARAMS)
-        cursor = conn.cursor()
+        metrics = open_metrics(metrics_config)
+        sink = open_sink(
+            conn_params=CONN_PARAMS,
+            metrics=metrics,
+            profiler=profiler,
+            **(sink_config or {"kind": "postgres"}),
+        )
+        sink = open_disorder(sink, disorder_config)
+        batcher = MultiTableBatcher(
+            sink,
+            [SENSOR_READINGS, ALERTS, MAINTENANCE_EVENTS],
+            max_rows=batch_size,
+            max_delay=flush_interval,
+        )
 
         count = 0
 
-        print(f"Starting IoT sensor readings simulation (interval: {interval}s)")
+        if rate is not None:
+            bucket = TokenBucket(rate, burst)
+            reporter = RateReporter(rate, report_interval)
+            print(
+                f"Starting IoT sensor readings simulation (rate: {rate:g}/s, burst: {bucket.capacity:g})"
+            )
+        else:
+            print(f"Starting IoT sensor readings simulation (interval: {interval}s)")
         print("Press Ctrl+C to stop")
 
-        while limit is None or count < limit:
+        while (limit is None or count < limit) and not clock.expired:
+            # In rate mode, wait for a token before producing the next reading;
+            # simulated time (e.g. a backfill) runs as fast as the sink allows
+            if bucket is not None and not clock.simulated:
+                with profiler.stage("sleep"):
+                    bucket.acquire()
+
             # Select a random sensor
-            sensor_id = random.choice(list(SENSOR_TYPES.keys()))
+            sensor_id = rng.choice(list(SENSOR_TYPES.keys()))
 
             # Select a random reading type for this sensor
-            reading_type = random.choice(SENSOR_TYPES[sensor_id]["readings"])
+            reading_type = rng.choice(SENSOR_TYPES[sensor_id]["readings"])
 
             # Generate a unique reading ID
             reading_id = f"{reading_type[0].upper()}{READING_ID_COUNTERS[sensor_id]}"
             READING_ID_COUNTERS[sensor_id] += 1
 
             # Generate the reading values
-            reading_value = get_reading_value(sensor_id, reading_type)
-            reading_unit = READING_UNITS.get(reading_type, "")
-            battery_level = get_battery_level(sensor_id)
-            signal_strength = get_signal_strength(sensor_id)
-            reading_time = datetime.now()
-            reading_data = generate_additional_data(sensor_id, reading_type)
-
-            # Insert the reading
-            cursor.execute(
-                """
-                INSERT INTO sensor_readings 
-                (reading_id, sensor_id, reading_type, reading_value, reading_unit, 
-                 battery_level, signal_strength, reading_time, reading_data)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    reading_id,
-                    sensor_id,
-                    reading_type,
-                    reading_value,
-                    reading_unit,
-                    battery_level,
-                    signal_strength,
-                    reading_time,
-                    reading_data,
-                ),
+            reading_time = clock.now()
+            with profiler.stage("generate"):
+                reading_value = get_reading_value(sensor_id, reading_type, rng, reading_time)
+                reading_unit = READING_UNITS.get(reading_type, "")
+                battery_level = get_battery_level(sensor_id, rng, reading_time)
+                signal_strength = get_signal_strength(sensor_id, rng)
+            with profiler.stage("serialize"):
+                reading_data = generate_additional_data(sensor_id, reading_type, rng)
+
+            reading = (
+                reading_id,
+                sensor_id,
+                reading_type,
+                reading_value,
+                reading_unit,
+                battery_level,
+                signal_strength,
+                reading_time,
+                reading_data,
             )
-            conn.commit()
+            alerts = []
+            maintenance = []
 
             # Check for conditions that might trigger alerts
-            if battery_level < 20 and random.random() < 0.3:
+            if battery_level < 20 and rng.random() < 0.3:
                 # Create a low battery alert
                 alert_id = f"A{1000 + count}"
-                cursor.execute(
-                    """
-                    INSERT INTO alerts
-                    (alert_id, sensor_id, alert_type, severity, alert_time, is_resolved, notes)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
+                alerts.append(
                     (
                         alert_id,
                         sensor_id,
@@ -387,27 +606,21 @@ def simulate_sensor_readings(interval=5.0, limit=None, verbose=True):
                         reading_time,
                         False,
                         f"Battery level below 20% ({battery_level:.1f}%)",
-                    ),
+                    )
                 )
-                conn.commit()
-                if verbose:
-                    print(
+                if log.ready():
+                    log.print(
                         f"[{reading_time.strftime('%H:%M:%S')}] ALERT: Low battery for {sensor_id} ({battery_level:.1f}%)"
                     )
 
             if (
                 reading_type == "temperature"
                 and reading_value > BASELINE_VALUES["temperature"][sensor_id] + 8
-                and random.random() < 0.5
+                and rng.random() < 0.5
             ):
                 # Create a high temperature alert
                 alert_id = f"A{2000 + count}"
-                cursor.execute(
-                    """
-                    INSERT INTO alerts
-                    (alert_id, sensor_id, alert_type, severity, alert_time, is_resolved, notes)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
+                alerts.append(
                     (
                         alert_id,
                         sensor_id,
@@ -416,16 +629,15 @@ def simulate_sensor_readings(interval=5.0, limit=None, verbose=True):
                         reading_time,
                         False,
                         f"Temperature spike detected: {reading_value:.1f}°C",
-                    ),
+                    )
                 )
-                conn.commit()
-                if verbose:
-                    print(
+                if log.ready():
+                    log.print(
                         f"[{reading_time.strftime('%H:%M:%S')}] ALERT: Temperature spike for {sensor_id} ({reading_value:.1f}°C)"
                     )
 
             # Create random maintenance event (very rarely)
-            if random.random() < 0.01:
+            if rng.random() < 0.01:
                 event_id = f"M{1000 + count}"
                 event_types = [
                     "battery_replacement",
@@ -433,16 +645,11 @@ def simulate_sensor_readings(interval=5.0, limit=None, verbose=True):
                     "cleaning",
                     "firmware_update",
                 ]
-                event_type = random.choice(event_types)
-                technician_id = f"T{random.randint(1, 5):03d}"
+                event_type = rng.choice(event_types)
+                technician_id = f"T{rng.randint(1, 5):03d}"
                 notes = f"Scheduled {event_type}"
 
-                cursor.execute(
-                    """
-                    INSERT INTO maintenance_events
-                    (event_id, sensor_id, event_type, technician_id, event_time, notes)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
+                maintenance.append(
                     (
                         event_id,
                         sensor_id,
@@ -450,37 +657,72 @@ def simulate_sensor_readings(interval=5.0, limit=None, verbose=True):
                         technician_id,
                         reading_time,
                         notes,
-                    ),
+                    )
                 )
-                conn.commit()
 
                 # Reset battery level if it was a battery replacement
                 if event_type == "battery_replacement":
-                    SENSOR_BATTERY[sensor_id] = random.uniform(90, 100)
+                    SENSOR_BATTERY[sensor_id] = rng.uniform(90, 100)
 
-                if verbose:
-                    print(
+                if log.ready():
+                    log.print(
                         f"[{reading_time.strftime('%H:%M:%S')}] MAINTENANCE: {event_type} for {sensor_id}"
                     )
 
+            # Commit the reading together with the alerts and maintenance it triggered
+            with profiler.stage("sink"):
+                batcher.add_rows(
+                    [
+                        (SENSOR_READINGS, [reading]),
+                        (ALERTS, alerts),
+                        (MAINTENANCE_EVENTS, maintenance),
+                    ]
+                )
+
             # Print feedback
             count += 1
-            if verbose:
-                print(
+            if log.ready():
+                log.print(
                     f"[{reading_time.strftime('%H:%M:%S')}] Inserted {reading_type} reading for {sensor_id}: {reading_value:.2f} {reading_unit} (Battery: {battery_level:.1f}%)"
                 )
 
-            # Wait for the specified interval
-            time.sleep(interval)
+            # Wait for the specified interval, or let the token bucket pace us
+            if reporter is not None:
+                reporter.record()
+                clock.advance(1.0 / rate)
+            else:
+                with profiler.stage("sleep"):
+                    clock.sleep(interval)
+
+        with profiler.stage("sink"):
+            batcher.flush()
 
     except KeyboardInterrupt:
         print("\nSensor simulation stopped manually")
+        try:
+            if batcher is not None:
+                batcher.flush()
+        except Exception as e:
+            print(f"Error flushing final batch: {e}")
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        if "conn" in locals():
-            conn.close()
-            print("Connection closed")
+        if reporter is not None:
+            reporter.summary()
+        if batcher is not None and batcher.transactions:
+            p50, _, p99, _ = batcher.commit_latencies.summary()
+            print(
+                f"Committed {batcher.rows_written} rows in {batcher.transactions} transactions "
+                f"({batcher.rows_written / batcher.transactions:.1f} rows per commit, "
+                f"p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms)"
+            )
+        if sink is not None:
+            sink.close()
+            print("Sink closed")
+        if metrics is not None:
+            metrics.close()
+            print(metrics.summary())
+        profiler.close()
 
 
 if __name__ == "__main__":
@@ -501,10 +743,71 @@ if __name__ == "__main__":
         default=None,
         help="Limit the number of readings to insert (default: unlimited)",
     )
+    parser.add_argument(
+        "--rate",
+        type=parse_rate,
+        default=None,
+        help="Target rate in readings per second, e.g. 500 or 500/s (overrides --interval)",
+    )
+    parser.add_argument(
+        "--burst",
+        type=float,
+        default=None,
+        help="Maximum readings sent back-to-back to catch up after a stall (default: one second at --rate)",
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between achieved-rate reports in --rate mode (default: 10.0)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Rows pending across readings, alerts and maintenance events that trigger a "
+        "flush (default: 1000)",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=0.0,
+        help="Seconds rows may wait before being committed in one transaction; "
+        "0 commits after every reading (default: 0)",
+    )
     parser.add_argument("--quiet", action="store_true", help="Reduce output verbosity")
+    add_seed_argument(parser)
+    add_clock_arguments(parser)
+    add_sink_arguments(parser)
+    add_disorder_arguments(parser)
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
 
     args = parser.parse_args()
+    try:
+        start_time, catch_up = clock_options(
+            args, 1.0 / args.rate if args.rate else args.interval
+        )
+        disorder_config = disorder_options(args)
+        profile_config = profile_options(args)
+    except ValueError as e:
+        parser.error(str(e))
 
     simulate_sensor_readings(
-        interval=args.interval, limit=args.limit, verbose=not args.quiet
+        interval=args.interval,
+        limit=args.limit,
+        verbose=not args.quiet,
+        rate=args.rate,
+        burst=args.burst,
+        report_interval=args.report_interval,
+        sink_config=sink_options(args),
+        seed=args.seed,
+        start_time=start_time,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        catch_up=catch_up,
+        disorder_config=disorder_config,
+        metrics_config=metrics_options(args),
+        log_interval=args.log_interval,
+        profile_config=profile_config,
     )
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Materialized View Freshness Monitor
+
+Throughput numbers alone don't say whether a rate is sustainable: the
+simulator can keep inserting while the views fall further and further
+behind. This monitor polls the newest event time reflected in each view at
+an interval and reports how far it trails the wall clock, e.g. the newest
+hour in hourly_temperature_stats against now.
+
+Comparing a view with its source table would not show a backlog: RisingWave
+serves both from the same committed snapshot, so when the cluster falls
+behind, the source and the views go stale together. The simulators stamp
+live events with datetime.now(), so in live mode the wall clock is what the
+views should keep up with. Run the monitor on the simulator's host (the
+event times are local, timezone-naive timestamps); with --start-time or a
+backfill, lag only becomes meaningful once the simulator runs live.
+
+Lag that stays flat is sustainable; lag that keeps growing is not, which the
+exit summary reports as a trend in seconds of lag per minute. Lag is
+printed, optionally appended to a CSV file and served as Prometheus gauges,
+and a view whose lag exceeds its --max-lag threshold raises an alert line
+until it recovers.
+
+Windowed views only show which window the newest event reached, so their
+progress is taken as the end of the newest window (or HOP slide) and their
+lag is exact to within that window. Views without an event-time column
+(total_word_counts, funnel_analysis, product_performance,
+product_view_metrics) are not monitored.
+
+Polls only read aggregated and windowed views, which stay small. Views with
+a row per event (words_stream, user_events_watermarked,
+temperature_anomalies, geo_readings) would need a full scan per poll, so
+they are only monitored with --trackers. That creates a freshness_<view> MV
+per such view holding its MAX() event time; RisingWave keeps state for
+every row of the view to maintain it, so it adds streaming load of its own.
+The tracking MVs are dropped at exit unless --keep-trackers is given.
+
+Usage:
+    python pipelines/freshness_monitor.py --interval 5 --max-lag 60,revenue_tracker=600
+    python pipelines/freshness_monitor.py --pipelines 03_iot_sensors --csv lag.csv --metrics-port 9109
+"""
+
+import csv
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simlib.metrics import Registry, metrics_server
+from simlib.stats import summarize_latencies
+
+# Connection parameters
+CONN_PARAMS = {
+    "host": "localhost",  # Change as needed
+    "port": 4566,  # RisingWave default port
+    "dbname": "dev",
+    "user": "root",  # Default RisingWave user
+    "password": "",  # Default has no password
+}
+
+# Per pipeline: view -> (event-time column, window added to it or None). A
+# window turns the newest window start or hour into the end of that window.
+FRESHNESS = {
+    "01_sentence_stream": {
+        "words_stream": ("event_time", None),
+        "word_counts": ("window_start", "1 minute"),
+    },
+    "02_ecommerce_analytics": {
+        "user_events_watermarked": ("event_time", None),
+        "pageview_metrics": ("last_view", None),
+        # HOP windows start every 5 minutes
+        "revenue_tracker": ("window_start", "5 minute"),
+        "anomaly_detection": ("hour", "1 hour"),
+    },
+    "03_iot_sensors": {
+        "current_sensor_status": ("reading_time", None),
+        "maintenance_needed": ("reading_time", None),
+        "hourly_temperature_stats": ("hour", "1 hour"),
+        "regional_temperature": ("hour", "1 hour"),
+        # HOP windows start every hour
+        "battery_level_trends": ("window_start", "1 hour"),
+        "temperature_anomalies": ("reading_time", None),
+        "geo_readings": ("reading_time", None),
+    },
+}
+
+# Views with a row per event, only monitored through tracking MVs
+PER_EVENT_VIEWS = {"words_stream", "user_events_watermarked", "temperature_anomalies", "geo_readings"}
+
+
+def tracker_name(view):
+    return f"freshness_{view}"
+
+
+def monitored_views(pipeline, trackers=False):
+    """The views of a pipeline that are polled, with or without tracking MVs"""
+    return [view for view in FRESHNESS[pipeline] if trackers or view not in PER_EVENT_VIEWS]
+
+
+def freshness_query(pipeline, views):
+    """One query returning the newest event time reflected in each of views"""
+    expressions = []
+    for view in views:
+        column, window = FRESHNESS[pipeline][view]
+        newest = f"MAX({column})"
+        relation = view
+        if view in PER_EVENT_VIEWS:
+            newest, relation = "MAX(newest)", tracker_name(view)
+        if window is not None:
+            newest += f" + INTERVAL '{window}'"
+        expressions.append(f"(SELECT {newest} FROM {relation})")
+    return "SELECT " + ", ".join(expressions)
+
+
+def create_trackers(cursor, pipeline, views):
+    """Create the tracking MVs of the per-event views among a pipeline's views"""
+    for view in views:
+        if view in PER_EVENT_VIEWS:
+            column = FRESHNESS[pipeline][view][0]
+            cursor.execute(
+                f"CREATE MATERIALIZED VIEW IF NOT EXISTS {tracker_name(view)} AS "
+                f"SELECT MAX({column}) AS newest FROM {view}"
+            )
+
+
+def drop_trackers(cursor, views):
+    for view in views:
+        if view in PER_EVENT_VIEWS:
+            cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {tracker_name(view)}")
+
+
+def parse_thresholds(value):
+    """
+    Parse '--max-lag 60,revenue_tracker=600' into (default seconds, {view: seconds}).
+
+    The default may be omitted, leaving only the listed views alerting.
+    """
+    default = None
+    per_view = {}
+    for item in value.split(","):
+        view, sep, seconds = item.strip().rpartition("=")
+        try:
+            seconds = float(seconds)
+        except ValueError:
+            raise ValueError(f"Invalid lag threshold {item!r}")
+        if seconds <= 0:
+            raise ValueError(f"Lag threshold {item!r} must be positive")
+        if not sep:
+            default = seconds
+            continue
+        if not any(view in views for views in FRESHNESS.values()):
+            raise ValueError(f"Unknown view {view!r} in lag threshold")
+        per_view[view] = seconds
+    return default, per_view
+
+
+def lag_trend(samples):
+    """Least-squares slope of (wall time, lag) samples, in seconds of lag per minute"""
+    if len(samples) < 2:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_lag = sum(lag for _, lag in samples) / n
+    spread = sum((t - mean_t) ** 2 for t, _ in samples)
+    if spread == 0:
+        return None
+    slope = sum((t - mean_t) * (lag - mean_lag) for t, lag in samples) / spread
+    return slope * 60
+
+
+class FreshnessMetrics:
+    """Per-view lag gauges and alert counters, with an optional /metrics endpoint"""
+
+    def __init__(self, port=None, host="127.0.0.1"):
+        self.registry = registry = Registry()
+        self.lag = registry.gauge(
+            "pipedream_view_lag_seconds",
+            "Wall-clock time by which a view's newest event time trails the present",
+            ["pipeline", "view"],
+        )
+        self.view_time = registry.gauge(
+            "pipedream_view_event_time_seconds",
+            "Newest event time reflected in a view, as a Unix timestamp",
+            ["pipeline", "view"],
+        )
+        self.alerting = registry.gauge(
+            "pipedream_view_lag_alert",
+            "1 while a view's lag exceeds its threshold",
+            ["pipeline", "view"],
+        )
+        self.alerts = registry.counter(
+            "pipedream_view_lag_alerts_total",
+            "Times a view's lag crossed its threshold",
+            ["pipeline", "view"],
+        )
+        self.poll_errors = registry.counter(
+            "pipedream_freshness_poll_errors_total", "Failed freshness polls", ["pipeline"]
+        )
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+        if port is not None:
+            self.server = metrics_server(registry, host, port)
+            self.port = self.server.server_address[1]
+            self.thread = threading.Thread(
+                target=self.server.serve_forever, name="metrics-http", daemon=True
+            )
+            self.thread.start()
+            print(f"Serving metrics on http://{host}:{self.port}/metrics")
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+
+
+class ViewLag:
+    """Lag samples and alert state of one view"""
+
+    def __init__(self, pipeline, view, threshold):
+        self.pipeline = pipeline
+        self.view = view
+        self.threshold = threshold
+        self.samples = []
+        self.alerting = False
+        self.alerts = 0
+        self.alert_seconds = 0.0
+        self.alert_started = None
+
+    def update(self, now, lag):
+        """Record one lag sample; returns 'alert' or 'recovered' on a transition"""
+        self.samples.append((now, lag))
+        if self.threshold is None:
+            return None
+        if lag > self.threshold and not self.alerting:
+            self.alerting = True
+            self.alerts += 1
+            self.alert_started = now
+            return "alert"
+        if lag <= self.threshold and self.alerting:
+            self.alerting = False
+            self.alert_seconds += now - self.alert_started
+            return "recovered"
+        return None
+
+    def time_alerting(self, now):
+        if self.alerting:
+            return self.alert_seconds + now - self.alert_started
+        return self.alert_seconds
+
+
+
+
+def _epoch(value):
+    return value.timestamp() if value is not None else float("nan")
+
+
+def _format_lag(lag):
+    return "-" if lag is None else f"{lag:.1f}s"
+
+
+def monitor_freshness(
+    pipelines=None,
+    interval=5.0,
+    thresholds=(None, {}),
+    duration=None,
+    csv_path=None,
+    metrics_config=None,
+    quiet=False,
+    trackers=False,
+    keep_trackers=False,
+):
+    """
+    Poll view freshness until duration elapses or Ctrl+C, then print a summary.
+
+    Args:
+        pipelines: Keys of FRESHNESS to monitor (default: all)
+        interval: Seconds between polls
+        thresholds: (default seconds, {view: seconds}) from parse_thresholds()
+        duration: Optional run time in seconds (None runs until interrupted)
+        csv_path: Optional CSV file to append one row per view and poll to
+        metrics_config: Optional {"port", "host"} for a /metrics endpoint
+        quiet: Only print alerts, not the per-poll lag lines
+        trackers: Also monitor the per-event views, through tracking MVs
+        keep_trackers: Keep the tracking MVs at exit for the next run
+    """
+    pipelines = list(pipelines or FRESHNESS)
+    default_threshold, view_thresholds = thresholds
+    views = {pipeline: monitored_views(pipeline, trackers) for pipeline in pipelines}
+    queries = {pipeline: freshness_query(pipeline, views[pipeline]) for pipeline in pipelines}
+    lags = {
+        pipeline: {
+            view: ViewLag(pipeline, view, view_thresholds.get(view, default_threshold))
+            for view in views[pipeline]
+        }
+        for pipeline in pipelines
+    }
+    metrics = FreshnessMetrics(**metrics_config) if metrics_config else None
+
+    csv_file = writer = None
+    if csv_path:
+        new_file = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+        csv_file = open(csv_path, "a", newline="")
+        writer = csv.writer(csv_file)
+        if new_file:
+            writer.writerow(["time", "pipeline", "view", "view_time", "lag_seconds"])
+
+    print(
+        f"Monitoring view freshness every {interval:g}s "
+        f"({', '.join(f'{p}: {len(views[p])} views' for p in pipelines)})"
+    )
+    print("Press Ctrl+C to stop")
+
+    conn = cursor = None
+    errors = {pipeline: 0 for pipeline in pipelines}
+    skipped = set()
+    tracked = set()
+    started_at = time.perf_counter()
+    next_poll = started_at
+    try:
+        while duration is None or next_poll - started_at < duration:
+            now = time.perf_counter()
+            if next_poll > now:
+                time.sleep(next_poll - now)
+            next_poll += interval
+            for pipeline in pipelines:
+                if pipeline in skipped:
+                    continue
+                try:
+                    if conn is None:
+                        conn = psycopg2.connect(**CONN_PARAMS)
+                        conn.autocommit = True
+                        cursor = conn.cursor()
+                    if trackers and pipeline not in tracked:
+                        create_trackers(cursor, pipeline, views[pipeline])
+                        tracked.add(pipeline)
+                    cursor.execute(queries[pipeline])
+                    row = cursor.fetchone()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                    errors[pipeline] += 1
+                    if metrics:
+                        metrics.poll_errors.inc(1, pipeline)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Poll of {pipeline} failed: {e}")
+                    if conn is not None:
+                        try:
+                            conn.close()
+                        except psycopg2.Error:
+                            pass
+                    conn = cursor = None
+                    continue
+                except psycopg2.Error as e:
+                    # Pipeline not set up in this database
+                    print(f"Skipping {pipeline}: {str(e).strip().splitlines()[0]}")
+                    skipped.add(pipeline)
+                    continue
+
+                # The simulators stamp live events with the local datetime.now()
+                polled_at = datetime.now()
+                sampled_at = time.perf_counter()
+                parts = []
+                for view, view_time in zip(views[pipeline], row):
+                    lag = None
+                    if view_time is not None:
+                        lag = max(0.0, (polled_at - view_time).total_seconds())
+                    parts.append(f"{view} {_format_lag(lag)}")
+                    if writer:
+                        writer.writerow(
+                            [
+                                polled_at.isoformat(timespec="seconds"),
+                                pipeline,
+                                view,
+                                view_time.isoformat() if view_time else "",
+                                "" if lag is None else f"{lag:.3f}",
+                            ]
+                        )
+                    if metrics:
+                        metrics.view_time.set(_epoch(view_time), pipeline, view)
+                    if lag is None:
+                        continue
+                    state = lags[pipeline][view]
+                    transition = state.update(sampled_at, lag)
+                    if metrics:
+                        metrics.lag.set(lag, pipeline, view)
+                        metrics.alerting.set(int(state.alerting), pipeline, view)
+                        if transition == "alert":
+                            metrics.alerts.inc(1, pipeline, view)
+                    if transition == "alert":
+                        print(
+                            f"[{polled_at.strftime('%H:%M:%S')}] ALERT: {view} is {lag:.1f}s "
+                            f"behind the wall clock (threshold {state.threshold:g}s)"
+                        )
+                    elif transition == "recovered":
+                        print(
+                            f"[{polled_at.strftime('%H:%M:%S')}] Recovered: {view} is "
+                            f"{lag:.1f}s behind (threshold {state.threshold:g}s)"
+                        )
+                if not quiet:
+                    print(f"[{polled_at.strftime('%H:%M:%S')}] {pipeline}: {', '.join(parts)}")
+            if csv_file:
+                csv_file.flush()
+    except KeyboardInterrupt:
+        print("\nFreshness monitor stopped manually")
+    finally:
+        if conn is not None:
+            if tracked and not keep_trackers:
+                try:
+                    for pipeline in tracked:
+                        drop_trackers(cursor, views[pipeline])
+                    print("Dropped the freshness tracking views")
+                except psycopg2.Error as e:
+                    print(f"Could not drop the freshness tracking views: {e}")
+            conn.close()
+        if csv_file:
+            csv_file.close()
+        if metrics:
+            metrics.close()
+        report_freshness(
+            {p: lag for p, lag in lags.items() if p not in skipped}, errors, time.perf_counter()
+        )
+
+
+def report_freshness(lags, errors, now):
+    """Print lag percentiles, trend and alert time per view"""
+    print("\nView freshness summary:")
+    print(
+        f"  {'view':<26} {'polls':>6} {'p50':>8} {'p99':>8} {'max':>8} {'last':>8} "
+        f"{'trend':>12} {'alerts':>7} {'alerting':>9}"
+    )
+    for pipeline, views in lags.items():
+        print(f"  {pipeline}" + (f" ({errors[pipeline]} failed polls)" if errors[pipeline] else ""))
+        for view, state in views.items():
+            values = [lag for _, lag in state.samples]
+            if not values:
+                print(f"  {view:<26} {0:>6} {'-':>8} {'-':>8} {'-':>8} {'-':>8}")
+                continue
+            p50, _, p99, peak = summarize_latencies(values)
+            trend = lag_trend(state.samples)
+            trend = "-" if trend is None else f"{trend:+.2f}s/min"
+            print(
+                f"  {view:<26} {len(values):>6} {p50:>7.1f}s {p99:>7.1f}s {peak:>7.1f}s "
+                f"{values[-1]:>7.1f}s {trend:>12} {state.alerts:>7} "
+                f"{state.time_alerting(now):>8.0f}s"
+            )
+
+
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Report how far each materialized view lags the wall clock"
+    )
+    parser.add_argument(
+        "--pipelines",
+        default=",".join(FRESHNESS),
+        help=f"Comma-separated pipelines to monitor (default: all of {', '.join(FRESHNESS)}); "
+        "pipelines whose views don't exist are skipped",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="Seconds between polls (default: 5)",
+    )
+    parser.add_argument(
+        "--max-lag",
+        default=None,
+        help="Alert when a view lags by more than this many seconds, "
+        "with per-view overrides, e.g. 60,revenue_tracker=600 (default: no alerts)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds to run (default: until Ctrl+C)",
+    )
+    parser.add_argument(
+        "--csv",
+        default=None,
+        help="Append time, pipeline, view, view_time and lag_seconds per poll "
+        "to this CSV file",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve the lag gauges in the Prometheus format on this port at /metrics",
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="Address for --metrics-port to bind to (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--trackers",
+        action="store_true",
+        help="Also monitor the views with a row per event through freshness_* tracking MVs, "
+        "which keep state for every row of those views (default: aggregated views only)",
+    )
+    parser.add_argument(
+        "--keep-trackers",
+        action="store_true",
+        help="Keep the freshness_* tracking MVs at exit (default: drop them)",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only print alerts and the summary, not the lag of every poll",
+    )
+
+    args = parser.parse_args()
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    for pipeline in pipelines:
+        if pipeline not in FRESHNESS:
+            parser.error(f"Unknown pipeline {pipeline!r} (choose from {', '.join(FRESHNESS)})")
+    if args.interval <= 0:
+        parser.error("--interval must be positive")
+    try:
+        thresholds = parse_thresholds(args.max_lag) if args.max_lag else (None, {})
+    except ValueError as e:
+        parser.error(str(e))
+
+    monitor_freshness(
+        pipelines=pipelines,
+        interval=args.interval,
+        thresholds=thresholds,
+        duration=args.duration,
+        csv_path=args.csv,
+        metrics_config=(
+            {"port": args.metrics_port, "host": args.metrics_host}
+            if args.metrics_port is not None
+            else None
+        ),
+        quiet=args.quiet,
+        trackers=args.trackers,
+        keep_trackers=args.keep_trackers,
+    )
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Materialized View Query Load Generator
+
+The simulators only exercise the write side, but dashboards keep reading the
+views while ingest runs. This tool runs a weighted mix of the query patterns
+from each pipeline's README against the live views, at a target rate, from a
+pool of connections, and reports p50/p99 latency and errors per query. Run it
+alongside any simulator to measure how reads and writes interfere.
+
+Queries are issued open-loop: a dispatcher schedules them at the target QPS
+whether or not earlier ones have finished, and latency is measured from when
+a query was due. A view that stalls therefore shows up as latency rather than
+as a quietly lower request rate. When every connection is busy and the
+backlog is full, due queries are counted as missed instead of queueing
+without bound.
+
+Usage:
+    python pipelines/query_load.py --qps 200 --connections 16 --duration 300
+    python pipelines/query_load.py --mix current_sensor_status=5,geo_readings=1
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simlib.rate import parse_rate
+from simlib.rng import add_seed_argument, stream_rng
+from simlib.stats import summarize_latencies
+
+# Connection parameters
+CONN_PARAMS = {
+    "host": "localhost",  # Change as needed
+    "port": 4566,  # RisingWave default port
+    "dbname": "dev",
+    "user": "root",  # Default RisingWave user
+    "password": "",  # Default has no password
+}
+
+# Query patterns from each pipeline's README, by name
+QUERIES = {
+    # 01_sentence_stream
+    "word_counts": "SELECT * FROM word_counts LIMIT 10",
+    "total_word_counts": "SELECT * FROM total_word_counts LIMIT 10",
+    # 02_ecommerce_analytics
+    "funnel_analysis": "SELECT * FROM funnel_analysis",
+    "revenue_tracker": "SELECT * FROM revenue_tracker ORDER BY window_start DESC",
+    "product_performance": (
+        "SELECT * FROM product_performance ORDER BY estimated_revenue DESC LIMIT 10"
+    ),
+    "anomaly_detection": "SELECT * FROM anomaly_detection WHERE is_anomaly = TRUE",
+    # 03_iot_sensors
+    "current_sensor_status": "SELECT * FROM current_sensor_status",
+    "temperature_anomalies": "SELECT * FROM temperature_anomalies WHERE is_anomaly = TRUE",
+    "maintenance_needed": (
+        "SELECT * FROM maintenance_needed WHERE maintenance_priority IN ('Immediate', 'Soon')"
+    ),
+    "regional_temperature": (
+        "SELECT * FROM regional_temperature ORDER BY hour DESC, avg_temp DESC LIMIT 10"
+    ),
+    "geo_readings": (
+        "SELECT sensor_id, latitude, longitude, reading_type, reading_value, reading_time "
+        "FROM geo_readings ORDER BY reading_time DESC LIMIT 100"
+    ),
+}
+
+# The views the dashboards poll, equally weighted
+DEFAULT_MIX = "total_word_counts,funnel_analysis,revenue_tracker,current_sensor_status,geo_readings"
+
+
+def parse_mix(value):
+    """
+    Parse a query mix such as 'funnel_analysis=3,geo_readings' into {name: weight}.
+
+    A name without a weight counts once; "all" selects every query in QUERIES.
+    """
+    if value.strip() == "all":
+        return {name: 1.0 for name in QUERIES}
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in QUERIES:
+            raise ValueError(f"Unknown query {name!r} (choose from {', '.join(QUERIES)})")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] <= 0:
+            raise ValueError(f"Weight of {name} must be positive")
+    return mix
+
+
+class QueryStats:
+    """Latencies, row counts, errors and missed deadlines per query, shared by the workers"""
+
+    def __init__(self, names):
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in names}
+        self.rows = dict.fromkeys(names, 0)
+        self.errors = dict.fromkeys(names, 0)
+        self.missed = dict.fromkeys(names, 0)
+        self.last_error = {}
+        # Since the previous progress line
+        self.window = []
+        self.window_errors = 0
+        self.window_missed = 0
+
+    def record(self, name, latency, rows):
+        with self.lock:
+            self.latencies[name].append(latency)
+            self.rows[name] += rows
+            self.window.append(latency)
+
+    def error(self, name, error):
+        with self.lock:
+            self.errors[name] += 1
+            self.window_errors += 1
+            self.last_error[name] = str(error).strip()
+
+    def miss(self, name):
+        with self.lock:
+            self.missed[name] += 1
+            self.window_missed += 1
+
+    def take_window(self):
+        """(latencies, errors, missed) since the previous call"""
+        with self.lock:
+            window = (self.window, self.window_errors, self.window_missed)
+            self.window = []
+            self.window_errors = 0
+            self.window_missed = 0
+        return window
+
+    def report(self, elapsed):
+        """Print one line per query and the last error of each failing query"""
+        total = sum(len(values) for values in self.latencies.values())
+        errors = sum(self.errors.values())
+        missed = sum(self.missed.values())
+        rate = total / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Ran {total} queries in {elapsed:.1f}s ({rate:.1f} qps), "
+            f"{errors} errors, {missed} missed"
+        )
+        width = max(len(name) for name in self.latencies)
+        print(
+            f"  {'query':<{width}} {'ok':>8} {'errors':>7} {'missed':>7} {'rows':>8} "
+            f"{'p50':>9} {'p99':>9} {'max':>9}"
+        )
+        for name, values in self.latencies.items():
+            p50, _, p99, peak = summarize_latencies(values)
+            rows = self.rows[name] / len(values) if values else 0.0
+            print(
+                f"  {name:<{width}} {len(values):>8} {self.errors[name]:>7} "
+                f"{self.missed[name]:>7} {rows:>8.1f} {p50 * 1000:>7.1f}ms "
+                f"{p99 * 1000:>7.1f}ms {peak * 1000:>7.1f}ms"
+            )
+        for name, error in self.last_error.items():
+            print(f"  Last error ({name}): {error}")
+
+
+def query_worker(jobs, stats):
+    """
+    Run queries from jobs on one connection until a None job arrives.
+
+    Each job is (query name, due time). A lost connection is reopened on the
+    next job, so a RisingWave restart costs errors, not the worker.
+    """
+    conn = cursor = None
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        name, due = job
+        try:
+            if conn is None:
+                conn = psycopg2.connect(**CONN_PARAMS)
+                conn.autocommit = True
+                cursor = conn.cursor()
+            cursor.execute(QUERIES[name])
+            rows = len(cursor.fetchall())
+            stats.record(name, time.perf_counter() - due, rows)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            stats.error(name, e)
+            if conn is not None:
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+            conn = cursor = None
+        except psycopg2.Error as e:
+            stats.error(name, e)
+    if conn is not None:
+        conn.close()
+
+
+def run_query_load(
+    qps=50.0,
+    connections=8,
+    mix=None,
+    duration=None,
+    report_interval=10.0,
+    backlog=None,
+    seed=None,
+):
+    """
+    Query the views at a target rate until duration elapses or Ctrl+C.
+
+    Args:
+        qps: Target queries per second across all connections
+        connections: Worker threads, each with its own connection
+        mix: {query name: weight} (default: DEFAULT_MIX)
+        duration: Optional run time in seconds (None runs until interrupted)
+        report_interval: Seconds between progress lines
+        backlog: Due queries that may wait for a free connection before
+            further ones are counted as missed (default: 2 per connection)
+        seed: Optional seed for a reproducible query sequence
+    """
+    mix = mix or parse_mix(DEFAULT_MIX)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = stream_rng(seed, "queries")
+    stats = QueryStats(names)
+    jobs = queue.Queue(maxsize=backlog or 2 * connections)
+    workers = [
+        threading.Thread(target=query_worker, args=(jobs, stats), name=f"query-{i}", daemon=True)
+        for i in range(connections)
+    ]
+    for worker in workers:
+        worker.start()
+
+    print(
+        f"Starting view query load ({qps:g} qps over {connections} connections: "
+        f"{', '.join(f'{name}={mix[name]:g}' for name in names)})"
+    )
+    print("Press Ctrl+C to stop")
+
+    started_at = time.perf_counter()
+    deadline = started_at + duration if duration is not None else None
+    due = started_at
+    last_report = started_at
+    try:
+        while deadline is None or due < deadline:
+            now = time.perf_counter()
+            if due > now:
+                time.sleep(due - now)
+            name = rng.choices(names, weights)[0]
+            try:
+                jobs.put_nowait((name, due))
+            except queue.Full:
+                stats.miss(name)
+            due += 1.0 / qps
+
+            if now - last_report >= report_interval:
+                latencies, errors, missed = stats.take_window()
+                p50, _, p99, _ = summarize_latencies(latencies)
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] "
+                    f"{len(latencies) / (now - last_report):.1f} qps, "
+                    f"p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+                    f"{errors} errors, {missed} missed"
+                )
+                last_report = now
+    except KeyboardInterrupt:
+        print("\nQuery load stopped manually")
+    finally:
+        # Drop queries not yet started, then let in-flight ones finish
+        while True:
+            try:
+                jobs.get_nowait()
+            except queue.Empty:
+                break
+        for _ in workers:
+            jobs.put(None)
+        for worker in workers:
+            worker.join()
+        stats.report(time.perf_counter() - started_at)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Query the pipelines' materialized views at a target rate"
+    )
+    parser.add_argument(
+        "--qps",
+        type=parse_rate,
+        default=50.0,
+        help="Target queries per second across all connections (default: 50)",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=8,
+        help="Concurrent connections, one query at a time each (default: 8)",
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help="Comma-separated queries with optional weights, e.g. funnel_analysis=3,geo_readings, "
+        "or 'all' (default: the five dashboard views, equally weighted)",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds to run (default: until Ctrl+C)",
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between progress lines (default: 10)",
+    )
+    parser.add_argument(
+        "--backlog",
+        type=int,
+        default=None,
+        help="Due queries that may wait for a connection before more are counted as missed "
+        "(default: 2 per connection)",
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="Print the available queries and exit",
+    )
+    add_seed_argument(parser)
+
+    args = parser.parse_args()
+    if args.list:
+        for name, sql in QUERIES.items():
+            print(f"{name}: {sql}")
+        sys.exit(0)
+    if args.connections < 1:
+        parser.error("--connections must be at least 1")
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    run_query_load(
+        qps=args.qps,
+        connections=args.connections,
+        mix=mix,
+        duration=args.duration,
+        report_interval=args.report_interval,
+        backlog=args.backlog,
+        seed=args.seed,
+    )
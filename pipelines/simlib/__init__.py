@@ -0,0 +1,6 @@
+"""
+Shared helpers for the pipeline simulators.
+
+The simulators are run as scripts from their pipeline directories and add
+this directory's parent to sys.path before importing from simlib.
+"""
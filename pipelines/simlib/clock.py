@@ -0,0 +1,179 @@
+"""
+Clock abstraction for the pipeline simulators.
+
+Simulators read timestamps with clock.now() and pace themselves with
+clock.sleep(). SystemClock is the wall clock. SimulatedClock starts at a
+fixed timestamp and only moves when the simulator sleeps or advances it, so
+it never actually waits and produces identical timestamps on every run.
+
+BackfillClock is a SimulatedClock that runs until it catches up with the
+wall clock, e.g. to generate weeks of history at full speed and pre-warm
+window state. It then either expires, which ends the run, or continues
+seamlessly as the wall clock. Simulators stop when clock.expired is set and
+check clock.simulated before each wait, since it can change mid-run.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Wall-clock time; sleep() really sleeps"""
+
+    simulated = False
+    expired = False
+
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def advance(self, seconds):
+        """Wall-clock time advances on its own"""
+
+
+class SimulatedClock:
+    """
+    Virtual time starting at `start`.
+
+    sleep() and advance() move the clock forward without waiting, so
+    generation runs as fast as the sink allows.
+    """
+
+    simulated = True
+    expired = False
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self.current += timedelta(seconds=seconds)
+
+
+class BackfillClock(SimulatedClock):
+    """
+    Virtual time from `start` until it reaches the wall clock.
+
+    Until then it behaves like SimulatedClock. Once it catches up it either
+    expires (live=False) or becomes the wall clock (live=True): now() returns
+    datetime.now() and sleep() really sleeps, so a backfilled history runs
+    straight into real-time generation without a gap.
+
+    Args:
+        start: First timestamp, in the past
+        live: Whether to continue in real time after catching up
+        announce: Whether to print a line when the clock catches up
+    """
+
+    def __init__(self, start, live=False, announce=True):
+        super().__init__(start)
+        self.live = live
+        self.announce = announce
+        # Wall time last read; refreshed only when virtual time passes it
+        self.horizon = datetime.now()
+        self._check()
+
+    def _check(self):
+        if self.current < self.horizon:
+            return
+        self.horizon = datetime.now()
+        if self.current < self.horizon:
+            return
+        self.simulated = False
+        self.expired = not self.live
+        if self.announce:
+            action = "switching to real time" if self.live else "stopping"
+            print(f"Backfill caught up with the wall clock at {self.horizon:%Y-%m-%d %H:%M:%S}; {action}")
+
+    def now(self):
+        if self.simulated:
+            return self.current
+        return datetime.now()
+
+    def sleep(self, seconds):
+        if self.simulated:
+            self.advance(seconds)
+        elif seconds > 0:
+            time.sleep(seconds)
+
+    def advance(self, seconds):
+        if self.simulated and seconds > 0:
+            self.current += timedelta(seconds=seconds)
+            self._check()
+
+
+CATCH_UP_MODES = ["stop", "live"]
+
+
+def make_clock(start_time=None, catch_up=None, announce=True):
+    """
+    Clock for a simulator run.
+
+    Args:
+        start_time: Optional datetime to simulate time from (default: the wall clock)
+        catch_up: None to simulate time without bound, or "stop" / "live" to
+            run a BackfillClock that ends the run or switches to real time once
+            it reaches the wall clock
+        announce: Whether a BackfillClock reports catching up
+    """
+    if start_time is None:
+        return SystemClock()
+    if catch_up is None:
+        return SimulatedClock(start_time)
+    return BackfillClock(start_time, live=catch_up == "live", announce=announce)
+
+
+def add_clock_arguments(parser):
+    """Add the common --start-time/--backfill-days/--then-live options"""
+    parser.add_argument(
+        "--start-time",
+        type=datetime.fromisoformat,
+        default=None,
+        help="Use simulated time starting at this ISO timestamp instead of the wall clock",
+    )
+    parser.add_argument(
+        "--backfill-days",
+        type=float,
+        default=None,
+        help="Generate this many days of history up to now in simulated time, as fast as "
+        "the sink allows (sets --start-time)",
+    )
+    parser.add_argument(
+        "--then-live",
+        action="store_true",
+        help="After simulated time catches up with the wall clock, continue in real time",
+    )
+
+
+def clock_options(args, step=None):
+    """
+    Resolve the clock options into (start_time, catch_up) for make_clock().
+
+    --backfill-days starts that many days ago and stops at the present
+    unless --then-live is given; --then-live alone backfills from
+    --start-time. Plain --start-time keeps unbounded simulated time.
+
+    step is the simulator's simulated seconds per row or tick; a backfill
+    that never advances time would never catch up, so it must be positive.
+    """
+    start_time = args.start_time
+    catch_up = None
+    if args.backfill_days is not None:
+        start_time = datetime.now() - timedelta(days=args.backfill_days)
+        catch_up = "stop"
+    if args.then_live:
+        if start_time is None:
+            raise ValueError("--then-live needs --start-time or --backfill-days")
+        catch_up = "live"
+    if catch_up is not None and step is not None and step <= 0:
+        raise ValueError("a backfill needs a positive --interval to advance simulated time")
+    return start_time, catch_up
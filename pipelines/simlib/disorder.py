@@ -0,0 +1,280 @@
+"""
+Controlled out-of-order and late-event injection.
+
+The simulators stamp rows with a monotonically increasing clock, so the
+watermarked views (event_time minus a fixed delay, see each pipeline's
+create_tables.sql) never see late data. DisorderSink sits in front of
+another sink and holds back a configurable fraction of the rows of tables
+with an event-time column. Each held row is released only after the stream
+has moved a bounded delay past its event time. The row therefore arrives
+late and out of order but keeps its original timestamp.
+
+Delays are measured in event time: a held row is released once a row at
+least its delay newer has been seen, so disorder behaves the same on the
+wall clock and on simulated or backfill clocks. Only held rows are buffered,
+in a heap ordered by release time, so memory is bounded by roughly
+fraction * rate * max_delay rows, never the whole stream.
+
+For every row it sends, the sink tracks the watermark: the newest event time
+sent so far minus the table's watermark delay. A row sent with an event time
+below the watermark is counted as beyond the watermark, so a run reports
+exactly how many rows the watermark would have treated as late. The count
+follows the order rows are handed to the inner sink. A pooled writer
+(--resilient) may commit concurrent batches in a slightly different order.
+
+Usage:
+    sink = DisorderSink(sink, DisorderModel(0.05, max_delay=30.0))
+    sink.write(SENSOR_READINGS, rows)
+    sink.close()   # releases held rows, then reports
+"""
+
+import heapq
+from datetime import timedelta
+
+from simlib.rng import stream_rng
+from simlib.sinks import Sink
+
+DELAY_DISTRIBUTIONS = ["uniform", "exponential"]
+
+
+class DisorderModel:
+    """
+    Which rows to delay, and by how much.
+
+    Args:
+        fraction: Probability in [0, 1] that a row is delayed
+        max_delay: Upper bound on a delay in seconds of event time
+        distribution: "uniform" draws delays uniformly from [0, max_delay];
+            "exponential" has mean max_delay / 4 and is truncated at
+            max_delay, so most delayed rows are slightly late and a few
+            arrive very late
+        rng: random.Random to draw from
+    """
+
+    def __init__(self, fraction, max_delay, distribution="uniform", rng=None):
+        if not 0.0 <= fraction <= 1.0:
+            raise ValueError("disorder fraction must be between 0 and 1")
+        if max_delay <= 0:
+            raise ValueError("maximum delay must be positive")
+        if distribution not in DELAY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown delay distribution: {distribution}")
+        self.fraction = fraction
+        self.max_delay = max_delay
+        self.distribution = distribution
+        self.rng = rng or stream_rng(None, "disorder")
+
+    def delay(self):
+        """Seconds to hold the next row back, or None to send it in order"""
+        rng = self.rng
+        if rng.random() >= self.fraction:
+            return None
+        if self.distribution == "uniform":
+            return rng.uniform(0.0, self.max_delay)
+        return min(self.max_delay, rng.expovariate(4.0 / self.max_delay))
+
+
+class _DisorderedTable:
+    """Held rows and watermark accounting for one table"""
+
+    def __init__(self, table, watermark_delay):
+        self.table = table
+        self.index = table.columns.index(table.event_time)
+        self.watermark_delay = timedelta(seconds=watermark_delay)
+        # (release time, sequence, row); the sequence keeps equal times FIFO
+        self.held = []
+        self.sequence = 0
+        # Newest event time generated, which drives releases
+        self.stream_time = None
+        # Newest event time sent, which drives the watermark
+        self.sent_time = None
+
+        self.rows = 0
+        self.delayed = 0
+        self.out_of_order = 0
+        self.beyond_watermark = 0
+        self.max_lateness = timedelta(0)
+        self.peak_held = 0
+
+    def _send(self, row, out):
+        event_time = row[self.index]
+        if self.sent_time is None or event_time >= self.sent_time:
+            self.sent_time = event_time
+        else:
+            self.out_of_order += 1
+            lateness = self.sent_time - self.watermark_delay - event_time
+            if lateness > timedelta(0):
+                self.beyond_watermark += 1
+                if lateness > self.max_lateness:
+                    self.max_lateness = lateness
+        out.append(row)
+
+    def process(self, rows, model):
+        """Rows to send now: the undelayed ones, plus held rows now due"""
+        out = []
+        held = self.held
+        index = self.index
+        for row in rows:
+            event_time = row[index]
+            if self.stream_time is None or event_time > self.stream_time:
+                self.stream_time = event_time
+                while held and held[0][0] <= event_time:
+                    self._send(heapq.heappop(held)[2], out)
+            delay = model.delay()
+            if delay is None:
+                self._send(row, out)
+            else:
+                self.delayed += 1
+                self.sequence += 1
+                heapq.heappush(
+                    held, (event_time + timedelta(seconds=delay), self.sequence, row)
+                )
+                if len(held) > self.peak_held:
+                    self.peak_held = len(held)
+        self.rows += len(rows)
+        return out
+
+    def release(self):
+        """Every held row, in release order"""
+        out = []
+        while self.held:
+            self._send(heapq.heappop(self.held)[2], out)
+        return out
+
+    def report(self):
+        delayed = self.delayed / self.rows * 100 if self.rows else 0.0
+        beyond = self.beyond_watermark / self.rows * 100 if self.rows else 0.0
+        return (
+            f"Disorder ({self.table.name}): {self.rows} rows, {self.delayed} delayed ({delayed:.1f}%), "
+            f"{self.out_of_order} sent out of order, {self.beyond_watermark} beyond the "
+            f"{self.watermark_delay.total_seconds():g}s watermark ({beyond:.2f}%, latest by "
+            f"{self.max_lateness.total_seconds():.1f}s), peak {self.peak_held} rows held"
+        )
+
+
+class DisorderSink(Sink):
+    """
+    Delay and reorder rows on their way to another sink.
+
+    Tables with an event_time column are disordered; rows of other tables
+    pass straight through. write_tables() keeps its single transaction for
+    the rows sent now, but a held row is committed later, apart from the
+    rows it was generated with.
+
+    Args:
+        sink: Sink to forward rows to
+        model: DisorderModel deciding which rows to delay
+        watermark_delay: Seconds the watermark lags the newest event time;
+            defaults to each table's own watermark_delay
+    """
+
+    def __init__(self, sink, model, watermark_delay=None):
+        self.sink = sink
+        self.model = model
+        self.watermark_delay = watermark_delay
+        self.tables = {}
+
+    def _state(self, table):
+        if table.event_time is None:
+            return None
+        state = self.tables.get(table.name)
+        if state is None:
+            delay = self.watermark_delay
+            if delay is None:
+                delay = table.watermark_delay or 0.0
+            state = self.tables[table.name] = _DisorderedTable(table, delay)
+        return state
+
+    def write(self, table, rows):
+        state = self._state(table)
+        if state is not None:
+            rows = state.process(rows, self.model)
+        if rows:
+            self.sink.write(table, rows)
+
+    def write_tables(self, batches):
+        sent = []
+        for table, rows in batches:
+            state = self._state(table)
+            sent.append((table, rows if state is None else state.process(rows, self.model)))
+        self.sink.write_tables(sent)
+
+    def flush(self):
+        self.sink.flush()
+
+    def close(self):
+        """Send every row still held back, report, and close the inner sink"""
+        try:
+            for state in self.tables.values():
+                rows = state.release()
+                if rows:
+                    self.sink.write(state.table, rows)
+            self.report()
+        finally:
+            self.sink.close()
+
+    def report(self):
+        for state in self.tables.values():
+            print(state.report())
+
+
+def add_disorder_arguments(parser):
+    """Add the common --disorder/--max-delay/--delay-distribution/--watermark-delay options"""
+    parser.add_argument(
+        "--disorder",
+        type=float,
+        default=0.0,
+        help="Fraction of events to deliver late and out of order, e.g. 0.05 (default: 0)",
+    )
+    parser.add_argument(
+        "--max-delay",
+        type=float,
+        default=30.0,
+        help="Upper bound in seconds of event time on how late a --disorder event "
+        "arrives (default: 30)",
+    )
+    parser.add_argument(
+        "--delay-distribution",
+        choices=DELAY_DISTRIBUTIONS,
+        default="uniform",
+        help="Distribution of --disorder delays up to --max-delay (default: uniform)",
+    )
+    parser.add_argument(
+        "--watermark-delay",
+        type=float,
+        default=None,
+        help="Watermark delay in seconds used to count events beyond the watermark "
+        "(default: the pipeline's, as in create_tables.sql)",
+    )
+
+
+def disorder_options(args):
+    """DisorderSink settings from parsed arguments, or None without --disorder"""
+    if not args.disorder:
+        return None
+    # Validate up front so bad values are reported as usage errors
+    DisorderModel(args.disorder, args.max_delay, args.delay_distribution)
+    return {
+        "fraction": args.disorder,
+        "max_delay": args.max_delay,
+        "distribution": args.delay_distribution,
+        "watermark_delay": args.watermark_delay,
+        "seed": getattr(args, "seed", None),
+    }
+
+
+def open_disorder(sink, disorder_config, *labels):
+    """
+    Wrap sink in a DisorderSink, or return it unchanged without a config.
+
+    labels name the RNG stream, so workers writing through their own sinks
+    delay different rows for the same seed.
+    """
+    if disorder_config is None:
+        return sink
+    model = DisorderModel(
+        disorder_config["fraction"],
+        disorder_config["max_delay"],
+        disorder_config.get("distribution", "uniform"),
+        stream_rng(disorder_config.get("seed"), "disorder", *labels),
+    )
+    return DisorderSink(sink, model, disorder_config.get("watermark_delay"))
@@ -0,0 +1,249 @@
+"""
+ID-range leasing for restartable generators.
+
+Instead of scanning the target table for its highest ID at startup, a
+generator leases blocks of IDs from a small store and hands them out until the
+block is used up. A restarted (or crashed) generator simply leases the next
+block, so it resumes instantly and never collides with IDs handed out before;
+unused parts of a block are skipped.
+
+Two stores are provided:
+
+- FileLeaseStore: a JSON checkpoint of the next free ID per namespace,
+  updated under an exclusive file lock, for generators on one host.
+- TableLeaseStore: an `id_leases` table in RisingWave with one row per
+  claimed block. The table keeps the first row written for a key
+  (ON CONFLICT DO NOTHING), so concurrent claimers of the same block can read
+  back which of them won, and the losers retry with the next block.
+
+Usage:
+    store = open_lease_store("file", path="ids.json")
+    ids = LeasedIds(store, "user_events.event_id", block_size=100000)
+    event_id = f"E{ids.next()}"
+"""
+
+import fcntl
+import json
+import os
+import uuid
+from datetime import datetime
+
+LEASE_KINDS = ["auto", "none", "file", "table"]
+
+CREATE_LEASE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS id_leases (
+        namespace VARCHAR,
+        block_start BIGINT,
+        block_size BIGINT,
+        owner VARCHAR,
+        claimed_at TIMESTAMP,
+        PRIMARY KEY (namespace, block_start)
+    ) ON CONFLICT DO NOTHING
+"""
+
+
+class IdSequence:
+    """
+    The unbounded sequence first + offset + k * stride.
+
+    Shards that share a stride and use distinct offsets never collide.
+    """
+
+    def __init__(self, first, offset=0, stride=1):
+        self.value = first + offset
+        self.stride = stride
+
+    def next(self):
+        value = self.value
+        self.value += self.stride
+        return value
+
+    def take(self, count):
+        """The next count IDs as a list"""
+        values = list(range(self.value, self.value + count * self.stride, self.stride))
+        self.value += count * self.stride
+        return values
+
+
+class LeasedIds:
+    """
+    IDs handed out from blocks leased from a store.
+
+    Args:
+        store: FileLeaseStore or TableLeaseStore
+        namespace: Name of the ID space, e.g. "user_events.event_id"
+        block_size: IDs per lease
+        initial: Optional callable returning the first ID to use if the
+            namespace has never been leased (e.g. one legacy MAX() scan)
+    """
+
+    def __init__(self, store, namespace, block_size=100000, initial=None):
+        self.store = store
+        self.namespace = namespace
+        self.block_size = block_size
+        self.initial = initial
+        self.value = 0
+        self.end = 0
+
+    def _lease(self):
+        self.value = self.store.claim(self.namespace, self.block_size, self.initial)
+        self.end = self.value + self.block_size
+
+    def next(self):
+        if self.value >= self.end:
+            self._lease()
+        value = self.value
+        self.value += 1
+        return value
+
+    def take(self, count):
+        """The next count IDs as a list, leasing more blocks as needed"""
+        values = []
+        while len(values) < count:
+            if self.value >= self.end:
+                self._lease()
+            n = min(count - len(values), self.end - self.value)
+            values.extend(range(self.value, self.value + n))
+            self.value += n
+        return values
+
+
+class FileLeaseStore:
+    """
+    Next free ID per namespace in a local JSON checkpoint file.
+
+    Claims hold an exclusive lock on <path>.lock and replace the checkpoint
+    atomically, so parallel processes on the same host get disjoint blocks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def claim(self, namespace, count, initial=None):
+        """Lease count IDs and return the first one"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                checkpoint = {}
+                if os.path.exists(self.path):
+                    with open(self.path) as f:
+                        checkpoint = json.load(f)
+                start = checkpoint.get(namespace)
+                if start is None:
+                    start = initial() if initial is not None else 0
+                checkpoint[namespace] = start + count
+
+                tmp = self.path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(checkpoint, f, indent=2, sort_keys=True)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                return start
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def close(self):
+        pass
+
+
+class TableLeaseStore:
+    """
+    Leased blocks recorded as rows of the `id_leases` table.
+
+    Claiming reads the end of the highest block in the namespace (a lookup
+    in a table with one row per block, not a scan of the data), inserts the
+    next block with a unique owner token, flushes, and reads the owner back.
+    """
+
+    def __init__(self, conn_params):
+        import psycopg2
+
+        self.conn = psycopg2.connect(**conn_params)
+        self.conn.autocommit = True
+        self.cursor = self.conn.cursor()
+        self.cursor.execute(CREATE_LEASE_TABLE_SQL)
+
+    def claim(self, namespace, count, initial=None):
+        """Lease count IDs and return the first one"""
+        cursor = self.cursor
+        while True:
+            cursor.execute(
+                "SELECT MAX(block_start + block_size) FROM id_leases WHERE namespace = %s",
+                (namespace,),
+            )
+            start = cursor.fetchone()[0]
+            if start is None:
+                start = initial() if initial is not None else 0
+
+            owner = uuid.uuid4().hex
+            cursor.execute(
+                "INSERT INTO id_leases (namespace, block_start, block_size, owner, claimed_at) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (namespace, start, count, owner, datetime.now()),
+            )
+            cursor.execute("FLUSH")
+            cursor.execute(
+                "SELECT owner FROM id_leases WHERE namespace = %s AND block_start = %s",
+                (namespace, start),
+            )
+            if cursor.fetchone()[0] == owner:
+                return start
+
+    def close(self):
+        self.conn.close()
+
+
+def open_lease_store(kind, conn_params=None, path="id_leases.json"):
+    """Create a lease store by name ("file" or "table"); None for "none" """
+    if kind == "file":
+        return FileLeaseStore(path)
+    if kind == "table":
+        return TableLeaseStore(conn_params)
+    return None
+
+
+def resolve_lease_kind(kind, sink_kind):
+    """
+    Map "auto" to the checkpoint file for the postgres sink and to no leasing otherwise.
+
+    The id_leases table is only created when asked for with "table", so a
+    default run adds nothing to the database schema.
+    """
+    if kind == "auto":
+        return "file" if sink_kind == "postgres" else "none"
+    return kind
+
+
+def add_lease_arguments(parser):
+    """Add the common --id-lease/--lease-file/--lease-block options"""
+    parser.add_argument(
+        "--id-lease",
+        choices=LEASE_KINDS,
+        default="auto",
+        help="Where to lease ID blocks from: a local checkpoint file, an id_leases table "
+        "in RisingWave (created if missing), or none (default: auto, the file for the "
+        "postgres sink, else none)",
+    )
+    parser.add_argument(
+        "--lease-file",
+        default="id_leases.json",
+        help="Checkpoint file for --id-lease file (default: id_leases.json)",
+    )
+    parser.add_argument(
+        "--lease-block",
+        type=int,
+        default=100000,
+        help="IDs per leased block (default: 100000)",
+    )
+
+
+def lease_options(args):
+    """Collect the lease options from parsed arguments, resolving "auto" against --sink"""
+    return {
+        "kind": resolve_lease_kind(args.id_lease, getattr(args, "sink", "postgres")),
+        "path": args.lease_file,
+        "block_size": args.lease_block,
+    }
@@ -0,0 +1,468 @@
+"""
+Live metrics for the pipeline simulators.
+
+SimulatorMetrics counts rows handed to and committed by the sink per table,
+batch sizes, commit latency, buffer depth and reconnects of the resilient
+writer, and the generator's CPU time. It can serve them over HTTP in the
+Prometheus text format and print a periodic summary line, so a load
+generator is observable in the same place as the cluster it drives:
+
+    metrics = open_metrics({"port": 9108, "summary_interval": 10})
+    sink = open_sink("postgres", conn_params, metrics=metrics)
+    ...
+    metrics.close()
+
+Sinks record into it once per batch, never per row. SampledLog replaces the
+simulators' per-row print with at most one line per interval.
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from simlib.profile import NULL_PROFILER
+from simlib.stats import LatencyHistogram
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """A monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=(), lock=None):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = lock or threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def total(self):
+        with self.lock:
+            return sum(self.values.values())
+
+    def samples(self):
+        with self.lock:
+            return [
+                (self.name + _labels(self.label_names, labels), value)
+                for labels, value in sorted(self.values.items())
+            ]
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+
+class CallbackMetric:
+    """A counter or gauge whose single value is read from a function at scrape time"""
+
+    def __init__(self, name, help, kind, fn):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        return [(self.name, self.fn())]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labels=(), lock=None):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(buckets)
+        self.label_names = tuple(labels)
+        self.lock = lock or threading.Lock()
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self.series = {}
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.bounds, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        out = []
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(self.bounds + ("+Inf",), counts):
+                    cumulative += n
+                    out.append(
+                        (
+                            f"{self.name}_bucket"
+                            + _labels(self.label_names + ("le",), labels + (bound,)),
+                            cumulative,
+                        )
+                    )
+                out.append((f"{self.name}_sum" + _labels(self.label_names, labels), total))
+                out.append((f"{self.name}_count" + _labels(self.label_names, labels), count))
+        return out
+
+
+class Registry:
+    """Metrics in registration order, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels, self.lock))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels, self.lock))
+
+    def histogram(self, name, help, buckets, labels=()):
+        return self._add(Histogram(name, help, buckets, labels, self.lock))
+
+    def callback(self, name, help, kind, fn):
+        return self._add(CallbackMetric(name, help, kind, fn))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def thread_cpu_clock(thread=None):
+    """
+    A function returning the CPU seconds used by thread (default: the main thread).
+
+    Falls back to the whole process's CPU time where per-thread clocks are
+    unavailable.
+    """
+    thread = thread or threading.main_thread()
+    try:
+        clock_id = time.pthread_getcpuclockid(thread.ident)
+        time.clock_gettime(clock_id)
+    except (AttributeError, OSError):
+        return time.process_time
+    return lambda: time.clock_gettime(clock_id)
+
+
+def metrics_server(registry, host, port):
+    """An HTTP server rendering registry at /metrics; run serve_forever() on a thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+class SimulatorMetrics:
+    """
+    The standard simulator metrics, with an optional HTTP endpoint and summary line.
+
+    Args:
+        port: Port to serve /metrics on (0 picks a free one), or None for no endpoint
+        host: Address to bind the endpoint to
+        summary_interval: Seconds between summary lines, or None for none
+    """
+
+    def __init__(self, port=None, host="127.0.0.1", summary_interval=None):
+        self.registry = registry = Registry()
+        self.rows_generated = registry.counter(
+            "pipedream_rows_generated_total", "Rows handed to the sink", ["table"]
+        )
+        self.rows_written = registry.counter(
+            "pipedream_rows_written_total", "Rows committed by the sink", ["table"]
+        )
+        self.batches = registry.counter(
+            "pipedream_batches_written_total", "Batches (transactions) committed by the sink"
+        )
+        self.batch_rows = registry.histogram(
+            "pipedream_batch_rows", "Rows per committed batch", BATCH_ROW_BUCKETS
+        )
+        self.commit_seconds = registry.histogram(
+            "pipedream_commit_seconds", "Time to write and commit a batch", LATENCY_BUCKETS
+        )
+        self.cpu_seconds = thread_cpu_clock()
+        registry.callback(
+            "pipedream_generator_cpu_seconds_total",
+            "CPU time of the generating thread or worker processes",
+            "counter",
+            lambda: self.cpu_seconds(),
+        )
+        registry.callback(
+            "process_cpu_seconds_total", "CPU time of the whole process", "counter", time.process_time
+        )
+        self.buffered = None
+        self.reconnects = None
+
+        self.port = port
+        self.host = host
+        self.summary_interval = summary_interval
+        self.server = None
+        self.stopped = threading.Event()
+        self.threads = []
+        # Commit latencies since the last summary line, guarded by the registry lock
+        self.recent = LatencyHistogram()
+        # (time, rows generated, rows written, CPU seconds) at the last summary
+        self.last_summary = (time.perf_counter(), 0, 0, self.cpu_seconds())
+
+    def set_cpu_clock(self, fn):
+        """Measure generator CPU time with fn instead, e.g. summed over worker processes"""
+        self.cpu_seconds = fn
+        last_time, generated, written, _ = self.last_summary
+        self.last_summary = (last_time, generated, written, fn())
+
+    def watch_sink(self, sink):
+        """Export a resilient sink's buffer depth, reconnects and retries"""
+        if not hasattr(sink, "pending"):
+            return
+        self.buffered = self.registry.callback(
+            "pipedream_buffered_rows",
+            "Rows buffered, spilled or in flight in the resilient writer",
+            "gauge",
+            sink.pending,
+        )
+        self.reconnects = self.registry.callback(
+            "pipedream_reconnects_total",
+            "Reconnect attempts by the resilient writer",
+            "counter",
+            lambda: sink.reconnects,
+        )
+        self.registry.callback(
+            "pipedream_retries_total",
+            "Batch write retries by the resilient writer",
+            "counter",
+            lambda: sink.retries,
+        )
+        self.registry.callback(
+            "pipedream_rows_dropped_total",
+            "Rows dropped, failed or lost by the resilient writer",
+            "counter",
+            lambda: sink.dropped_rows + sink.failed_rows + sink.lost_rows,
+        )
+
+    def generated(self, batches):
+        """Record (table name, row count) pairs handed to the sink"""
+        for name, count in batches:
+            if count:
+                self.rows_generated.inc(count, name)
+
+    def written(self, batches, seconds):
+        """Record (table name, row count) pairs committed together in seconds"""
+        total = 0
+        for name, count in batches:
+            if count:
+                self.rows_written.inc(count, name)
+                total += count
+        if not total:
+            return
+        self.batches.inc()
+        self.batch_rows.observe(total)
+        self.commit_seconds.observe(seconds)
+        with self.registry.lock:
+            self.recent.add(seconds)
+
+    def add_remote(self, table_name, rows, latencies):
+        """Record rows and per-batch commit latencies reported by a worker process"""
+        if rows:
+            self.rows_generated.inc(rows, table_name)
+            self.rows_written.inc(rows, table_name)
+        if latencies:
+            self.batches.inc(len(latencies))
+            for seconds in latencies:
+                self.commit_seconds.observe(seconds)
+            with self.registry.lock:
+                self.recent.extend(latencies)
+
+    def start(self):
+        """Start the endpoint and the summary thread, as configured"""
+        if self.port is not None:
+            self.server = metrics_server(self.registry, self.host, self.port)
+            self.port = self.server.server_address[1]
+            self._spawn(self.server.serve_forever, "metrics-http")
+            print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        if self.summary_interval:
+            self._spawn(self._run_summary, "metrics-summary")
+        return self
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _run_summary(self):
+        while not self.stopped.wait(self.summary_interval):
+            print(self.summary())
+
+    def summary(self):
+        """One line of totals and rates since the previous summary"""
+        now = time.perf_counter()
+        generated = self.rows_generated.total()
+        written = self.rows_written.total()
+        cpu = self.cpu_seconds()
+        with self.registry.lock:
+            recent, self.recent = self.recent, LatencyHistogram()
+        last_time, last_generated, last_written, last_cpu = self.last_summary
+        self.last_summary = (now, generated, written, cpu)
+        elapsed = max(now - last_time, 1e-9)
+
+        parts = [
+            f"{generated} rows generated ({(generated - last_generated) / elapsed:.0f}/s)",
+            f"{written} written ({(written - last_written) / elapsed:.0f}/s)",
+        ]
+        if recent:
+            p50, _, p99, _ = recent.summary()
+            parts.append(
+                f"{len(recent)} commits, p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms"
+            )
+        if self.buffered is not None:
+            parts.append(f"{self.buffered.fn()} rows buffered")
+            parts.append(f"{self.reconnects.fn()} reconnects")
+        parts.append(f"generator CPU {(cpu - last_cpu) / elapsed * 100:.0f}%")
+        return f"[{datetime.now().strftime('%H:%M:%S')}] " + ", ".join(parts)
+
+    def close(self):
+        """Stop the summary thread and the endpoint"""
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+
+
+class SampledLog:
+    """
+    Print at most one line per interval seconds.
+
+    At any meaningful rate a print per row costs more than generating the
+    row; the sampled log keeps a trickle of example lines and says how many
+    were skipped in between. An interval of 0 prints every line.
+
+    Usage:
+        if log.ready():
+            log.print(f"Inserted {row}")
+    """
+
+    def __init__(self, interval=1.0, enabled=True, profiler=NULL_PROFILER):
+        self.interval = interval
+        self.enabled = enabled
+        self.profiler = profiler
+        self.last = None
+        self.skipped = 0
+
+    def ready(self):
+        """Whether the next line should be printed; call print() if so"""
+        if not self.enabled:
+            return False
+        now = time.perf_counter()
+        if self.last is None or now - self.last >= self.interval:
+            self.last = now
+            return True
+        self.skipped += 1
+        return False
+
+    def print(self, line):
+        if self.skipped:
+            line += f" (+{self.skipped} not shown)"
+            self.skipped = 0
+        with self.profiler.stage("print"):
+            print(line)
+
+
+def open_metrics(metrics_config):
+    """A started SimulatorMetrics for a metrics_options() config, or None"""
+    if metrics_config is None:
+        return None
+    return SimulatorMetrics(
+        port=metrics_config.get("port"),
+        host=metrics_config.get("host", "127.0.0.1"),
+        summary_interval=metrics_config.get("summary_interval"),
+    ).start()
+
+
+def add_metrics_arguments(parser):
+    """Add the common --metrics-port/--metrics-host/--summary-interval/--log-interval options"""
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this port at /metrics (default: off)",
+    )
+    parser.add_argument(
+        "--metrics-host",
+        default="127.0.0.1",
+        help="Address for --metrics-port to bind to (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--summary-interval",
+        type=float,
+        default=None,
+        help="Print a throughput and commit latency summary line every N seconds",
+    )
+    parser.add_argument(
+        "--log-interval",
+        type=float,
+        default=1.0,
+        help="Print at most one per-row log line every N seconds, 0 for every row (default: 1)",
+    )
+
+
+def metrics_options(args):
+    """open_metrics() settings from parsed arguments, or None if no metrics were requested"""
+    if args.metrics_port is None and not args.summary_interval:
+        return None
+    return {
+        "port": args.metrics_port,
+        "host": args.metrics_host,
+        "summary_interval": args.summary_interval,
+    }
@@ -0,0 +1,216 @@
+"""
+PostgreSQL binary COPY encoding for the postgres sink.
+
+With INSERT ... VALUES, every double, int and timestamp is formatted as text
+by the client and parsed again by the server. BinaryCopyEncoder writes
+batches straight into the binary COPY format instead: fixed-width values are
+packed big-endian with struct.pack_into, strings are copied in as UTF-8, and
+a batch is streamed with COPY ... FROM STDIN (FORMAT binary).
+
+Each encoder owns one bytearray that grows to the largest batch and is
+reused for every later one, so no bytes object is built per row. The row
+encoder is generated per table: the values between two variable-length
+columns, plus the length prefix of the next one, are packed with a single
+precompiled Struct.
+
+Usage:
+    encoder = BinaryCopyEncoder(SENSOR_READINGS)
+    encoder.copy(cursor, rows)
+"""
+
+import struct
+from datetime import datetime, timedelta
+
+# Binary COPY file header (signature, flags, header extension length) and trailer
+SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+HEADER = SIGNATURE + struct.pack(">ii", 0, 0)
+TRAILER = struct.pack(">h", -1)
+
+# Fixed-width SQL types -> struct code of the value; every value is preceded
+# by its int32 byte length
+FIXED_TYPES = {
+    "double": "d",
+    "bigint": "q",
+    "int": "i",
+    "boolean": "?",
+    "timestamp": "q",
+}
+VARIABLE_TYPES = {"varchar", "jsonb"}
+
+# Timestamps are microseconds since 2000-01-01
+PG_EPOCH = datetime(2000, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# jsonb binary format version byte
+JSONB_VERSION = 1
+
+# Bytes handed to the server per read() while streaming a batch
+COPY_CHUNK = 1 << 20
+
+
+def _timestamp(value):
+    return (value - PG_EPOCH) // MICROSECOND
+
+
+class _BufferReader:
+    """File-like view of an encoded batch for cursor.copy_expert()"""
+
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def read(self, size=-1):
+        start = self.pos
+        end = len(self.view) if size is None or size < 0 else min(start + size, len(self.view))
+        self.pos = end
+        return bytes(self.view[start:end])
+
+
+class BinaryCopyEncoder:
+    """
+    Encode rows of one Table into a reusable binary COPY buffer.
+
+    Args:
+        table: Table whose column types are all keys of FIXED_TYPES or
+            VARIABLE_TYPES
+        initial_size: Starting buffer size in bytes; the buffer doubles as needed
+    """
+
+    def __init__(self, table, initial_size=1 << 16):
+        for column, sql_type in zip(table.columns, table.types):
+            if sql_type not in FIXED_TYPES and sql_type not in VARIABLE_TYPES:
+                raise ValueError(f"Binary COPY does not support {sql_type} column {column}")
+        self.table = table
+        self.copy_sql = (
+            f"COPY {table.name} ({', '.join(table.columns)}) FROM STDIN (FORMAT binary)"
+        )
+        self.buffer = bytearray(max(initial_size, len(HEADER) + len(TRAILER)))
+        self.buffer[: len(HEADER)] = HEADER
+        self._encode_rows = self._compile()
+
+    def _compile(self):
+        """
+        Generate the row loop for this table's column layout.
+
+        Rows that don't fit the fast path (a None value, a wrong type) are
+        re-encoded field by field with _encode_slow().
+        """
+        types = self.table.types
+        count = len(types)
+        namespace = {"_timestamp": _timestamp, "_slow": self._encode_slow}
+        lines = [
+            "def encode_rows(rows, buf, pos):",
+            "    capacity = len(buf)",
+            "    for row in rows:",
+            "        start = pos",
+            "        try:",
+        ]
+        body = []
+        # Encode variable-length values first, to size the row
+        variable = [i for i, t in enumerate(types) if t in VARIABLE_TYPES]
+        for i in variable:
+            body.append(f"b{i} = row[{i}].encode()")
+            body.append(f"n{i} = len(b{i})")
+        fixed_size = 2 + 4 * count + sum(
+            struct.calcsize(">" + FIXED_TYPES[t]) for t in types if t in FIXED_TYPES
+        )
+        fixed_size += sum(1 for t in types if t == "jsonb")
+        size = " + ".join([str(fixed_size)] + [f"n{i}" for i in variable])
+        body.append(f"if pos + {size} + 2 > capacity:")
+        body.append("    return pos, row")
+
+        # One pack_into per run of fixed values, ending with the next length prefix
+        codes, args = ["h"], [str(count)]
+        run = 0
+        for i, sql_type in enumerate(types):
+            if sql_type in FIXED_TYPES:
+                code = FIXED_TYPES[sql_type]
+                value = f"_timestamp(row[{i}])" if sql_type == "timestamp" else f"row[{i}]"
+                codes += ["i", code]
+                args += [str(struct.calcsize(">" + code)), value]
+                continue
+            if sql_type == "jsonb":
+                codes += ["i", "B"]
+                args += [f"n{i} + 1", str(JSONB_VERSION)]
+            else:
+                codes.append("i")
+                args.append(f"n{i}")
+            pack = f"_s{run}"
+            namespace[pack] = struct.Struct(">" + "".join(codes))
+            body.append(f"{pack}.pack_into(buf, pos, {', '.join(args)})")
+            body.append(f"pos += {namespace[pack].size}")
+            body.append(f"buf[pos : pos + n{i}] = b{i}")
+            body.append(f"pos += n{i}")
+            codes, args = [], []
+            run += 1
+        if codes:
+            pack = f"_s{run}"
+            namespace[pack] = struct.Struct(">" + "".join(codes))
+            body.append(f"{pack}.pack_into(buf, pos, {', '.join(args)})")
+            body.append(f"pos += {namespace[pack].size}")
+
+        lines += ["            " + line for line in body]
+        lines += [
+            "        except (AttributeError, TypeError, struct.error):",
+            "            pos = _slow(row, buf, start)",
+            "            if pos is None:",
+            "                return start, row",
+            "    return pos, None",
+        ]
+        namespace["struct"] = struct
+        exec("\n".join(lines), namespace)
+        return namespace["encode_rows"]
+
+    def _encode_slow(self, row, buf, pos):
+        """Encode one row field by field, with NULLs; None if the buffer is too small"""
+        parts = [struct.pack(">h", len(row))]
+        for value, sql_type in zip(row, self.table.types):
+            if value is None:
+                parts.append(struct.pack(">i", -1))
+                continue
+            if sql_type in VARIABLE_TYPES:
+                data = value.encode() if isinstance(value, str) else bytes(value)
+                if sql_type == "jsonb":
+                    data = bytes([JSONB_VERSION]) + data
+            elif sql_type == "timestamp":
+                data = struct.pack(">q", _timestamp(value))
+            else:
+                data = struct.pack(">" + FIXED_TYPES[sql_type], value)
+            parts.append(struct.pack(">i", len(data)))
+            parts.append(data)
+        encoded = b"".join(parts)
+        if pos + len(encoded) + len(TRAILER) > len(buf):
+            return None
+        buf[pos : pos + len(encoded)] = encoded
+        return pos + len(encoded)
+
+    def encode(self, rows):
+        """
+        Encode a batch as a complete binary COPY stream.
+
+        Returns a memoryview into the reusable buffer, valid until the next
+        call; release it before encoding the next batch.
+        """
+        pos = len(HEADER)
+        remaining = iter(rows)
+        while True:
+            # Slice assignment through a memoryview is cheaper than on the bytearray
+            with memoryview(self.buffer) as buf:
+                pos, stuck = self._encode_rows(remaining, buf, pos)
+            if stuck is None:
+                break
+            # Out of room: double the buffer and resume at the row that didn't fit
+            self.buffer.extend(bytes(len(self.buffer)))
+            remaining = _chain_one(stuck, remaining)
+        self.buffer[pos : pos + len(TRAILER)] = TRAILER
+        return memoryview(self.buffer)[: pos + len(TRAILER)]
+
+    def copy(self, cursor, rows):
+        """Stream rows into the table with one COPY ... FROM STDIN (FORMAT binary)"""
+        with self.encode(rows) as view:
+            cursor.copy_expert(self.copy_sql, _BufferReader(view), size=COPY_CHUNK)
+
+
+def _chain_one(first, rest):
+    yield first
+    yield from rest
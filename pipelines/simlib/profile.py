@@ -0,0 +1,289 @@
+"""
+Per-stage profiling for the pipeline simulators.
+
+When a simulator underperforms, the question is which stage the time goes
+to: generating values, serializing payloads, executing statements,
+committing, or printing. Profiler wraps each stage in a cheap timer and, at
+exit, prints a breakdown of total time, calls and p99 per call for every
+stage:
+
+    profiler = open_profiler({"output": "profile"})
+    with profiler.stage("generate"):
+        row = make_row()
+    profiler.close()   # prints the breakdown, writes profile.stages.txt
+
+Stages nest per thread: a "commit" inside a "sink" stage is reported as
+sink;commit, and its time also counts towards sink. Per-call durations go
+into log-scale buckets, so memory stays constant however long the run, and
+the p99 is accurate to within 1/8.
+
+Optionally a sampling thread also records the generator thread's Python
+stack at a fixed interval (while the generator is busy, no more often than
+Python's 5 ms thread switch interval). Either way, close() writes
+<output>.collapsed in the collapsed-stack format read by flamegraph.pl and
+speedscope: sampled stacks with sample counts, or without sampling the
+stage paths with their self time in microseconds.
+
+Without --profile, open_profiler() returns NULL_PROFILER, whose stages do
+nothing, so the simulators can time stages unconditionally.
+"""
+
+import os
+import sys
+import threading
+import time
+
+from simlib.stats import log_bucket, log_bucket_bound
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfiler:
+    """A profiler that records nothing"""
+
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _StageStats:
+    __slots__ = ("calls", "total_ns", "child_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.child_ns = 0
+        self.max_ns = 0
+        self.buckets = {}
+
+    def percentile(self, q):
+        rank = self.calls * q
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return min(log_bucket_bound(bucket), self.max_ns)
+        return self.max_ns
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "stack", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        path = stack[-1][0] + ";" + self.name if stack else self.name
+        stack.append([path, 0])
+        self.stack = stack
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter_ns() - self.start
+        path, child_ns = self.stack.pop()
+        if self.stack:
+            self.stack[-1][1] += elapsed
+        self.profiler._record(path, elapsed, child_ns)
+        return False
+
+
+class Profiler:
+    """
+    Stage timers and an optional stack sampler.
+
+    Args:
+        output: Path prefix for <output>.stages.txt and <output>.collapsed
+        sample_interval: Seconds between stack samples of the thread that
+            created the profiler, or None to only time stages
+        label: Optional name printed with the breakdown, e.g. a worker
+    """
+
+    enabled = True
+
+    def __init__(self, output="profile", sample_interval=None, label=None):
+        self.output = output
+        self.sample_interval = sample_interval
+        self.label = label
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {}
+        self.samples = {}
+        self.sample_count = 0
+        self.started_at = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.target = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = None
+        if sample_interval:
+            self.sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self.sampler.start()
+
+    def stage(self, name):
+        """Context manager timing one call of a stage"""
+        return _Timer(self, name)
+
+    def _stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _record(self, path, elapsed, child_ns):
+        bucket = log_bucket(elapsed)
+        with self.lock:
+            stats = self.stats.get(path)
+            if stats is None:
+                stats = self.stats[path] = _StageStats()
+            stats.calls += 1
+            stats.total_ns += elapsed
+            stats.child_ns += child_ns
+            if elapsed > stats.max_ns:
+                stats.max_ns = elapsed
+            stats.buckets[bucket] = stats.buckets.get(bucket, 0) + 1
+
+    def _sample(self):
+        while not self.stopped.wait(self.sample_interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            stack = ";".join(reversed(names))
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+            self.sample_count += 1
+
+    def _sorted_stats(self):
+        """(path, stats) pairs with every stage directly followed by its children"""
+        with self.lock:
+            return sorted(self.stats.items(), key=lambda item: item[0].split(";"))
+
+    def report(self):
+        """The per-stage breakdown as text"""
+        wall = time.perf_counter() - self.started_at
+        cpu = time.process_time() - self.cpu_started
+        title = f"Profile ({self.label})" if self.label else "Profile"
+        lines = [
+            f"{title}: {wall:.2f}s wall, {cpu:.2f}s CPU",
+            f"  {'stage':<28} {'calls':>10} {'total':>9} {'% wall':>7} "
+            f"{'self':>9} {'mean':>10} {'p99':>10}",
+        ]
+        stats = self._sorted_stats()
+        for path, s in stats:
+            depth = path.count(";")
+            name = "  " * depth + path.rsplit(";", 1)[-1]
+            total = s.total_ns / 1e9
+            share = total / wall * 100 if wall > 0 else 0.0
+            lines.append(
+                f"  {name:<28} {s.calls:>10} {total:>8.3f}s {share:>6.1f}% "
+                f"{(s.total_ns - s.child_ns) / 1e9:>8.3f}s "
+                f"{s.total_ns / s.calls / 1e3:>8.1f}us {s.percentile(0.99) / 1e3:>8.1f}us"
+            )
+        if self.sampler is not None:
+            lines.append(
+                f"  {self.sample_count} stack samples every {self.sample_interval * 1000:g} ms"
+            )
+        return "\n".join(lines)
+
+    def collapsed(self):
+        """Collapsed-stack lines: sampled stacks, or stage self times in microseconds"""
+        if self.sampler is not None:
+            return [f"{stack} {count}" for stack, count in sorted(self.samples.items())]
+        stats = self._sorted_stats()
+        return [
+            f"{path} {(s.total_ns - s.child_ns) // 1000}"
+            for path, s in stats
+            if s.total_ns > s.child_ns
+        ]
+
+    def close(self):
+        """Stop sampling, print the breakdown and write the output files"""
+        self.stopped.set()
+        if self.sampler is not None:
+            self.sampler.join()
+        report = self.report()
+        directory = os.path.dirname(self.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.output + ".stages.txt", "w") as f:
+            f.write(report + "\n")
+        with open(self.output + ".collapsed", "w") as f:
+            f.writelines(line + "\n" for line in self.collapsed())
+        # One write, so reports of worker processes don't interleave
+        print(
+            f"{report}\nProfile written to {self.output}.stages.txt and {self.output}.collapsed",
+            flush=True,
+        )
+
+
+def open_profiler(profile_config, *labels):
+    """
+    A Profiler for a profile_options() config, or NULL_PROFILER without one.
+
+    labels (e.g. a worker index) are appended to the output prefix, so
+    processes profiling side by side don't overwrite each other's files.
+    """
+    if profile_config is None:
+        return NULL_PROFILER
+    output = "-".join([profile_config.get("output", "profile")] + [str(l) for l in labels])
+    return Profiler(
+        output,
+        profile_config.get("sample_interval"),
+        label=" ".join(str(l) for l in labels) or None,
+    )
+
+
+def add_profile_arguments(parser):
+    """Add the common --profile/--profile-sample/--profile-output options"""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time each stage (generate, serialize, sink, execute, commit, write, print, "
+        "sleep) and print a breakdown at exit",
+    )
+    parser.add_argument(
+        "--profile-sample",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="With --profile, also sample the generator's stack every MS milliseconds",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default="profile",
+        help="Path prefix for the --profile breakdown (.stages.txt) and collapsed stacks "
+        "(.collapsed) (default: profile)",
+    )
+
+
+def profile_options(args):
+    """open_profiler() settings from parsed arguments, or None without --profile"""
+    if not args.profile:
+        return None
+    if args.profile_sample is not None and args.profile_sample <= 0:
+        raise ValueError("--profile-sample must be positive")
+    return {
+        "output": args.profile_output,
+        "sample_interval": args.profile_sample / 1000 if args.profile_sample else None,
+    }
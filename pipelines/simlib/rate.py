@@ -0,0 +1,53 @@
+"""
+Rate control for the pipeline simulators.
+"""
+
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket pacer for holding a target ingest rate.
+
+    Tokens accrue at `rate` per second regardless of how long generating and
+    writing an event took, so slow iterations are compensated automatically.
+    After a stall the bucket lets the simulator catch up with at most `burst`
+    back-to-back events.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst if burst is not None else rate))
+        self.tokens = 1.0
+        self.last = time.perf_counter()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            now = time.perf_counter()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            time.sleep((1.0 - self.tokens) / self.rate)
+
+    def take(self, limit):
+        """Consume up to `limit` whole tokens without blocking; return how many"""
+        now = time.perf_counter()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        taken = min(int(self.tokens), limit)
+        self.tokens -= taken
+        return taken
+
+
+def parse_rate(value):
+    """Parse a rate such as '500' or '500/s' into events per second"""
+    text = value.strip().lower()
+    if text.endswith("/s"):
+        text = text[:-2]
+    rate = float(text)
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    return rate
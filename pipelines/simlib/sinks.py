@@ -0,0 +1,612 @@
+"""
+Output sinks shared by the pipeline simulators.
+
+A sink receives batches of rows for a Table and either inserts them into
+RisingWave (PostgresSink) or appends them to rotating files on disk
+(FileSink). File output can be bulk-loaded later with COPY or a file source,
+which lets datasets be generated once at full generator speed and replayed.
+
+Usage:
+    sink = open_sink("ndjson", output_dir="data", compress="gzip")
+    sink.write(USER_EVENTS, rows)
+    sink.close()
+"""
+
+import csv
+import gzip
+import json
+import os
+import threading
+import time
+
+from simlib.profile import NULL_PROFILER
+from simlib.stats import LatencyHistogram
+
+# Arrow types for the SQL column types used in the pipelines' create_tables.sql
+ARROW_TYPES = {
+    "varchar": "string",
+    "jsonb": "string",
+    "bigint": "int64",
+    "int": "int32",
+    "double": "float64",
+    "boolean": "bool_",
+    "timestamp": "timestamp",
+}
+
+SINK_KINDS = ["postgres", "ndjson", "csv", "parquet"]
+
+
+class Table:
+    """
+    Column layout of a target table.
+
+    Args:
+        name: Table name
+        columns: List of (column name, SQL type) pairs in insert order; types
+            are keys of ARROW_TYPES
+        event_time: Optional name of the column a watermarked view derives
+            its watermark from
+        watermark_delay: Seconds that view's watermark lags event_time, as in
+            create_tables.sql
+    """
+
+    def __init__(self, name, columns, event_time=None, watermark_delay=None):
+        self.name = name
+        self.event_time = event_time
+        self.watermark_delay = watermark_delay
+        self.columns = [c for c, _ in columns]
+        self.types = [t for _, t in columns]
+        self.json_columns = {c for c, t in columns if t == "jsonb"}
+        self.insert_sql = (
+            f"INSERT INTO {name} ({', '.join(self.columns)}) VALUES %s"
+        )
+
+
+class Sink:
+    """Base class: write batches of rows, then close"""
+
+    # Optional SimulatorMetrics (simlib/metrics.py) recording every batch
+    metrics = None
+    # Profiler (simlib/profile.py) timing the execute/commit or write stages
+    profiler = NULL_PROFILER
+
+    def write(self, table, rows):
+        raise NotImplementedError
+
+    def write_tables(self, batches):
+        """Write several (table, rows) batches together, atomically where supported"""
+        for table, rows in batches:
+            self.write(table, rows)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _observe(self, batches, started):
+        """Record (table, rows) batches written together since started, if metrics are on"""
+        metrics = self.metrics
+        if metrics is not None:
+            counts = [(table.name, len(rows)) for table, rows in batches]
+            metrics.generated(counts)
+            metrics.written(counts, time.perf_counter() - started)
+
+
+class PostgresSink(Sink):
+    """
+    Insert each batch with one multi-row INSERT and commit.
+
+    With binary_copy, batches are streamed with COPY ... FROM STDIN
+    (FORMAT binary) instead (see simlib/pgbinary.py), so numbers and
+    timestamps are sent without being formatted and parsed as text.
+    """
+
+    def __init__(self, conn_params, binary_copy=False):
+        import psycopg2
+        import psycopg2.extras
+
+        self._execute_values = psycopg2.extras.execute_values
+        self.binary_copy = binary_copy
+        # Encoders own their buffers, so each writer thread gets its own
+        self._encoders = threading.local()
+        self.conn = psycopg2.connect(**conn_params)
+        self.cursor = self.conn.cursor()
+
+    def _insert(self, cursor, table, rows):
+        """Send one table's rows on cursor, without committing"""
+        if not self.binary_copy:
+            self._execute_values(cursor, table.insert_sql, rows, page_size=len(rows))
+            return
+        encoders = getattr(self._encoders, "by_table", None)
+        if encoders is None:
+            encoders = self._encoders.by_table = {}
+        encoder = encoders.get(table.name)
+        if encoder is None:
+            from simlib.pgbinary import BinaryCopyEncoder
+
+            encoder = encoders[table.name] = BinaryCopyEncoder(table)
+        encoder.copy(cursor, rows)
+
+    def write(self, table, rows):
+        if not rows:
+            return
+        started = time.perf_counter()
+        with self.profiler.stage("execute"):
+            self._insert(self.cursor, table, rows)
+        with self.profiler.stage("commit"):
+            self.conn.commit()
+        self._observe([(table, rows)], started)
+
+    def write_tables(self, batches):
+        """One multi-row INSERT (or COPY) per table, all in a single transaction"""
+        started = time.perf_counter()
+        wrote = False
+        for table, rows in batches:
+            if rows:
+                with self.profiler.stage("execute"):
+                    self._insert(self.cursor, table, rows)
+                wrote = True
+        if wrote:
+            with self.profiler.stage("commit"):
+                self.conn.commit()
+            self._observe(batches, started)
+
+    def close(self):
+        self.conn.close()
+
+
+class MultiTableBatcher:
+    """
+    Accumulate rows for several tables and flush them in one transaction.
+
+    Rows related to each other (a reading and the alert it triggered) are
+    committed together, so they land in the same barrier epoch, and a flush
+    costs one commit however many tables it touches. A flush happens when
+    max_rows rows are pending across all tables or when the oldest pending
+    row has waited max_delay seconds (0 flushes on every add_rows() call).
+
+    Args:
+        sink: Sink to write to
+        tables: Tables in the order their rows are inserted within a flush
+        max_rows: Pending rows that trigger a flush
+        max_delay: Seconds the oldest pending row may wait before a flush
+    """
+
+    def __init__(self, sink, tables, max_rows=1000, max_delay=0.0):
+        self.sink = sink
+        self.tables = list(tables)
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay
+        self.pending = {table.name: [] for table in self.tables}
+        self.pending_rows = 0
+        self.first_pending_at = None
+
+        self.rows_written = 0
+        self.transactions = 0
+        self.commit_latencies = LatencyHistogram()
+
+    def add_rows(self, table_rows):
+        """
+        Buffer rows for several tables at once, then flush if due.
+
+        table_rows is a list of (table, rows) pairs, e.g. a reading and any
+        alerts it raised, so a flush never separates them.
+        """
+        if not self.pending_rows:
+            self.first_pending_at = time.perf_counter()
+        for table, rows in table_rows:
+            self.pending[table.name].extend(rows)
+            self.pending_rows += len(rows)
+        if self.pending_rows >= self.max_rows or (
+            self.pending_rows and time.perf_counter() - self.first_pending_at >= self.max_delay
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write everything pending in one transaction"""
+        if not self.pending_rows:
+            return
+        start = time.perf_counter()
+        self.sink.write_tables([(table, self.pending[table.name]) for table in self.tables])
+        self.commit_latencies.add(time.perf_counter() - start)
+        self.rows_written += self.pending_rows
+        self.transactions += 1
+        self.pending = {table.name: [] for table in self.tables}
+        self.pending_rows = 0
+        self.first_pending_at = None
+
+
+def _ndjson_value(value):
+    if value is None:
+        return "null"
+    if hasattr(value, "isoformat"):
+        return '"' + value.isoformat(sep=" ") + '"'
+    return json.dumps(value)
+
+
+class _RotatingFile:
+    """
+    A sequence of files for one table, rotated every rotate_rows rows.
+
+    Files are written under a .tmp name and renamed when complete, so loaders
+    watching the directory never see a partially written file.
+    """
+
+    def __init__(self, directory, stem, extension, rotate_rows):
+        self.directory = directory
+        self.stem = stem
+        self.extension = extension
+        self.rotate_rows = rotate_rows
+        self.sequence = 0
+        self.rows_in_file = 0
+        self.path = None
+        os.makedirs(directory, exist_ok=True)
+
+    def next_path(self):
+        self.rows_in_file = 0
+        # Skip over files left by earlier runs instead of overwriting them
+        while True:
+            self.sequence += 1
+            self.path = os.path.join(
+                self.directory, f"{self.stem}-{self.sequence:06d}.{self.extension}"
+            )
+            if not os.path.exists(self.path):
+                return self.path + ".tmp"
+
+    def finish(self):
+        if self.path is not None:
+            os.replace(self.path + ".tmp", self.path)
+            self.path = None
+
+    def needs_rotation(self):
+        return self.path is None or (
+            self.rotate_rows and self.rows_in_file >= self.rotate_rows
+        )
+
+
+class _TextTableWriter:
+    """NDJSON or CSV writer for one table, optionally gzip-compressed"""
+
+    def __init__(self, table, kind, directory, prefix, rotate_rows, compress):
+        self.table = table
+        self.kind = kind
+        self.compress = compress
+        extension = kind + (".gz" if compress == "gzip" else "")
+        self.files = _RotatingFile(
+            directory, f"{prefix}{table.name}", extension, rotate_rows
+        )
+        self.handle = None
+        self.csv_writer = None
+
+    def _open(self):
+        self.close()
+        path = self.files.next_path()
+        if self.compress == "gzip":
+            # Level 1 keeps compression from becoming the bottleneck
+            self.handle = gzip.open(path, "wt", compresslevel=1, newline="")
+        else:
+            self.handle = open(path, "w", buffering=1 << 20, newline="")
+        if self.kind == "csv":
+            self.csv_writer = csv.writer(self.handle)
+            self.csv_writer.writerow(self.table.columns)
+
+    def write(self, rows):
+        offset = 0
+        while offset < len(rows):
+            if self.files.needs_rotation():
+                self._open()
+            room = len(rows) - offset
+            if self.files.rotate_rows:
+                room = min(room, self.files.rotate_rows - self.files.rows_in_file)
+            chunk = rows[offset : offset + room]
+            if self.kind == "csv":
+                self.csv_writer.writerows(chunk)
+            else:
+                self.handle.write(self._ndjson(chunk))
+            self.files.rows_in_file += len(chunk)
+            offset += room
+
+    def _ndjson(self, rows):
+        columns = self.table.columns
+        json_columns = self.table.json_columns
+        lines = []
+        for row in rows:
+            fields = []
+            for column, value in zip(columns, row):
+                if column in json_columns and value is not None:
+                    # JSONB values are already serialized; embed them as objects
+                    fields.append(f'"{column}": {value}')
+                else:
+                    fields.append(f'"{column}": {_ndjson_value(value)}')
+            lines.append("{" + ", ".join(fields) + "}\n")
+        return "".join(lines)
+
+    def flush(self):
+        if self.handle is not None:
+            self.handle.flush()
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+            self.csv_writer = None
+            self.files.finish()
+
+
+class _ParquetTableWriter:
+    """
+    Parquet writer for one table.
+
+    Rows are buffered into row groups of up to row_group_rows so that
+    row-at-a-time callers still produce well-sized row groups.
+    """
+
+    def __init__(self, table, directory, prefix, rotate_rows, compress, row_group_rows=65536):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+
+        self.pa = pa
+        self.pq = pq
+        self.table = table
+        self.compression = compress or "snappy"
+        self.schema = pa.schema(
+            [
+                (
+                    column,
+                    pa.timestamp("us")
+                    if sql_type == "timestamp"
+                    else getattr(pa, ARROW_TYPES[sql_type])(),
+                )
+                for column, sql_type in zip(table.columns, table.types)
+            ]
+        )
+        self.files = _RotatingFile(
+            directory, f"{prefix}{table.name}", "parquet", rotate_rows
+        )
+        self.row_group_rows = row_group_rows
+        if rotate_rows:
+            self.row_group_rows = min(row_group_rows, rotate_rows)
+        self.buffer = []
+        self.writer = None
+
+    def write(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.row_group_rows:
+            self._write_buffer(full_groups_only=True)
+
+    def _write_buffer(self, full_groups_only=False):
+        offset = 0
+        while offset < len(self.buffer):
+            room = self.row_group_rows
+            if self.files.needs_rotation():
+                self._close_file()
+                self.writer = self.pq.ParquetWriter(
+                    self.files.next_path(), self.schema, compression=self.compression
+                )
+            if self.files.rotate_rows:
+                room = min(room, self.files.rotate_rows - self.files.rows_in_file)
+            if full_groups_only and len(self.buffer) - offset < room:
+                break
+            chunk = self.buffer[offset : offset + room]
+            columns = list(zip(*chunk))
+            batch = self.pa.Table.from_arrays(
+                [
+                    self.pa.array(values, type=field.type)
+                    for values, field in zip(columns, self.schema)
+                ],
+                schema=self.schema,
+            )
+            self.writer.write_table(batch)
+            self.files.rows_in_file += len(chunk)
+            offset += len(chunk)
+        del self.buffer[:offset]
+
+    def flush(self):
+        self._write_buffer()
+
+    def _close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.files.finish()
+
+    def close(self):
+        self._write_buffer()
+        self._close_file()
+
+
+class FileSink(Sink):
+    """
+    Append rows to rotating per-table files under output_dir/<table>/.
+
+    Args:
+        kind: "ndjson", "csv" or "parquet"
+        output_dir: Root directory for output files
+        rotate_rows: Start a new file after this many rows (0 to never rotate)
+        compress: "gzip" for NDJSON/CSV; a Parquet codec name (snappy, zstd,
+            gzip, ...) for Parquet; None for uncompressed text
+        prefix: File name prefix, e.g. to keep parallel workers apart
+    """
+
+    def __init__(self, kind, output_dir, rotate_rows=1000000, compress=None, prefix=""):
+        if kind not in ("ndjson", "csv", "parquet"):
+            raise ValueError(f"Unknown file sink kind: {kind}")
+        if kind != "parquet" and compress not in (None, "gzip"):
+            raise ValueError(f"{kind} output supports only gzip compression")
+        self.kind = kind
+        self.output_dir = output_dir
+        self.rotate_rows = rotate_rows
+        self.compress = compress
+        self.prefix = prefix
+        self.writers = {}
+
+    def _writer(self, table):
+        writer = self.writers.get(table.name)
+        if writer is None:
+            directory = os.path.join(self.output_dir, table.name)
+            if self.kind == "parquet":
+                writer = _ParquetTableWriter(
+                    table, directory, self.prefix, self.rotate_rows, self.compress
+                )
+            else:
+                writer = _TextTableWriter(
+                    table,
+                    self.kind,
+                    directory,
+                    self.prefix,
+                    self.rotate_rows,
+                    self.compress,
+                )
+            self.writers[table.name] = writer
+        return writer
+
+    def write(self, table, rows):
+        if rows:
+            started = time.perf_counter()
+            with self.profiler.stage("write"):
+                self._writer(table).write(rows)
+            self._observe([(table, rows)], started)
+
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+def open_sink(
+    kind,
+    conn_params=None,
+    output_dir="data",
+    rotate_rows=1000000,
+    compress=None,
+    prefix="",
+    resilience=None,
+    metrics=None,
+    binary_copy=False,
+    profiler=None,
+):
+    """
+    Create a sink by name; conn_params is required for "postgres".
+
+    resilience is an optional dict of ResilientPostgresSink keyword arguments
+    (see simlib/writer.py); when set, "postgres" writes go through a pool of
+    reconnecting writers with a bounded buffer. File sinks ignore it.
+    metrics is an optional SimulatorMetrics that records every batch.
+    binary_copy makes "postgres" writes use binary COPY instead of INSERT.
+    profiler is an optional Profiler that times the sink's stages.
+    """
+    if kind == "postgres":
+        if resilience is not None:
+            from simlib.writer import ResilientPostgresSink
+
+            sink = ResilientPostgresSink(conn_params, binary_copy=binary_copy, **resilience)
+        else:
+            sink = PostgresSink(conn_params, binary_copy=binary_copy)
+    else:
+        sink = FileSink(kind, output_dir, rotate_rows=rotate_rows, compress=compress, prefix=prefix)
+    if metrics is not None:
+        sink.metrics = metrics
+        metrics.watch_sink(sink)
+    if profiler is not None:
+        sink.profiler = profiler
+    return sink
+
+
+def add_sink_arguments(parser):
+    """Add the common --sink/--output-dir/--rotate-rows/--compress, --binary-copy and --resilient options"""
+    parser.add_argument(
+        "--sink",
+        choices=SINK_KINDS,
+        default="postgres",
+        help="Where to write rows (default: postgres)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="data",
+        help="Root directory for file sinks (default: data)",
+    )
+    parser.add_argument(
+        "--rotate-rows",
+        type=int,
+        default=1000000,
+        help="Rows per output file before rotating, 0 to disable (default: 1000000)",
+    )
+    parser.add_argument(
+        "--compress",
+        default=None,
+        help="Compression for file sinks: gzip for ndjson/csv, a codec name for parquet",
+    )
+    parser.add_argument(
+        "--binary-copy",
+        action="store_true",
+        help="Write to RisingWave with COPY ... FROM STDIN (FORMAT binary) instead of "
+        "multi-row INSERTs",
+    )
+    parser.add_argument(
+        "--resilient",
+        action="store_true",
+        help="Write to RisingWave through a pool of writers that reconnect and retry "
+        "with backoff, buffering rows while the database is unavailable",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=4,
+        help="Writer connections for --resilient (default: 4)",
+    )
+    parser.add_argument(
+        "--buffer-rows",
+        type=int,
+        default=100000,
+        help="Rows buffered in memory for --resilient (default: 100000)",
+    )
+    parser.add_argument(
+        "--overflow",
+        choices=["block", "drop-oldest", "spill"],
+        default="block",
+        help="What --resilient does when the buffer is full: block the generator, drop the "
+        "oldest buffered rows, or spill to disk (default: block)",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        default="spill",
+        help="Directory for --overflow spill files (default: spill)",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds to wait for buffered rows on exit with --resilient (default: 60)",
+    )
+
+
+def sink_options(args):
+    """Collect the sink options from parsed arguments as open_sink keyword arguments"""
+    return {
+        "kind": args.sink,
+        "output_dir": args.output_dir,
+        "rotate_rows": args.rotate_rows,
+        "compress": args.compress,
+        "resilience": resilience_options(args),
+        "binary_copy": getattr(args, "binary_copy", False),
+    }
+
+
+def resilience_options(args):
+    """ResilientPostgresSink keyword arguments from parsed arguments, or None without --resilient"""
+    if not getattr(args, "resilient", False):
+        return None
+    return {
+        "pool_size": args.pool_size,
+        "buffer_rows": args.buffer_rows,
+        "overflow": args.overflow,
+        "spill_dir": args.spill_dir,
+        "drain_timeout": args.drain_timeout,
+    }
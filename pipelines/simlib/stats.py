@@ -0,0 +1,107 @@
+"""
+Latency statistics helpers for the pipeline simulators.
+"""
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * q))
+    return sorted_values[index]
+
+
+def summarize_latencies(values):
+    """Return (p50, p95, p99, max) of a list of latencies"""
+    ordered = sorted(values)
+    return (
+        percentile(ordered, 0.50),
+        percentile(ordered, 0.95),
+        percentile(ordered, 0.99),
+        ordered[-1] if ordered else 0.0,
+    )
+
+
+def log_bucket(ns):
+    """Log-scale bucket of a duration: 8 buckets per power of two"""
+    bits = ns.bit_length()
+    if bits <= 4:
+        return ns
+    return (bits << 3) | ((ns >> (bits - 4)) & 7)
+
+
+def log_bucket_bound(bucket):
+    """Upper bound in nanoseconds of a log_bucket()"""
+    if bucket < 16:
+        return bucket
+    bits, sub = bucket >> 3, bucket & 7
+    return (9 + sub) << (bits - 4)
+
+
+class LatencyHistogram:
+    """
+    Latencies in seconds, counted in log_bucket()s.
+
+    Memory stays constant however many latencies are added, and percentiles
+    are accurate to within 1/8, so long runs can keep every commit latency.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.max = 0.0
+        self.buckets = {}
+
+    def __len__(self):
+        return self.count
+
+    def add(self, seconds):
+        bucket = log_bucket(max(0, int(seconds * 1e9)))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def extend(self, values):
+        for seconds in values:
+            self.add(seconds)
+
+    def percentile(self, q):
+        """Nearest-rank percentile, as percentile() of the sorted latencies"""
+        rank = min(self.count - 1, int(self.count * q))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return min(log_bucket_bound(bucket) / 1e9, self.max)
+        return self.max
+
+    def summary(self):
+        """Return (p50, p95, p99, max) like summarize_latencies()"""
+        if not self.count:
+            return 0.0, 0.0, 0.0, 0.0
+        return self.percentile(0.50), self.percentile(0.95), self.percentile(0.99), self.max
+
+
+def format_histogram(values, bounds, width=40, unit="s"):
+    """
+    Render a text histogram of values bucketed by upper bounds.
+
+    Values above the last bound are counted in a final overflow bucket.
+    """
+    counts = [0] * (len(bounds) + 1)
+    for value in values:
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+
+    peak = max(counts) or 1
+    labels = [f"<= {bound:g}{unit}" for bound in bounds] + [f"> {bounds[-1]:g}{unit}"]
+    label_width = max(len(label) for label in labels)
+    lines = []
+    for label, count in zip(labels, counts):
+        bar = "#" * round(width * count / peak)
+        lines.append(f"  {label:>{label_width}} | {bar} {count}")
+    return "\n".join(lines)
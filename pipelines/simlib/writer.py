@@ -0,0 +1,419 @@
+"""
+Resilient pooled writer for long-running load tests.
+
+ResilientPostgresSink decouples generation from the database so that a
+RisingWave node restart or a connection blip doesn't end a soak test:
+
+- write() only places the batch in a bounded in-memory buffer; a pool of
+  writer threads, each with its own connection, drains it with one
+  multi-row INSERT (or binary COPY) and commit per batch.
+- When a connection fails, its writer reconnects with exponential backoff
+  (full jitter) and retries the in-flight batch. Every table in the
+  pipelines has a primary key, so a retried batch that had in fact
+  committed is upserted over itself rather than duplicated.
+- When the buffer is full (the database is down or slower than the
+  generator), the overflow policy decides what happens: "block" applies
+  backpressure to the generator, "drop-oldest" discards the oldest buffered
+  batches, and "spill" parks new batches in a file on disk that the writers
+  replay once they catch up.
+
+close() drains the buffer (up to drain_timeout) and prints what happened:
+rows written, retries, reconnects, outages, and rows dropped, spilled or
+lost, so sustained throughput during failover can be measured.
+"""
+
+import os
+import pickle
+import random
+import threading
+import time
+from collections import deque
+
+from simlib.sinks import PostgresSink
+from simlib.stats import LatencyHistogram
+
+OVERFLOW_POLICIES = ["block", "drop-oldest", "spill"]
+
+
+class Backoff:
+    """
+    Exponential backoff with full jitter.
+
+    The n-th consecutive delay is uniform in [0, min(maximum, initial * 2^n)].
+    """
+
+    def __init__(self, initial=0.1, maximum=10.0, rng=None):
+        self.initial = initial
+        self.maximum = maximum
+        self.rng = rng or random.Random()
+        self.attempts = 0
+
+    def next(self):
+        delay = min(self.maximum, self.initial * 2**self.attempts)
+        self.attempts += 1
+        return self.rng.uniform(0, delay)
+
+    def reset(self):
+        self.attempts = 0
+
+
+class SpillFile:
+    """
+    Batches parked on disk while the buffer is full, replayed first in, first out.
+
+    Batches are appended as pickled lists of (table name, rows) records; the
+    file is truncated whenever the reader catches up. Not thread-safe:
+    callers hold the writer's lock.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"spill-{os.getpid()}-{id(self):x}.bin")
+        self.writer = open(self.path, "wb")
+        self.reader = open(self.path, "rb")
+        self.batches = 0
+        self.rows = 0
+
+    def append(self, batch, count):
+        pickle.dump((batch, count), self.writer, protocol=pickle.HIGHEST_PROTOCOL)
+        self.writer.flush()
+        self.batches += 1
+        self.rows += count
+
+    def pop(self):
+        """The oldest spilled (batch, row count), or None if empty"""
+        if not self.batches:
+            return None
+        batch, count = pickle.load(self.reader)
+        self.batches -= 1
+        self.rows -= count
+        if not self.batches:
+            self.writer.seek(0)
+            self.writer.truncate()
+            self.reader.seek(0)
+        return batch, count
+
+    def close(self):
+        self.writer.close()
+        self.reader.close()
+        os.remove(self.path)
+
+
+class ResilientPostgresSink(PostgresSink):
+    """
+    A PostgresSink that buffers batches and writes them from a connection pool.
+
+    The inherited conn/cursor remain available for setup queries (ID scans,
+    sensor registration); batches written with write() or write_tables() go
+    through the pool. A write_tables() batch is written, retried, dropped or
+    spilled as a unit, in one transaction.
+
+    Args:
+        conn_params: psycopg2 connection parameters
+        pool_size: Writer threads, each with its own connection
+        buffer_rows: Rows buffered in memory before the overflow policy applies
+        overflow: "block", "drop-oldest" or "spill"
+        spill_dir: Directory for the spill file when overflow is "spill"
+        max_retries: Attempts for a batch that fails with a non-connection
+            error (e.g. a data error) before it is counted as failed;
+            connection errors are retried until the database comes back
+        drain_timeout: Seconds close() waits for buffered rows to be written
+        backoff_initial: First reconnect delay bound in seconds
+        backoff_max: Upper bound on reconnect delays in seconds
+        binary_copy: Write batches with binary COPY instead of INSERT
+    """
+
+    def __init__(
+        self,
+        conn_params,
+        pool_size=4,
+        buffer_rows=100000,
+        overflow="block",
+        spill_dir="spill",
+        max_retries=3,
+        drain_timeout=60.0,
+        backoff_initial=0.1,
+        backoff_max=10.0,
+        binary_copy=False,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        import psycopg2
+
+        super().__init__(conn_params, binary_copy=binary_copy)
+        self.psycopg2 = psycopg2
+        self.conn_params = conn_params
+        self.buffer_rows = max(1, buffer_rows)
+        self.overflow = overflow
+        self.max_retries = max_retries
+        self.drain_timeout = drain_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.spill = SpillFile(spill_dir) if overflow == "spill" else None
+
+        self.tables = {}
+        self.batches = deque()
+        self.buffered = 0
+        self.in_flight = 0
+        self.closing = False
+        # Set once close() gives up on draining; interrupts writers' retries
+        self.abandoned = threading.Event()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+        self.started_at = time.perf_counter()
+        self.rows_written = 0
+        self.batches_written = 0
+        self.retries = 0
+        self.reconnects = 0
+        self.dropped_rows = 0
+        self.spilled_rows = 0
+        self.failed_rows = 0
+        self.lost_rows = 0
+        self.peak_buffered = 0
+        self.last_error = None
+        self.down_since = None
+        self.outages = []
+        self.commit_latencies = LatencyHistogram()
+
+        self.threads = [
+            threading.Thread(target=self._run_writer, name=f"writer-{i}", daemon=True)
+            for i in range(pool_size)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, table, rows):
+        """Buffer a batch, applying the overflow policy if the buffer is full"""
+        self.write_tables([(table, rows)])
+
+    def write_tables(self, batches):
+        """Buffer (table, rows) batches to be committed together in one transaction"""
+        batch = [(table.name, list(rows)) for table, rows in batches if rows]
+        count = sum(len(rows) for _, rows in batch)
+        if not count:
+            return
+        if self.metrics is not None:
+            self.metrics.generated([(name, len(rows)) for name, rows in batch])
+        with self.changed:
+            for table, _ in batches:
+                self.tables[table.name] = table
+            # Once batches are spilled, later ones queue behind them on disk, so
+            # the spill is replayed as soon as the writers catch up, in order
+            if self.spill is not None and self.spill.batches:
+                self.spill.append(batch, count)
+                self.spilled_rows += count
+                self.changed.notify_all()
+                return
+            # A single batch larger than the buffer is accepted into an empty one
+            while self.buffered and self.buffered + count > self.buffer_rows:
+                if self.overflow == "spill":
+                    self.spill.append(batch, count)
+                    self.spilled_rows += count
+                    self.changed.notify_all()
+                    return
+                if self.overflow == "drop-oldest":
+                    _, dropped = self.batches.popleft()
+                    self.buffered -= dropped
+                    self.dropped_rows += dropped
+                else:
+                    self.changed.wait(0.5)
+            self.batches.append((batch, count))
+            self.buffered += count
+            self.peak_buffered = max(self.peak_buffered, self.buffered)
+            self.changed.notify_all()
+
+    def _take(self):
+        """
+        Next (batch, row count) to write, or None once closed.
+
+        Buffered batches are always older than spilled ones, since nothing
+        is buffered while the spill file is non-empty.
+        """
+        with self.changed:
+            while True:
+                if self.batches:
+                    batch, count = self.batches.popleft()
+                    self.buffered -= count
+                    self.changed.notify_all()
+                    break
+                if self.spill is not None and self.spill.batches:
+                    batch, count = self.spill.pop()
+                    break
+                if self.closing:
+                    return None
+                self.changed.wait(0.5)
+            self.in_flight += count
+            return [(self.tables[name], rows) for name, rows in batch], count
+
+    def _done(self, count, outcome):
+        with self.changed:
+            self.in_flight -= count
+            if outcome == "written":
+                self.rows_written += count
+                self.batches_written += 1
+            elif outcome == "failed":
+                self.failed_rows += count
+            else:
+                self.lost_rows += count
+            self.changed.notify_all()
+
+    def _connect(self):
+        conn = self.psycopg2.connect(**self.conn_params)
+        return conn, conn.cursor()
+
+    def _run_writer(self):
+        psycopg2 = self.psycopg2
+        backoff = Backoff(self.backoff_initial, self.backoff_max)
+        conn = cursor = None
+        while True:
+            taken = self._take()
+            if taken is None:
+                break
+            batch, count = taken
+            attempts = 0
+            outcome = "lost"
+            try:
+                while not self.abandoned.is_set():
+                    try:
+                        if conn is None:
+                            conn, cursor = self._connect()
+                        start = time.perf_counter()
+                        for table, rows in batch:
+                            with self.profiler.stage("execute"):
+                                self._insert(cursor, table, rows)
+                        with self.profiler.stage("commit"):
+                            conn.commit()
+                        latency = time.perf_counter() - start
+                        self.commit_latencies.add(latency)
+                        if self.metrics is not None:
+                            self.metrics.written(
+                                [(table.name, len(rows)) for table, rows in batch], latency
+                            )
+                        outcome = "written"
+                        backoff.reset()
+                        self._recovered()
+                        break
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                        # The connection is gone: reconnect and retry the same batch
+                        self._failed(e, connection=True)
+                        if conn is not None:
+                            try:
+                                conn.close()
+                            except psycopg2.Error:
+                                pass
+                        conn = cursor = None
+                    except psycopg2.Error as e:
+                        self._failed(e, connection=False)
+                        if not self._rollback(conn):
+                            conn = cursor = None
+                        attempts += 1
+                        if attempts > self.max_retries:
+                            outcome = "failed"
+                            break
+                    except Exception as e:
+                        # A value the adapter or the binary COPY encoder can't handle
+                        # fails the same way on every attempt, so don't retry it
+                        with self.lock:
+                            self.last_error = f"{type(e).__name__}: {str(e).strip()}"
+                        if not self._rollback(conn):
+                            conn = cursor = None
+                        outcome = "failed"
+                        break
+                    self.abandoned.wait(backoff.next())
+            finally:
+                self._done(count, outcome)
+        if conn is not None:
+            conn.close()
+
+    def _rollback(self, conn):
+        """Roll back a failed batch; False if the connection is unusable"""
+        if conn is None:
+            return False
+        try:
+            conn.rollback()
+        except self.psycopg2.Error:
+            return False
+        return True
+
+    def _failed(self, error, connection):
+        with self.lock:
+            self.retries += 1
+            if connection:
+                self.reconnects += 1
+                if self.down_since is None:
+                    self.down_since = time.perf_counter()
+                    print(f"Writer lost its connection, retrying: {str(error).strip()}")
+            self.last_error = str(error).strip()
+
+    def _recovered(self):
+        with self.lock:
+            if self.down_since is not None:
+                outage = time.perf_counter() - self.down_since
+                self.outages.append(outage)
+                self.down_since = None
+                print(f"Writer reconnected after {outage:.1f}s")
+
+    def pending(self):
+        """Rows buffered in memory, spilled to disk, or being written"""
+        spilled = self.spill.rows if self.spill is not None else 0
+        return self.buffered + spilled + self.in_flight
+
+    def flush(self):
+        """Wait until every buffered batch has been written or given up on"""
+        with self.changed:
+            while self.pending():
+                self.changed.wait(0.5)
+
+    def close(self):
+        """Drain the buffer for up to drain_timeout seconds, stop the pool and report"""
+        deadline = time.perf_counter() + self.drain_timeout
+        with self.changed:
+            self.closing = True
+            self.changed.notify_all()
+            while self.pending() and time.perf_counter() < deadline:
+                self.changed.wait(0.5)
+            # Abandon whatever is left: writers give up on in-flight retries
+            self.abandoned.set()
+            self.lost_rows += self.buffered + (self.spill.rows if self.spill is not None else 0)
+            self.batches.clear()
+            self.buffered = 0
+            if self.spill is not None:
+                self.spill.close()
+                self.spill = None
+            self.changed.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.report()
+        super().close()
+
+    def report(self):
+        """Print write, retry and loss statistics"""
+        elapsed = time.perf_counter() - self.started_at
+        rate = self.rows_written / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Resilient writer: {self.rows_written} rows in {self.batches_written} batches "
+            f"({rate:.0f} rows/sec over {elapsed:.1f}s), peak buffer {self.peak_buffered} rows"
+        )
+        if self.commit_latencies:
+            p50, _, p99, worst = self.commit_latencies.summary()
+            print(
+                f"  Commit latency: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+                f"max {worst * 1000:.1f} ms"
+            )
+        if self.retries or self.outages:
+            downtime = sum(self.outages)
+            longest = max(self.outages, default=0.0)
+            print(
+                f"  {self.retries} retries, {self.reconnects} reconnect attempts, "
+                f"{len(self.outages)} outages ({downtime:.1f}s total, longest {longest:.1f}s)"
+            )
+        if self.down_since is not None:
+            print(f"  Still disconnected after {time.perf_counter() - self.down_since:.1f}s")
+        if self.dropped_rows or self.spilled_rows or self.failed_rows or self.lost_rows:
+            print(
+                f"  Rows dropped (buffer full): {self.dropped_rows}, spilled to disk: "
+                f"{self.spilled_rows}, failed: {self.failed_rows}, lost at close: {self.lost_rows}"
+            )
+        if self.last_error:
+            print(f"  Last error: {self.last_error}")
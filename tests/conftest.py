@@ -0,0 +1,11 @@
+import os
+import sys
+
+PIPELINES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pipelines")
+
+# simlib and the top-level tools, then each pipeline's modules, as the scripts see them
+sys.path[:0] = [PIPELINES] + [
+    os.path.join(PIPELINES, name)
+    for name in sorted(os.listdir(PIPELINES))
+    if name[:2].isdigit() and os.path.isdir(os.path.join(PIPELINES, name))
+]
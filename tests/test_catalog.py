@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+
+from catalog import AliasSampler, zipf_weights
+
+
+def test_alias_tables_preserve_the_distribution():
+    weights = [5, 1, 0, 3, 1]
+    sampler = AliasSampler(weights)
+    # Each outcome's mass: its own column kept with prob, plus columns aliased to it
+    mass = np.zeros(len(weights))
+    for i in range(len(weights)):
+        mass[i] += sampler.prob[i]
+        mass[sampler.alias[i]] += 1.0 - sampler.prob[i]
+    assert np.allclose(mass / len(weights), np.array(weights) / sum(weights))
+
+
+def test_vectorized_sampling_matches_weights():
+    weights = zipf_weights(8, 1.2)
+    draws = AliasSampler(weights).sample(np.random.default_rng(7), 200_000)
+    frequencies = np.bincount(draws, minlength=8) / len(draws)
+    assert np.allclose(frequencies, weights / weights.sum(), atol=0.005)
+
+
+def test_single_draws_match_weights_and_skip_zero_weights():
+    sampler = AliasSampler([1, 0, 3])
+    rng = random.Random(3)
+    counts = [0, 0, 0]
+    for _ in range(40_000):
+        counts[sampler.sample_one(rng)] += 1
+    assert counts[1] == 0
+    assert abs(counts[2] / counts[0] - 3.0) < 0.15
+
+
+def test_single_outcome():
+    sampler = AliasSampler([2.5])
+    assert sampler.sample_one(random.Random(0)) == 0
+    assert set(sampler.sample(np.random.default_rng(0), 10)) == {0}
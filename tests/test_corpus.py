@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pytest
+
+from corpus import Corpus, index_path, scan_line_starts
+
+TEXT = b"first line\n\nsecond line\r\n\r\nthird\n\n\nfourth without newline"
+LINES = ["first line", "second line", "third", "fourth without newline"]
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_blank_and_carriage_return_lines_are_skipped(tmp_path):
+    corpus = Corpus([write(tmp_path / "a.txt", TEXT)], order="sequential")
+    assert len(corpus) == 4
+    assert [corpus.line(i) for i in range(4)] == LINES
+    corpus.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_scan_is_independent_of_chunk_size(chunk_size):
+    data = np.frombuffer(TEXT, dtype=np.uint8)
+    starts = np.concatenate(list(scan_line_starts(data, chunk_size)))
+    assert starts.tolist() == [TEXT.index(line.encode()) for line in LINES]
+
+
+def test_leading_blank_lines_and_trailing_newline(tmp_path):
+    corpus = Corpus([write(tmp_path / "a.txt", b"\n\r\nonly\n")])
+    assert len(corpus) == 1
+    assert corpus.line(0) == "only"
+    corpus.close()
+
+
+def test_index_is_cached_and_rebuilt_when_the_file_changes(tmp_path):
+    path = write(tmp_path / "a.txt", TEXT)
+    Corpus([path]).close()
+    assert os.path.exists(index_path(path))
+    cached = Corpus([path])
+    assert [cached.line(i) for i in range(4)] == LINES
+    cached.close()
+
+    write(tmp_path / "a.txt", b"one\ntwo\n")
+    os.utime(path, ns=(0, 1))
+    changed = Corpus([path])
+    assert [changed.line(i) for i in range(len(changed))] == ["one", "two"]
+    changed.close()
+
+
+def test_lines_are_numbered_across_files_and_sequential_order_wraps(tmp_path):
+    paths = [write(tmp_path / "a.txt", TEXT), write(tmp_path / "b.txt", b"fifth\nsixth\n")]
+    corpus = Corpus(paths, order="sequential")
+    assert len(corpus) == 6
+    assert [corpus.pick() for _ in range(7)] == LINES + ["fifth", "sixth", "first line"]
+    corpus.close()
+
+
+def test_files_without_lines_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Corpus([write(tmp_path / "empty.txt", b"")])
+    with pytest.raises(ValueError):
+        Corpus([write(tmp_path / "blank.txt", b"\n\r\n\n")])
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from simlib.disorder import DisorderModel, DisorderSink
+from simlib.sinks import Sink, Table
+
+EVENTS = Table(
+    "events",
+    [("id", "int"), ("event_time", "timestamp")],
+    event_time="event_time",
+    watermark_delay=5.0,
+)
+DIMENSIONS = Table("dimensions", [("id", "int")])
+
+START = datetime(2026, 1, 1)
+
+
+class ScriptedModel:
+    """Delays rows by the given seconds in turn (None sends a row in order)"""
+
+    def __init__(self, delays):
+        self.delays = iter(delays)
+
+    def delay(self):
+        return next(self.delays)
+
+
+class RecordingSink(Sink):
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+
+    def write(self, table, rows):
+        self.rows.extend((table.name, row[0]) for row in rows)
+
+    def write_tables(self, batches):
+        for table, rows in batches:
+            self.write(table, rows)
+
+    def close(self):
+        self.closed = True
+
+
+def rows(*seconds):
+    return [(i, START + timedelta(seconds=s)) for i, s in enumerate(seconds)]
+
+
+def test_held_row_is_released_once_the_stream_passes_its_delay():
+    inner = RecordingSink()
+    sink = DisorderSink(inner, ScriptedModel([3.0, None, None, None]))
+    sink.write(EVENTS, rows(0, 1, 2, 3))
+    # Row 0 is due at 3s and goes out just before the row that reaches 3s
+    assert [i for _, i in inner.rows] == [1, 2, 0, 3]
+    state = sink.tables["events"]
+    assert state.delayed == 1
+    assert state.out_of_order == 1
+    assert state.beyond_watermark == 0
+
+
+def test_rows_later_than_the_watermark_are_counted():
+    inner = RecordingSink()
+    sink = DisorderSink(inner, ScriptedModel([8.0] + [None] * 9))
+    sink.write(EVENTS, rows(*range(10)))
+    state = sink.tables["events"]
+    # Sent after the 7s row, 2s below the 7s - 5s watermark
+    assert [i for _, i in inner.rows] == [1, 2, 3, 4, 5, 6, 7, 0, 8, 9]
+    assert state.beyond_watermark == 1
+    assert state.max_lateness == timedelta(seconds=2)
+
+
+def test_watermark_delay_override():
+    sink = DisorderSink(RecordingSink(), ScriptedModel([8.0] + [None] * 9), watermark_delay=10.0)
+    sink.write(EVENTS, rows(*range(10)))
+    assert sink.tables["events"].beyond_watermark == 0
+    assert sink.tables["events"].out_of_order == 1
+
+
+def test_close_releases_held_rows_and_closes_the_inner_sink(capsys):
+    inner = RecordingSink()
+    sink = DisorderSink(inner, ScriptedModel([60.0, None]))
+    sink.write(EVENTS, rows(0, 1))
+    assert [i for _, i in inner.rows] == [1]
+    assert sink.tables["events"].peak_held == 1
+    sink.close()
+    assert [i for _, i in inner.rows] == [1, 0]
+    assert inner.closed
+    assert "1 delayed" in capsys.readouterr().out
+
+
+def test_tables_without_event_time_pass_through():
+    inner = RecordingSink()
+    sink = DisorderSink(inner, ScriptedModel([]))
+    sink.write_tables([(DIMENSIONS, [(1,), (2,)])])
+    assert inner.rows == [("dimensions", 1), ("dimensions", 2)]
+    assert sink.tables == {}
+
+
+def test_model_validates_its_settings():
+    with pytest.raises(ValueError):
+        DisorderModel(1.5, 30.0)
+    with pytest.raises(ValueError):
+        DisorderModel(0.1, 0.0)
+    with pytest.raises(ValueError):
+        DisorderModel(0.1, 30.0, "normal")
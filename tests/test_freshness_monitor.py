@@ -0,0 +1,56 @@
+import pytest
+
+from freshness_monitor import (
+    PER_EVENT_VIEWS,
+    ViewLag,
+    freshness_query,
+    lag_trend,
+    monitored_views,
+    parse_thresholds,
+)
+
+
+def test_parse_thresholds_default_and_overrides():
+    assert parse_thresholds("60,revenue_tracker=600") == (60.0, {"revenue_tracker": 600.0})
+    assert parse_thresholds(" geo_readings=5 ") == (None, {"geo_readings": 5.0})
+    assert parse_thresholds("30") == (30.0, {})
+
+
+@pytest.mark.parametrize("value", ["0", "-1", "soon", "nope=10", "revenue_tracker=0"])
+def test_parse_thresholds_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_thresholds(value)
+
+
+def test_lag_trend_is_the_slope_in_seconds_per_minute():
+    assert lag_trend([(0, 5.0), (30, 10.0), (60, 15.0)]) == pytest.approx(10.0)
+    assert lag_trend([(0, 7.0), (60, 7.0), (120, 7.0)]) == pytest.approx(0.0)
+    assert lag_trend([(0, 9.0), (10, 1.0)]) == pytest.approx(-48.0)
+
+
+def test_lag_trend_needs_two_distinct_times():
+    assert lag_trend([]) is None
+    assert lag_trend([(5, 1.0)]) is None
+    assert lag_trend([(5, 1.0), (5, 2.0)]) is None
+
+
+def test_view_lag_alerts_once_per_excursion():
+    state = ViewLag("03_iot_sensors", "geo_readings", threshold=10)
+    assert state.update(0, 5) is None
+    assert state.update(5, 12) == "alert"
+    assert state.update(10, 20) is None
+    assert state.update(15, 4) == "recovered"
+    assert state.update(20, 11) == "alert"
+    assert state.alerts == 2
+    assert state.time_alerting(30) == 20
+
+
+def test_per_event_views_need_trackers():
+    default = monitored_views("03_iot_sensors")
+    tracked = monitored_views("03_iot_sensors", trackers=True)
+    assert not PER_EVENT_VIEWS & set(default)
+    assert {"temperature_anomalies", "geo_readings"} <= set(tracked)
+    sql = freshness_query("03_iot_sensors", tracked)
+    assert "FROM freshness_geo_readings" in sql
+    assert "MAX(hour) + INTERVAL '1 hour' FROM hourly_temperature_stats" in sql
+    assert "FROM geo_readings" not in sql
@@ -0,0 +1,72 @@
+import json
+import multiprocessing
+
+from simlib.leases import FileLeaseStore, IdSequence, LeasedIds, resolve_lease_kind
+
+
+def test_claims_are_consecutive_blocks_per_namespace(tmp_path):
+    store = FileLeaseStore(str(tmp_path / "ids.json"))
+    assert store.claim("events", 100) == 0
+    assert store.claim("events", 100) == 100
+    assert store.claim("sessions", 10) == 0
+    with open(tmp_path / "ids.json") as f:
+        assert json.load(f) == {"events": 200, "sessions": 10}
+
+
+def test_initial_is_only_consulted_for_a_new_namespace(tmp_path):
+    calls = []
+
+    def initial():
+        calls.append(1)
+        return 5000
+
+    store = FileLeaseStore(str(tmp_path / "ids.json"))
+    assert store.claim("events", 10, initial) == 5000
+    assert store.claim("events", 10, initial) == 5010
+    assert len(calls) == 1
+
+
+def test_a_restarted_generator_resumes_after_its_last_block(tmp_path):
+    path = str(tmp_path / "nested" / "ids.json")
+    ids = LeasedIds(FileLeaseStore(path), "events", block_size=10)
+    assert ids.take(3) == [0, 1, 2]
+    # The rest of the first block is skipped, never reused
+    restarted = LeasedIds(FileLeaseStore(path), "events", block_size=10)
+    assert restarted.next() == 10
+
+
+def test_leased_ids_span_blocks(tmp_path):
+    ids = LeasedIds(FileLeaseStore(str(tmp_path / "ids.json")), "events", block_size=4)
+    assert ids.take(6) == [0, 1, 2, 3, 4, 5]
+    assert [ids.next(), ids.next(), ids.next()] == [6, 7, 8]
+
+
+def _claim_blocks(path, count, results):
+    store = FileLeaseStore(path)
+    results.put([store.claim("events", 10) for _ in range(count)])
+
+
+def test_parallel_processes_get_disjoint_blocks(tmp_path):
+    path = str(tmp_path / "ids.json")
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_claim_blocks, args=(path, 25, results)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    starts = [start for _ in workers for start in results.get(timeout=30)]
+    for worker in workers:
+        worker.join()
+    assert sorted(starts) == list(range(0, 1000, 10))
+
+
+def test_id_sequence_strides_do_not_collide():
+    shards = [IdSequence(100, offset, stride=3) for offset in range(3)]
+    values = [value for shard in shards for value in shard.take(4)]
+    assert sorted(values) == list(range(100, 112))
+
+
+def test_auto_never_picks_the_lease_table():
+    assert resolve_lease_kind("auto", "postgres") == "file"
+    assert resolve_lease_kind("auto", "parquet") == "none"
+    assert resolve_lease_kind("table", "postgres") == "table"
@@ -0,0 +1,102 @@
+import struct
+from datetime import datetime, timedelta
+
+import pytest
+
+from simlib.pgbinary import HEADER, TRAILER, BinaryCopyEncoder
+from simlib.sinks import Table
+
+READINGS = Table(
+    "readings",
+    [
+        ("reading_id", "bigint"),
+        ("sensor_id", "int"),
+        ("reading_type", "varchar"),
+        ("reading_value", "double"),
+        ("is_valid", "boolean"),
+        ("reading_time", "timestamp"),
+        ("metadata", "jsonb"),
+    ],
+)
+
+
+def decode(data, types):
+    """Parse a binary COPY stream back into rows"""
+    assert bytes(data[: len(HEADER)]) == HEADER
+    pos = len(HEADER)
+    rows = []
+    while True:
+        (count,) = struct.unpack_from(">h", data, pos)
+        pos += 2
+        if count == -1:
+            break
+        assert count == len(types)
+        row = []
+        for sql_type in types:
+            (length,) = struct.unpack_from(">i", data, pos)
+            pos += 4
+            if length == -1:
+                row.append(None)
+                continue
+            value = bytes(data[pos : pos + length])
+            pos += length
+            if sql_type == "varchar":
+                row.append(value.decode())
+            elif sql_type == "jsonb":
+                assert value[0] == 1
+                row.append(value[1:].decode())
+            elif sql_type == "timestamp":
+                (micros,) = struct.unpack(">q", value)
+                row.append(datetime(2000, 1, 1) + timedelta(microseconds=micros))
+            else:
+                code = {"double": "d", "bigint": "q", "int": "i", "boolean": "?"}[sql_type]
+                row.append(struct.unpack(">" + code, value)[0])
+        rows.append(tuple(row))
+    assert pos == len(data)
+    return rows
+
+
+def reading(i):
+    return (
+        1 << 40 | i,
+        i,
+        "temperature",
+        20.0 + i / 8,
+        i % 2 == 0,
+        datetime(2026, 3, 1, 12, 0, 0, 250) + timedelta(seconds=i),
+        '{"unit": "°C"}',
+    )
+
+
+def test_round_trip():
+    rows = [reading(i) for i in range(100)]
+    with BinaryCopyEncoder(READINGS).encode(rows) as view:
+        assert bytes(view[-len(TRAILER) :]) == TRAILER
+        assert decode(view, READINGS.types) == rows
+
+
+def test_nulls_take_the_slow_path():
+    rows = [reading(0), (2, None, None, None, None, None, None), reading(3)]
+    with BinaryCopyEncoder(READINGS).encode(rows) as view:
+        assert decode(view, READINGS.types) == rows
+
+
+def test_buffer_grows_and_is_reused():
+    encoder = BinaryCopyEncoder(READINGS, initial_size=64)
+    rows = [reading(i) for i in range(500)]
+    with encoder.encode(rows) as view:
+        assert decode(view, READINGS.types) == rows
+    size = len(encoder.buffer)
+    with encoder.encode(rows[:3]) as view:
+        assert decode(view, READINGS.types) == rows[:3]
+    assert len(encoder.buffer) == size
+
+
+def test_empty_batch():
+    with BinaryCopyEncoder(READINGS).encode([]) as view:
+        assert decode(view, READINGS.types) == []
+
+
+def test_unsupported_types_are_rejected():
+    with pytest.raises(ValueError):
+        BinaryCopyEncoder(Table("t", [("amount", "numeric")]))
@@ -0,0 +1,60 @@
+import random
+
+from simlib.profile import Profiler
+from simlib.stats import LatencyHistogram, log_bucket, log_bucket_bound, percentile
+
+
+def test_bucket_bounds_cover_values_within_an_eighth():
+    for ns in list(range(2000)) + [random.Random(0).randrange(1 << 40) for _ in range(5000)]:
+        bound = log_bucket_bound(log_bucket(ns))
+        assert ns <= bound <= max(ns + 1, ns * 9 / 8)
+
+
+def test_buckets_are_ordered_like_the_values():
+    values = sorted(random.Random(1).randrange(1 << 36) for _ in range(5000))
+    buckets = [log_bucket(ns) for ns in values]
+    assert buckets == sorted(buckets)
+
+
+def test_small_durations_have_exact_buckets():
+    assert [log_bucket_bound(log_bucket(ns)) for ns in range(16)] == list(range(16))
+
+
+def test_stage_percentiles_come_from_buckets(tmp_path):
+    profiler = Profiler(str(tmp_path / "profile"))
+    durations = [1000 * i for i in range(1, 101)]
+    for ns in durations:
+        profiler._record("generate", ns, 0)
+    stats = profiler.stats["generate"]
+    assert stats.calls == 100
+    assert stats.total_ns == sum(durations)
+    assert stats.max_ns == 100_000
+    exact = percentile(durations, 0.99)
+    assert exact <= stats.percentile(0.99) <= exact * 9 / 8
+    assert stats.percentile(1.0) == 100_000
+
+
+def test_nested_stages_record_paths_and_child_time(tmp_path):
+    profiler = Profiler(str(tmp_path / "profile"))
+    for _ in range(3):
+        with profiler.stage("sink"):
+            with profiler.stage("commit"):
+                pass
+    sink, commit = profiler.stats["sink"], profiler.stats["sink;commit"]
+    assert sink.calls == commit.calls == 3
+    assert sink.child_ns == commit.total_ns <= sink.total_ns
+    assert [path for path, _ in profiler._sorted_stats()] == ["sink", "sink;commit"]
+
+
+def test_latency_histogram_matches_exact_percentiles_within_an_eighth():
+    rng = random.Random(2)
+    values = [rng.expovariate(200) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    histogram.extend(values)
+    ordered = sorted(values)
+    assert len(histogram) == len(values)
+    for q, estimate in zip((0.50, 0.95, 0.99), histogram.summary()):
+        exact = percentile(ordered, q)
+        assert exact - 1e-9 <= estimate <= exact * 9 / 8 + 1e-9
+    assert histogram.summary()[3] == ordered[-1]
+    assert LatencyHistogram().summary() == (0.0, 0.0, 0.0, 0.0)
@@ -0,0 +1,24 @@
+import pytest
+
+from query_load import DEFAULT_MIX, QUERIES, parse_mix
+
+
+def test_weights_default_to_one():
+    assert parse_mix("funnel_analysis=3, geo_readings") == {
+        "funnel_analysis": 3.0,
+        "geo_readings": 1.0,
+    }
+
+
+def test_all_selects_every_query():
+    assert parse_mix(" all ") == {name: 1.0 for name in QUERIES}
+
+
+def test_default_mix_is_valid():
+    assert set(parse_mix(DEFAULT_MIX)) <= set(QUERIES)
+
+
+@pytest.mark.parametrize("value", ["unknown", "geo_readings=0", "geo_readings=-2", "geo_readings=x"])
+def test_invalid_mixes_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_mix(value)
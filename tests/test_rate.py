@@ -0,0 +1,69 @@
+import pytest
+
+from simlib import rate
+from simlib.rate import TokenBucket, parse_rate
+
+
+class FakeTime:
+    """Stands in for the time module; rates below are powers of two, so tokens stay exact"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(rate, "time", clock)
+    return clock
+
+
+def test_acquire_paces_to_the_rate(clock):
+    bucket = TokenBucket(8)
+    for _ in range(17):
+        bucket.acquire()
+    # The first token is free, the next 16 take 1/8 s each
+    assert clock.slept == 2.0
+
+
+def test_slow_iterations_are_compensated(clock):
+    bucket = TokenBucket(8)
+    bucket.acquire()
+    clock.now += 0.09375
+    bucket.acquire()
+    assert clock.slept == 0.03125
+
+
+def test_burst_caps_catch_up_after_a_stall(clock):
+    bucket = TokenBucket(128, burst=5)
+    clock.now += 60
+    assert bucket.take(1000) == 5
+    assert bucket.take(1000) == 0
+    clock.now += 0.03125
+    assert bucket.take(1000) == 4
+
+
+def test_take_respects_limit(clock):
+    bucket = TokenBucket(64, burst=50)
+    clock.now += 1
+    assert bucket.take(10) == 10
+    assert bucket.take(100) == 40
+
+
+@pytest.mark.parametrize("text, expected", [("500", 500.0), ("500/s", 500.0), (" 2.5/S ", 2.5)])
+def test_parse_rate(text, expected):
+    assert parse_rate(text) == expected
+
+
+@pytest.mark.parametrize("text", ["0", "-5/s", "fast", "/s"])
+def test_parse_rate_rejects_invalid_rates(text):
+    with pytest.raises(ValueError):
+        parse_rate(text)
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from reference_views import ReferenceViews, tokenize
+
+T = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def at(minute, second):
+    return T.replace(minute=minute, second=second)
+
+
+def test_tokenize_splits_on_single_spaces_and_lowercases():
+    assert tokenize("The  quick Fox ") == ["the", "quick", "fox"]
+
+
+def test_windows_are_shifted_by_the_watermark_delay():
+    views = ReferenceViews()
+    views.ingest([(1, "a b", at(1, 3)), (2, "a", at(1, 7)), (3, "b", at(2, 4))])
+    # 12:01:03 - 5s falls in the 12:00 window, 12:01:07 - 5s in 12:01
+    assert views.expected()["word_counts"] == {
+        (at(0, 0), "a"): 1,
+        (at(0, 0), "b"): 1,
+        (at(1, 0), "a"): 1,
+        (at(1, 0), "b"): 1,
+    }
+    assert views.expected()["total_word_counts"] == {"a": 2, "b": 2}
+    assert views.sentences == 3
+    assert views.words == 4
+
+
+def test_rows_in_windows_behind_the_watermark_are_late_but_counted():
+    views = ReferenceViews()
+    views.ingest(
+        [(1, "w", at(2, 10)), (2, "x", at(0, 30)), (3, "y", at(2, 0)), (4, "z", at(2, 8))]
+    )
+    # The watermark reached 12:02:05, past the ends of the 12:00 and 12:01 windows
+    assert views.watermark == at(2, 5)
+    assert views.late_rows == 2
+    assert views.expected()["word_counts"][(at(0, 0), "x")] == 1
+    assert views.expected()["word_counts"][(at(1, 0), "y")] == 1
+    # 12:02:03 is behind the watermark, but its window is still open
+    assert views.expected()["word_counts"][(at(2, 0), "z")] == 1
+
+
+def test_window_cache_follows_out_of_order_rows():
+    views = ReferenceViews()
+    views.ingest([(1, "a", at(1, 30)), (2, "a", at(3, 30)), (3, "a", at(1, 40))])
+    counts = views.expected()["word_counts"]
+    assert counts[(at(1, 0), "a")] == 2
+    assert counts[(at(3, 0), "a")] == 1
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = results
+        self.rows = []
+
+    def execute(self, sql):
+        self.rows = self.results[sql.split(" FROM ")[1]]
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_diff_against_live_views():
+    views = ReferenceViews()
+    views.ingest([(1, "a b", at(1, 10))])
+    cursor = FakeCursor(
+        {
+            "word_counts": [(at(1, 0), "a", 1), (at(1, 0), "c", 4)],
+            "total_word_counts": [("a", 1), ("b", 2)],
+        }
+    )
+    word_counts, totals = views.diff(cursor)
+    assert word_counts.missing == {(at(1, 0), "b"): 1}
+    assert word_counts.extra == {(at(1, 0), "c"): 4}
+    assert totals.mismatched == {"b": (1, 2)}
+    assert not totals.missing and not totals.extra
@@ -0,0 +1,79 @@
+import random
+
+from session_pool import SessionPool
+
+
+def test_put_replaces_last_event():
+    pool = SessionPool()
+    pool.put("S1", "a")
+    pool.put("S1", "b")
+    assert len(pool) == 1
+    assert pool.sample() == ("S1", "b")
+
+
+def test_remove_moves_last_session_into_slot():
+    pool = SessionPool()
+    for i in range(5):
+        pool.put(f"S{i}", i)
+    pool.remove("S1")
+    assert len(pool) == 4
+    assert "S1" not in pool
+    for session_id, event in zip(pool.ids, pool.events):
+        assert pool.ids[pool.position[session_id]] == session_id
+        assert event == int(session_id[1:])
+
+
+def test_sample_is_uniform_over_sessions():
+    pool = SessionPool()
+    for i in range(4):
+        pool.put(f"S{i}", i)
+    rng = random.Random(1)
+    counts = {}
+    for _ in range(8000):
+        session_id, _ = pool.sample(rng)
+        counts[session_id] = counts.get(session_id, 0) + 1
+    assert set(counts) == {"S0", "S1", "S2", "S3"}
+    assert all(1700 < count < 2300 for count in counts.values())
+
+
+def test_expire_removes_idle_sessions_only():
+    pool = SessionPool(ttl=10)
+    pool.put("S1", 1, now=0)
+    pool.put("S2", 2, now=0)
+    pool.put("S1", 3, now=8)
+    assert pool.expire(10) == 1
+    assert "S2" not in pool
+    assert "S1" in pool
+    assert pool.expire(17) == 0
+    assert pool.expire(18) == 1
+    assert len(pool) == 0
+    assert pool.expired == 2
+
+
+def test_expire_skips_removed_sessions():
+    pool = SessionPool(ttl=5)
+    pool.put("S1", 1, now=0)
+    pool.remove("S1")
+    pool.put("S1", 2, now=3)
+    assert pool.expire(5) == 0
+    assert pool.expire(8) == 1
+
+
+def test_compaction_keeps_live_deadlines():
+    pool = SessionPool(ttl=100)
+    pool.put("S1", 0, now=0)
+    pool.put("S2", 0, now=0)
+    for now in range(1, 3000):
+        pool.put("S1", now, now=now)
+    assert len(pool.heap) <= 4 * len(pool) + 1024
+    assert pool.expire(2000) == 1
+    assert "S1" in pool and "S2" not in pool
+
+
+def test_evict_random_caps_at_pool_size():
+    pool = SessionPool()
+    for i in range(3):
+        pool.put(f"S{i}", i)
+    pool.evict_random(10, random.Random(0))
+    assert len(pool) == 0
+    assert pool.evicted == 3